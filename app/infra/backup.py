@@ -1,11 +1,217 @@
+import gzip
+import json
+import os
+import shutil
 import sqlite3
+import threading
+import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from .db import integrity_check
+
+# ------------------------------ BACKUP LA CALD (cu aplicația pornită) ------------------------------
+# src.backup(dst) dintr-o bucată ține un snapshot de citire cât copiază toată baza.
+# run_backup copiază în pași de `pages` pagini cu pauză între ei (casa de marcat poate scrie între pași):
+#   1) backup API → magazin_<stamp>.sqlite.partial
+#   2) opțional PRAGMA integrity_check pe copie
+#   3) opțional gzip → magazin_<stamp>.sqlite.gz  (altfel rename → .sqlite)
+#   4) rotire: păstrăm ultimele `keep_count` și nimic mai vechi de `keep_days`
+#   5) o linie în backups.jsonl (durată, mărime, rezultat verificare)
+# Dacă altă conexiune scrie în sursă între doi pași, SQLite reia copia de la început (la o casă care
+# scanează continuu, copia nu s-ar mai termina). De aceea conexiunea sursă ține o tranzacție de citire
+# deschisă pe toată durata: în WAL copia vede un snapshot fix, iar scrierile continuă nestingherite
+# (checkpoint-ul doar nu trece de snapshot până la final).
+
+BACKUP_PREFIX = "magazin_"
+BACKUP_LOG = "backups.jsonl"
+
+DEFAULT_PAGES = 1024
+DEFAULT_SLEEP_MS = 5
+
 
 def make_backup(db_path: str, backup_dir: str):
+    """Backup simplu (necomprimat, fără rotire); întoarce calea copiei."""
+    return run_backup(db_path, backup_dir, compress=False)["path"]
+
+
+def run_backup(db_path: str, backup_dir: str, *, pages: int = DEFAULT_PAGES, sleep_ms: int = DEFAULT_SLEEP_MS,
+               compress: bool = True, verify: bool = False) -> Dict[str, Any]:
     Path(backup_dir).mkdir(parents=True, exist_ok=True)
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    dst_path = Path(backup_dir) / f"magazin_{stamp}.sqlite"
-    with sqlite3.connect(db_path) as src, sqlite3.connect(dst_path) as dst:
-        src.backup(dst)  # copie consistentă
-    return str(dst_path)
+    final = Path(backup_dir) / f"{BACKUP_PREFIX}{stamp}.sqlite"
+    partial = final.with_name(final.name + ".partial")
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+
+    t0 = time.perf_counter()
+    src = sqlite3.connect(db_path, isolation_level=None)
+    dst = sqlite3.connect(partial)
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1")   # fixează snapshot-ul de citire
+        src.backup(dst, pages=pages, progress=progress, sleep=sleep_ms / 1000.0)  # copie consistentă, pe pași
+        integrity = integrity_check(dst) if verify else None
+    except BaseException:
+        dst.close()
+        partial.unlink(missing_ok=True)
+        raise
+    finally:
+        dst.close()
+        src.close()
+    if integrity is not None and integrity != "ok":
+        partial.unlink(missing_ok=True)
+        raise RuntimeError(f"Copia nu a trecut verificarea de integritate: {integrity}")
+
+    size = partial.stat().st_size
+    if compress:
+        final = final.with_name(final.name + ".gz")
+        with open(partial, "rb") as f_in, gzip.open(final, "wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        partial.unlink()
+    else:
+        os.replace(partial, final)
+
+    info = {
+        "path": str(final),
+        "started_at": stamp,
+        "duration_s": round(time.perf_counter() - t0, 3),
+        "db_bytes": size,
+        "file_bytes": final.stat().st_size,
+        "steps": steps,
+        "integrity": integrity,
+    }
+    _append_log(backup_dir, info)
+    return info
+
+
+# ---------- ROTIRE ----------
+def list_backups(backup_dir: str) -> List[Path]:
+    """Copiile finalizate, cele mai noi primele (numele conține data → sortare după nume)."""
+    d = Path(backup_dir)
+    if not d.is_dir():
+        return []
+    files = [p for p in d.iterdir()
+             if p.name.startswith(BACKUP_PREFIX) and (p.name.endswith(".sqlite") or p.name.endswith(".sqlite.gz"))]
+    return sorted(files, key=lambda p: p.name, reverse=True)
+
+
+def rotate_backups(backup_dir: str, keep_count: int, keep_days: int) -> List[str]:
+    """Șterge copiile peste `keep_count` și cele mai vechi de `keep_days` zile (0 = fără limită)."""
+    cutoff = datetime.now() - timedelta(days=keep_days) if keep_days else None
+    removed = []
+    for i, p in enumerate(list_backups(backup_dir)):
+        too_many = keep_count and i >= keep_count
+        too_old = cutoff is not None and i > 0 and datetime.fromtimestamp(p.stat().st_mtime) < cutoff
+        if too_many or too_old:   # cea mai nouă copie nu se șterge niciodată pe criteriu de vârstă
+            p.unlink(missing_ok=True)
+            removed.append(str(p))
+    return removed
+
+
+# ---------- JURNAL ----------
+def _append_log(backup_dir: str, info: Dict[str, Any]) -> None:
+    with open(Path(backup_dir) / BACKUP_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps(info, ensure_ascii=False) + "\n")
+
+
+def backup_history(backup_dir: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Ultimele `limit` înregistrări din backups.jsonl, cele mai noi primele."""
+    p = Path(backup_dir) / BACKUP_LOG
+    if not p.exists():
+        return []
+    out = []
+    for line in p.read_text(encoding="utf-8").splitlines()[-limit:]:
+        try:
+            out.append(json.loads(line))
+        except ValueError:
+            continue
+    return out[::-1]
+
+
+# ------------------------------ PROGRAMARE ------------------------------
+# Un thread de fundal: la fiecare `backup_interval_min` minute face run_backup + rotate_backups.
+# La pornire, dacă ultima copie din jurnal e mai veche de un interval, face una imediat.
+# backup_now() rulează în thread-ul apelantului (ex. butonul din Setări), sub același lock.
+
+class BackupScheduler:
+    def __init__(self, db_path: str, cfg: Dict[str, Any],
+                 on_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.db_path = db_path
+        self.on_done = on_done
+        self.on_error = on_error
+        self.last: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.configure(cfg)
+
+    def configure(self, cfg: Dict[str, Any]) -> None:
+        self.backup_dir = cfg["backup_dir"]
+        self.interval_min = int(cfg.get("backup_interval_min", 0))
+        self.keep_count = int(cfg.get("backup_keep_count", 0))
+        self.keep_days = int(cfg.get("backup_keep_days", 0))
+        self.compress = bool(cfg.get("backup_compress", True))
+        self.verify = bool(cfg.get("backup_verify", False))
+        self.pages = int(cfg.get("backup_pages_per_step", DEFAULT_PAGES))
+        self.sleep_ms = int(cfg.get("backup_step_sleep_ms", DEFAULT_SLEEP_MS))
+        self._wake.set()   # thread-ul recalculează momentul următorului backup
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="backup", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Oprește thread-ul; un backup în curs se termină (altfel rămâne doar un .partial)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def backup_now(self) -> Dict[str, Any]:
+        with self._lock:
+            info = run_backup(self.db_path, self.backup_dir, pages=self.pages, sleep_ms=self.sleep_ms,
+                              compress=self.compress, verify=self.verify)
+            info["removed"] = rotate_backups(self.backup_dir, self.keep_count, self.keep_days)
+            self.last, self.last_error = info, None
+            return info
+
+    def _seconds_until_due(self) -> Optional[float]:
+        if self.interval_min <= 0:
+            return None   # programarea e oprită; așteptăm o reconfigurare
+        last = self.last or next(iter(backup_history(self.backup_dir, 1)), None)
+        if not last:
+            return 0.0
+        try:
+            done_at = datetime.strptime(last["started_at"], "%Y%m%d_%H%M%S")
+        except (KeyError, ValueError):
+            return 0.0
+        due = done_at + timedelta(minutes=self.interval_min)
+        return max(0.0, (due - datetime.now()).total_seconds())
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            wait = self._seconds_until_due()
+            if wait is None or wait > 0:
+                self._wake.wait(wait)
+                continue          # trezit de configure/stop sau a expirat timpul → recalculăm
+            try:
+                info = self.backup_now()
+            except Exception as e:   # discul plin etc. nu trebuie să omoare thread-ul
+                self.last_error = str(e)
+                if self.on_error:
+                    self.on_error(e)
+                self._wake.wait(60)   # reîncercare peste un minut
+                continue
+            if self.on_done:
+                self.on_done(info)
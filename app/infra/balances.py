@@ -0,0 +1,127 @@
+import argparse
+import sqlite3
+
+
+# ------------------------------ STOCK BALANCES (verify / repair) ------------------------------
+# stock_balance_product / stock_balance_batch sunt o copie materializată a SUM(movements.quantity_base),
+# ținută la zi de triggerele trg_movements_* din db_init.SCHEMA_SQL.
+# Registrul (movements + soldurile de deschidere lăsate de închiderile de perioadă, vezi period_close)
+# rămâne sursa de adevăr; aici sunt uneltele care recalculează soldurile din el:
+#   - expected_*           → soldurile calculate direct din registru (SQL)
+#   - verify_stock_balances → listează diferențele dintre tabelele de sold și registru
+#   - rebuild_stock_balances → șterge și reface tabelele de sold din registru (în tranzacția apelantului)
+
+LEDGER_SQL = """
+    SELECT product_id, batch_id, quantity_base FROM movements
+    UNION ALL
+    SELECT product_id, batch_id, qty_base FROM stock_opening_balances
+"""
+
+EXPECTED_PRODUCT_SQL = f"""
+    SELECT product_id,
+           SUM(quantity_base) AS qty_base,
+           SUM(CASE WHEN batch_id IS NULL THEN quantity_base ELSE 0 END) AS unbatched_qty_base
+    FROM ({LEDGER_SQL})
+    GROUP BY product_id
+"""
+
+EXPECTED_BATCH_SQL = f"""
+    SELECT m.batch_id, b.product_id, SUM(m.quantity_base) AS qty_base
+    FROM ({LEDGER_SQL}) m
+    JOIN batches b ON b.id = m.batch_id
+    GROUP BY m.batch_id
+"""
+
+
+def rebuild_stock_balances(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM stock_balance_batch")
+    conn.execute("DELETE FROM stock_balance_product")
+    conn.execute(f"""
+        INSERT INTO stock_balance_product(product_id, qty_base, unbatched_qty_base)
+        {EXPECTED_PRODUCT_SQL}
+    """)
+    conn.execute(f"""
+        INSERT INTO stock_balance_batch(batch_id, product_id, qty_base)
+        {EXPECTED_BATCH_SQL}
+    """)
+
+
+def balances_need_backfill(conn: sqlite3.Connection) -> bool:
+    # Tabele de sold goale, dar registru ne-gol = bază creată înainte de introducerea soldurilor
+    has_balances = conn.execute("SELECT 1 FROM stock_balance_product LIMIT 1").fetchone()
+    has_movements = conn.execute(f"SELECT 1 FROM ({LEDGER_SQL}) LIMIT 1").fetchone()
+    return has_balances is None and has_movements is not None
+
+
+def verify_stock_balances(conn: sqlite3.Connection) -> list[dict]:
+    """Returnează diferențele sold materializat ↔ registru (listă goală = totul e în regulă)."""
+    diffs = []
+
+    rows = conn.execute(f"""
+        WITH expected AS ({EXPECTED_PRODUCT_SQL})
+        SELECT p.id AS product_id,
+               COALESCE(e.qty_base, 0) AS expected_qty, COALESCE(sb.qty_base, 0) AS actual_qty,
+               COALESCE(e.unbatched_qty_base, 0) AS expected_unbatched,
+               COALESCE(sb.unbatched_qty_base, 0) AS actual_unbatched
+        FROM products p
+        LEFT JOIN expected e ON e.product_id = p.id
+        LEFT JOIN stock_balance_product sb ON sb.product_id = p.id
+        WHERE COALESCE(e.qty_base, 0) <> COALESCE(sb.qty_base, 0)
+           OR COALESCE(e.unbatched_qty_base, 0) <> COALESCE(sb.unbatched_qty_base, 0)
+    """).fetchall()
+    for r in rows:
+        diffs.append({
+            "table": "stock_balance_product", "key": r["product_id"],
+            "expected": (r["expected_qty"], r["expected_unbatched"]),
+            "actual": (r["actual_qty"], r["actual_unbatched"]),
+        })
+
+    rows = conn.execute(f"""
+        WITH expected AS ({EXPECTED_BATCH_SQL})
+        SELECT b.id AS batch_id,
+               COALESCE(e.qty_base, 0) AS expected_qty, COALESCE(sb.qty_base, 0) AS actual_qty
+        FROM batches b
+        LEFT JOIN expected e ON e.batch_id = b.id
+        LEFT JOIN stock_balance_batch sb ON sb.batch_id = b.id
+        WHERE COALESCE(e.qty_base, 0) <> COALESCE(sb.qty_base, 0)
+    """).fetchall()
+    for r in rows:
+        diffs.append({
+            "table": "stock_balance_batch", "key": r["batch_id"],
+            "expected": r["expected_qty"], "actual": r["actual_qty"],
+        })
+    return diffs
+
+
+# ------------------------------------- CLI -------------------------------------
+# python -m app.infra.balances                 → verificare (exit code 1 dacă există diferențe)
+# python -m app.infra.balances --repair        → reface soldurile din registru
+def main(argv=None) -> int:
+    from ..util.config import load_config
+
+    ap = argparse.ArgumentParser(description="Verifică / repară soldurile de stoc materializate.")
+    ap.add_argument("--db", default=None, help="calea bazei (implicit: db_path din config.json)")
+    ap.add_argument("--repair", action="store_true", help="reconstruiește soldurile din registru")
+    args = ap.parse_args(argv)
+
+    from .db_init import init_db   # schema la zi (ex. stock_opening_balances pe baze mai vechi)
+    conn = init_db(args.db or load_config()["db_path"])
+    try:
+        diffs = verify_stock_balances(conn)
+        for d in diffs:
+            print(f"{d['table']} #{d['key']}: așteptat {d['expected']}, găsit {d['actual']}")
+        if not diffs:
+            print("Soldurile corespund registrului.")
+            return 0
+        if args.repair:
+            with conn:
+                rebuild_stock_balances(conn)
+            print(f"Reparat: {len(diffs)} diferențe corectate.")
+            return 0
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,41 @@
+import json
+import random
+import re
 import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
 # ---------------------------- DATABASE CONNECTION AND SETTINGS -----------------------------
 # Creates the parent dir of DB file if missing
 # Opens the sqslite3.connect connection with :
 #   - detect_types = sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES → SQLite will try conversions of type (date/time).
 #   - row_factory = sqlite3.Row → rows can be accesed as a dict (key = name col).
+#   - cached_statements = STATEMENT_CACHE_SIZE → how many prepared statements the connection keeps
+#     (LRU, keyed by the exact SQL text). The default (128) is close to the number of distinct
+#     statements the app runs, so reports / searches / imports could evict the scanning ones and
+#     make them compile again; the hot ones are module constants in services/use_cases.py.
 
-def connect(db_path: str):
+STATEMENT_CACHE_SIZE = 512
+
+def connect(db_path: str, check_same_thread: bool = True):
     p = Path(db_path)
     if p.parent and not p.parent.exists():
         p.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+    conn = sqlite3.connect(
+        db_path,
+        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        check_same_thread=check_same_thread,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        # how long a statement waits for another connection's write lock (see WRITE TRANSACTIONS below)
+        timeout=lock_policy.busy_timeout_ms / 1000,
+        # plain sqlite3.Connection unless query stats are on (see QUERY STATS below) → no overhead when off
+        factory=InstrumentedConnection if query_stats.enabled else sqlite3.Connection,
+    )
 
     # To elaborate why I choose this expression;
     # Normally, when you do a sqlite3 querry, it is a tuple list : 
@@ -43,6 +67,407 @@ def connect(db_path: str):
     conn.execute("PRAGMA foreign_keys=ON;")
     return conn
 
+# ---------------------------------- QUERY STATS -----------------------------------
+# Which statements dominate? With query_stats.enabled (config.json: "sql_stats": true) connect()
+# returns an InstrumentedConnection: every execute / executemany / commit is timed and added to
+# query_stats under its normalized SQL (literals → ?, whitespace collapsed, IN (?,?,?) → IN (?...)):
+#   calls, total_ms, max_ms, rows (rows fetched for SELECT, rowcount for INSERT/UPDATE/DELETE)
+# A SELECT is timed across execute + fetches (sqlite3 steps the statement while rows are fetched).
+# A statement slower than slow_ms (execute + fetches) is logged with its EXPLAIN QUERY PLAN to query_stats.slow
+# (the last SLOW_KEEP entries) and, if slow_log is set, appended to that JSONL file.
+# When disabled nothing is wrapped: connections are plain sqlite3.Connection objects. The flag is
+# read when a connection is opened, so toggling it affects connections opened afterwards.
+
+SLOW_KEEP = 100
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class QueryStats:
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = 100.0
+        self.slow_log: Optional[str] = None
+        self.slow: deque = deque(maxlen=SLOW_KEEP)
+        self._stats: Dict[str, list] = {}     # normalized sql → [calls, total_ms, max_ms, rows]
+        self._norm: Dict[str, str] = {}       # raw sql → normalized (the app uses a few hundred texts)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool, slow_ms: float = 100.0, slow_log: Optional[str] = None) -> None:
+        self.enabled = bool(enabled)
+        self.slow_ms = float(slow_ms)
+        self.slow_log = slow_log or None
+
+    def normalize(self, sql: str) -> str:
+        norm = self._norm.get(sql)
+        if norm is None:
+            norm = _IN_LIST.sub("IN (?...)", _LITERALS.sub("?", " ".join(sql.split())))
+            if len(self._norm) < 10_000:
+                self._norm[sql] = norm
+        return norm
+
+    def entry(self, sql: str) -> list:
+        norm = self.normalize(sql)
+        e = self._stats.get(norm)
+        if e is None:
+            with self._lock:
+                e = self._stats.setdefault(norm, [0, 0.0, 0.0, 0])
+        return e
+
+    def record(self, e: list, calls: int, ms: float, call_ms: float, rows: int) -> None:
+        with self._lock:
+            e[0] += calls
+            e[1] += ms
+            if call_ms > e[2]:
+                e[2] = call_ms
+            e[3] += rows
+
+    def log_slow(self, conn: sqlite3.Connection, sql: str, params, ms: float) -> None:
+        plan = None
+        if sql.lstrip().upper().startswith(_EXPLAINABLE):
+            try:   # plain cursor (not the instrumented one) → the plan itself is not counted
+                plan = [r[3] for r in sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params)]
+            except (sqlite3.Error, ValueError):
+                plan = None
+        item = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "ms": round(ms, 2),
+            "sql": self.normalize(sql),
+            "plan": plan,
+        }
+        with self._lock:
+            self.slow.append(item)
+            if self.slow_log:
+                with open(self.slow_log, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def snapshot(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The stats, most expensive (total_ms) first."""
+        with self._lock:
+            items = [(sql, list(e)) for sql, e in self._stats.items()]
+        out = [{
+            "sql": sql, "calls": calls, "total_ms": round(total, 2), "avg_ms": round(total / calls, 3) if calls else 0.0,
+            "max_ms": round(mx, 2), "rows": rows,
+        } for sql, (calls, total, mx, rows) in items]
+        out.sort(key=lambda r: r["total_ms"], reverse=True)
+        return out[:limit] if limit else out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.slow.clear()
+
+    def format_table(self, limit: int = 20) -> str:
+        lines = [f"{'apeluri':>8} {'total ms':>10} {'medie ms':>9} {'max ms':>8} {'rânduri':>9}  sql"]
+        for r in self.snapshot(limit):
+            lines.append(f"{r['calls']:>8} {r['total_ms']:>10.1f} {r['avg_ms']:>9.3f} {r['max_ms']:>8.1f} "
+                         f"{r['rows']:>9}  {r['sql'][:160]}")
+        return "\n".join(lines)
+
+
+query_stats = QueryStats()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _entry = None
+
+    def _start(self, sql: str, params, calls: int, run):
+        self._finish()
+        self._entry = query_stats.entry(sql)
+        self._sql, self._params, self._ms = sql, params, 0.0
+        t0 = time.perf_counter()
+        try:
+            return run()
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            done = self.description is None   # not a SELECT → fully run by execute()
+            self._add(ms, self.rowcount if done and self.rowcount > 0 else 0, calls)
+            if done:
+                self._finish()
+
+    def _add(self, ms: float, rows: int, calls: int = 0) -> None:
+        self._ms += ms
+        query_stats.record(self._entry, calls, ms, self._ms, rows)
+
+    def _finish(self) -> None:
+        # the slow check runs once the statement is done (exhausted, cursor reused or dropped),
+        # so the logged time covers execute + every fetch
+        if self._entry is not None:
+            self._entry = None
+            if self._ms >= query_stats.slow_ms:
+                query_stats.log_slow(self.connection, self._sql, self._params or (), self._ms)
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def execute(self, sql, params=()):
+        return self._start(sql, params, 1, lambda: super(InstrumentedCursor, self).execute(sql, params))
+
+    def executemany(self, sql, seq):
+        # every parameter set counts as one call; logged without a plan (no single parameter set)
+        seq = list(seq)
+        return self._start(sql, None, len(seq), lambda: super(InstrumentedCursor, self).executemany(sql, seq))
+
+    def _fetch(self, fetch, count_rows, exhausted):
+        if self._entry is None:
+            return fetch()
+        t0 = time.perf_counter()
+        out = fetch()
+        self._add((time.perf_counter() - t0) * 1000, count_rows(out))
+        if exhausted(out):
+            self._finish()
+        return out
+
+    def fetchone(self):
+        return self._fetch(super().fetchone, lambda r: r is not None, lambda r: r is None)
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        return self._fetch(lambda: super(InstrumentedCursor, self).fetchmany(size), len, lambda r: len(r) < size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall, len, lambda r: True)
+
+    def __next__(self):
+        if self._entry is None:
+            return super().__next__()
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add((time.perf_counter() - t0) * 1000, 0)
+            self._finish()
+            raise
+        self._add((time.perf_counter() - t0) * 1000, 1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.Connection that reports every statement to query_stats."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def _timed(self, name: str, fn):
+        t0 = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            query_stats.record(query_stats.entry(name), 1, ms, ms, 0)
+
+    def commit(self):
+        return self._timed("COMMIT", super().commit)
+
+    def __exit__(self, exc_type, exc, tb):
+        # `with conn:` commits / rolls back in C, without going through commit()
+        return self._timed("COMMIT" if exc_type is None else "ROLLBACK",
+                           lambda: super(InstrumentedConnection, self).__exit__(exc_type, exc, tb))
+
+# ------------------------- WRITE TRANSACTIONS / LOCK CONTENTION ---------------------------
+# SQLite allows ONE writer per database file. With two tills and the back-office PC on the same
+# magazin.sqlite (config.json: "multi_client": true) the writers queue on that lock:
+#   - busy timeout: a statement that finds the file locked waits up to busy_timeout_ms
+#     (sqlite3 `timeout=`, i.e. PRAGMA busy_timeout) instead of failing at once
+#   - write_transaction(conn): every write use case runs in BEGIN IMMEDIATE ... COMMIT.
+#     `with conn:` opened a DEFERRED transaction only at the first INSERT/UPDATE, so the reads
+#     before it (stock for finalize, session lines for close) ran outside the transaction and could
+#     be stale by the time the write started; a deferred transaction that must upgrade its read
+#     lock also gets SQLITE_BUSY right away, without waiting. IMMEDIATE takes the write lock first:
+#     the reads see the latest data and nothing can change it until COMMIT.
+#   - only BEGIN IMMEDIATE can be refused (in WAL mode COMMIT never waits for readers), so only the
+#     BEGIN is retried: after the busy timeout, up to `retries` more times, sleeping
+#     backoff_ms * 2^n (capped at max_backoff_ms) * a random factor 0.5 - 1.5. The jitter keeps
+#     the clients that timed out together from all retrying at the same moment.
+#   - keep the transactions short: parsing / validation / UI work happens before write_transaction
+# lock_policy also keeps the lock waits (time spent in BEGIN IMMEDIATE) for the "Interogări SQL" tab
+# and bench/bench_multi_till.py. The timeout is read when a connection is opened.
+#
+# Side effects outside the database (files, in-memory state) that must only happen once the data is
+# committed are registered with after_commit(conn, fn): they run right after the outermost COMMIT and
+# are dropped on ROLLBACK. A command that joins an outer transaction (services.group_commit) therefore
+# has its hooks run only after the group's COMMIT; the group writer takes them per command with
+# pop_commit_hooks so a command rolled back to its SAVEPOINT loses its own hooks only.
+
+LOCK_WAITS_KEEP = 10_000
+LOCKED_MSG = "Baza de date este ocupată de altă casă. Reîncearcă operația."
+
+
+class LockPolicy:
+    def __init__(self):
+        self.busy_timeout_ms = 5000     # = sqlite3's default timeout (5 s); no retries
+        self.retries = 0
+        self.backoff_ms = 20.0
+        self.max_backoff_ms = 500.0
+        self.waits: deque = deque(maxlen=LOCK_WAITS_KEEP)   # ms spent acquiring the write lock
+        self.transactions = 0
+        self.retried = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def configure(self, multi_client: bool, busy_timeout_ms: int = 5000, retries: int = 5,
+                  backoff_ms: float = 20.0, max_backoff_ms: float = 500.0) -> None:
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self.retries = int(retries) if multi_client else 0
+        self.backoff_ms = float(backoff_ms)
+        self.max_backoff_ms = float(max_backoff_ms)
+
+    def backoff(self, attempt: int) -> float:
+        """Pauza (secunde) înainte de reîncercarea `attempt` (1, 2, ...)."""
+        ms = min(self.max_backoff_ms, self.backoff_ms * 2 ** (attempt - 1))
+        return ms * random.uniform(0.5, 1.5) / 1000
+
+    def record(self, ms: float, retries: int, failed: bool) -> None:
+        with self._lock:
+            self.transactions += 1
+            self.retried += retries
+            self.failed += failed
+            self.waits.append(ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self.waits)
+            out = {"transactions": self.transactions, "retries": self.retried, "failed": self.failed}
+        for name, p in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            out[name] = round(waits[min(len(waits) - 1, int(len(waits) * p))], 2) if waits else 0.0
+        out["max_ms"] = round(waits[-1], 2) if waits else 0.0
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self.waits.clear()
+            self.transactions = self.retried = self.failed = 0
+
+
+lock_policy = LockPolicy()
+
+
+# id(conn) → hooks of the transaction open on it (a connection is used by one thread at a time)
+_commit_hooks: Dict[int, List[Callable[[], None]]] = {}
+
+
+def after_commit(conn: sqlite3.Connection, fn: Callable[[], None]) -> None:
+    """Run fn() after the COMMIT of the write_transaction open on conn (now if none is open)."""
+    if not conn.in_transaction:
+        fn()
+        return
+    _commit_hooks.setdefault(id(conn), []).append(fn)
+
+
+def pop_commit_hooks(conn: sqlite3.Connection) -> List[Callable[[], None]]:
+    """Take the hooks registered so far in the open transaction (the caller runs or drops them)."""
+    return _commit_hooks.pop(id(conn), [])
+
+
+def _run_commit_hooks(hooks: List[Callable[[], None]]) -> None:
+    # the data is already committed: every hook runs, the first error is raised afterwards
+    error = None
+    for fn in hooks:
+        try:
+            fn()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+
+
+def _is_locked(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection):
+    """
+    BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error), with the retries of lock_policy.
+    Inside an already open transaction it just joins it (the outer one commits).
+    The after_commit hooks run after COMMIT; a ROLLBACK drops them.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    t0 = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            break
+        except sqlite3.OperationalError as e:
+            if not _is_locked(e) or attempt >= lock_policy.retries:
+                if _is_locked(e):
+                    lock_policy.record((time.perf_counter() - t0) * 1000, attempt, True)
+                    raise RuntimeError(LOCKED_MSG) from e
+                raise
+            attempt += 1
+            time.sleep(lock_policy.backoff(attempt))
+    lock_policy.record((time.perf_counter() - t0) * 1000, attempt, False)
+    pop_commit_hooks(conn)   # leftovers of a transaction not opened here (never committed by us)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        pop_commit_hooks(conn)
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    _run_commit_hooks(pop_commit_hooks(conn))
+
+# ------------------------------- CONNECTION MANAGER ---------------------------------
+# connect() is cheap to call but not free: a new file handle, the three PRAGMAs above and
+# the decltypes setup on every call. The service used to call it for every barcode scan and
+# never closed the result, so a full shift leaked thousands of handles.
+#
+# ConnectionManager keeps ONE long-lived connection per thread (sqlite3 connections must not
+# be shared between threads while in use), opened lazily with the PRAGMAs applied once.
+#   - get()        → the connection of the calling thread (created on first use)
+#   - close_all()  → closes every connection it has handed out (call it on shutdown)
+# The connections are opened with check_same_thread=False ONLY so that close_all() can close
+# them from the main thread; each one is still used by a single thread.
+# Connections are keyed by threading.get_ident(), not kept in a threading.local: PySide runs each
+# QRunnable of a QThreadPool with a fresh Python thread state, so a thread-local is empty again on
+# the next task of the same worker thread and every UI read/write used to open (and leak) a new one.
+
+class ConnectionManager:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._all: dict[int, sqlite3.Connection] = {}   # thread ident → connection
+        self._closed = False
+
+    def get(self) -> sqlite3.Connection:
+        key = threading.get_ident()
+        conn = self._all.get(key)
+        if conn is None:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("ConnectionManager este închis.")
+                conn = connect(self.db_path, check_same_thread=False)
+                self._all[key] = conn
+        return conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            conns, self._all = list(self._all.values()), {}
+            self._closed = True
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._all)
+
 # ---------------------------------- INTEGRITY CHECK -----------------------------------
 # PRAGMA intergrity check returns a table with 1 column and 1 row (can be either 'ok' or 'error')
 # fetchone takes only one row from the querry result
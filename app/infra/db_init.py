@@ -1,4 +1,7 @@
 from .db import connect
+from .migrations import Migration, migrate, run_script
+from .balances import balances_need_backfill, rebuild_stock_balances
+from .product_search import ensure_product_fts
 
 SCHEMA_SQL = """
 PRAGMA foreign_keys=ON;
@@ -21,6 +24,8 @@ CREATE TABLE IF NOT EXISTS products (
   updated_at DATETIME,
   version INTEGER NOT NULL DEFAULT 1
 );
+-- lista de stoc e ordonată/paginată după denumire → ORDER BY name ... LIMIT fără sortare completă
+CREATE INDEX IF NOT EXISTS ix_products_name ON products(name);
 
 -- Batches (loturi) for traceability or expiring date
 -- FK with ON DELETE CASCADE, so if you delete the product the batch is deleted as well
@@ -111,39 +116,78 @@ CREATE TABLE IF NOT EXISTS sequences (
 );
 INSERT OR IGNORE INTO sequences(name, value) VALUES ('ean_internal', 100000);
 
+-- =========================
+-- STOCK BALANCES (materializate)
+-- =========================
+-- Soldul curent ținut la zi incremental de triggerele de pe movements (mai jos),
+-- ca să nu mai facem SUM peste tot registrul la fiecare citire de stoc.
+-- Se pot reconstrui oricând din registru: python -m app.infra.balances --repair
+CREATE TABLE IF NOT EXISTS stock_balance_product (
+  product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+  qty_base INTEGER NOT NULL DEFAULT 0,            -- stoc total (toate loturile)
+  unbatched_qty_base INTEGER NOT NULL DEFAULT 0   -- doar mișcările fără lot (batch_id IS NULL)
+);
+
+CREATE TABLE IF NOT EXISTS stock_balance_batch (
+  batch_id INTEGER PRIMARY KEY REFERENCES batches(id) ON DELETE CASCADE,
+  product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+  qty_base INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_stock_balance_batch_product ON stock_balance_batch(product_id, qty_base);
+
+-- Închidere de perioadă (app.infra.period_close): mișcările mai vechi de cut-off se mută în arhivă,
+-- iar suma lor rămâne aici ca sold de deschidere per (produs, lot). Sold = deschidere + mișcări recente.
+CREATE TABLE IF NOT EXISTS stock_opening_balances (
+  product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+  batch_id INTEGER REFERENCES batches(id) ON DELETE SET NULL,   -- NULL = fără lot (ca în movements)
+  qty_base INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_stock_opening_product ON stock_opening_balances(product_id, batch_id);
+
+CREATE TABLE IF NOT EXISTS period_closes (
+  id INTEGER PRIMARY KEY,
+  cutoff DATETIME NOT NULL,            -- tot ce e strict înainte e în arhivă
+  closed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  archive_path TEXT NOT NULL,
+  movements INTEGER NOT NULL,
+  receipts INTEGER NOT NULL,
+  receipt_lines INTEGER NOT NULL
+);
+
 -- =========================
 -- VIEWS
 -- =========================
-CREATE VIEW IF NOT EXISTS current_stock_per_product AS
+DROP VIEW IF EXISTS current_stock_per_product;
+DROP VIEW IF EXISTS current_stock_per_batch;
+DROP VIEW IF EXISTS expiring_soon;
+
+CREATE VIEW current_stock_per_product AS
 SELECT
   p.id AS product_id,
   p.name AS product_name,
   p.barcode AS barcode,
-  COALESCE(SUM(m.quantity_base),0) AS stock_qty_base
+  COALESCE(sb.qty_base,0) AS stock_qty_base
 FROM products p
-LEFT JOIN movements m ON m.product_id = p.id
-GROUP BY p.id;
+LEFT JOIN stock_balance_product sb ON sb.product_id = p.id;
 
-CREATE VIEW IF NOT EXISTS current_stock_per_batch AS
+CREATE VIEW current_stock_per_batch AS
 SELECT
   b.id AS batch_id,
   b.product_id,
   b.expiry_date,
-  COALESCE(SUM(m.quantity_base),0) AS stock_qty_base
+  COALESCE(sb.qty_base,0) AS stock_qty_base
 FROM batches b
-LEFT JOIN movements m ON m.batch_id = b.id
-GROUP BY b.id;
+LEFT JOIN stock_balance_batch sb ON sb.batch_id = b.id;
 
-CREATE VIEW IF NOT EXISTS expiring_soon AS
+CREATE VIEW expiring_soon AS
 SELECT
   b.id AS batch_id,
   b.product_id,
   b.expiry_date,
-  COALESCE(SUM(m.quantity_base),0) AS stock_qty_base
+  sb.qty_base AS stock_qty_base
 FROM batches b
-LEFT JOIN movements m ON m.batch_id = b.id
-GROUP BY b.id
-HAVING COALESCE(SUM(m.quantity_base),0) > 0 AND expiry_date IS NOT NULL;
+JOIN stock_balance_batch sb ON sb.batch_id = b.id
+WHERE sb.qty_base > 0 AND b.expiry_date IS NOT NULL;
 
 -- =========================
 -- TRIGGERS (updated_at/version) - minimal
@@ -174,10 +218,143 @@ BEGIN
     version    = OLD.version + 1
   WHERE id = NEW.id;
 END;
+
+-- =========================
+-- TRIGGERS (stock balances)
+-- =========================
+-- La ștergere folosim UPDATE (nu upsert): dacă produsul/lotul e șters în cascadă,
+-- rândul de sold poate să fi dispărut deja și nu trebuie recreat.
+DROP TRIGGER IF EXISTS trg_movements_ai;
+DROP TRIGGER IF EXISTS trg_movements_ad;
+DROP TRIGGER IF EXISTS trg_movements_au;
+
+CREATE TRIGGER trg_movements_ai
+AFTER INSERT ON movements
+FOR EACH ROW
+BEGIN
+  INSERT INTO stock_balance_product(product_id, qty_base, unbatched_qty_base)
+  VALUES (NEW.product_id, NEW.quantity_base,
+          CASE WHEN NEW.batch_id IS NULL THEN NEW.quantity_base ELSE 0 END)
+  ON CONFLICT(product_id) DO UPDATE SET
+    qty_base = qty_base + excluded.qty_base,
+    unbatched_qty_base = unbatched_qty_base + excluded.unbatched_qty_base;
+
+  INSERT INTO stock_balance_batch(batch_id, product_id, qty_base)
+  SELECT NEW.batch_id, NEW.product_id, NEW.quantity_base
+  WHERE NEW.batch_id IS NOT NULL
+  ON CONFLICT(batch_id) DO UPDATE SET qty_base = qty_base + excluded.qty_base;
+END;
+
+CREATE TRIGGER trg_movements_ad
+AFTER DELETE ON movements
+FOR EACH ROW
+BEGIN
+  UPDATE stock_balance_product
+  SET qty_base = qty_base - OLD.quantity_base,
+      unbatched_qty_base = unbatched_qty_base
+                           - CASE WHEN OLD.batch_id IS NULL THEN OLD.quantity_base ELSE 0 END
+  WHERE product_id = OLD.product_id;
+
+  UPDATE stock_balance_batch
+  SET qty_base = qty_base - OLD.quantity_base
+  WHERE batch_id = OLD.batch_id;
+END;
+
+CREATE TRIGGER trg_movements_au
+AFTER UPDATE OF product_id, batch_id, quantity_base ON movements
+FOR EACH ROW
+BEGIN
+  UPDATE stock_balance_product
+  SET qty_base = qty_base - OLD.quantity_base,
+      unbatched_qty_base = unbatched_qty_base
+                           - CASE WHEN OLD.batch_id IS NULL THEN OLD.quantity_base ELSE 0 END
+  WHERE product_id = OLD.product_id;
+
+  UPDATE stock_balance_batch
+  SET qty_base = qty_base - OLD.quantity_base
+  WHERE batch_id = OLD.batch_id;
+
+  INSERT INTO stock_balance_product(product_id, qty_base, unbatched_qty_base)
+  VALUES (NEW.product_id, NEW.quantity_base,
+          CASE WHEN NEW.batch_id IS NULL THEN NEW.quantity_base ELSE 0 END)
+  ON CONFLICT(product_id) DO UPDATE SET
+    qty_base = qty_base + excluded.qty_base,
+    unbatched_qty_base = unbatched_qty_base + excluded.unbatched_qty_base;
+
+  INSERT INTO stock_balance_batch(batch_id, product_id, qty_base)
+  SELECT NEW.batch_id, NEW.product_id, NEW.quantity_base
+  WHERE NEW.batch_id IS NOT NULL
+  ON CONFLICT(batch_id) DO UPDATE SET qty_base = qty_base + excluded.qty_base;
+END;
+"""
+# Data de expirare normalizată (YYYY-MM-DD, NULL dacă lipsește sau e invalidă), calculată de SQLite:
+# intervalul de expirare se filtrează în WHERE pe index, fără parsare de date în Python.
+# Coloană generată VIRTUAL → se poate adăuga cu ALTER TABLE pe bazele existente, fără rescriere.
+EXPIRY_ISO_COLUMN = "expiry_iso TEXT GENERATED ALWAYS AS (date(expiry_date)) VIRTUAL"
+EXPIRY_ISO_INDEX_SQL = "CREATE INDEX IF NOT EXISTS ix_batches_expiry_iso ON batches(expiry_iso)"
+
+
+def _ensure_column(conn, table: str, column: str, ddl: str) -> bool:
+    """Adaugă coloana dacă lipsește (table_xinfo vede și coloanele generate). True dacă a fost adăugată."""
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_xinfo({table})")}
+    if column in cols:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {ddl}")
+    return True
+
+
+# ---------- MIGRĂRI ----------
+# SCHEMA_SQL de mai sus e schema de bază (v1): idempotentă (IF NOT EXISTS), deci se aplică și pe bazele
+# create înainte de user_version. Orice modificare ulterioară (index, coloană, tabelă, backfill) se adaugă
+# ca migrare nouă la sfârșitul listei – nu se editează SCHEMA_SQL și nici migrările deja livrate.
+
+def _m001_schema_initiala(conn):
+    run_script(conn, SCHEMA_SQL)
+    _ensure_column(conn, "batches", "expiry_iso", EXPIRY_ISO_COLUMN)
+    conn.execute(EXPIRY_ISO_INDEX_SQL)
+    # baze existente: tabelele de sold tocmai create sunt goale → le umplem din registru
+    if balances_need_backfill(conn):
+        rebuild_stock_balances(conn)
+    # index full-text pentru căutarea de produse (opțional: fără FTS5 se caută cu LIKE)
+    ensure_product_fts(conn)
+
+
+# v2: indexuri pe interogările reale (verificate cu EXPLAIN QUERY PLAN: tests/test_query_plans.py)
+#   - receipt_lines: căutarea liniei de cumulat la fiecare scanare (bon + produs + preț + TVA);
+#     prefixul receipt_id servește și restul interogărilor pe bon → vechiul index doar pe receipt_id pleacă
+#   - stock_in_lines: nu avea niciun index; acoperă GROUP BY-ul de la închiderea sesiunii
+#   - batches: lotul după (produs, cod) la intrări / import; parțial, loturile fără cod nu intră
+#   - receipts: parțiale – bonurile deschise (puține) și cele închise/anulate după dată (închiderea de
+#     perioadă); indexul complet pe status (3 valori) doar costa la fiecare bon
+INDEX_PACK_SQL = """
+CREATE INDEX IF NOT EXISTS ix_receipt_lines_merge ON receipt_lines(receipt_id, product_id, unit_price_cents, vat_rate);
+DROP INDEX IF EXISTS ix_receipt_lines_receipt;
+CREATE INDEX IF NOT EXISTS ix_stock_in_lines_session ON stock_in_lines(session_id, product_id, batch_id, quantity_base);
+CREATE INDEX IF NOT EXISTS ix_batches_product_lot ON batches(product_id, lot_code) WHERE lot_code IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_receipts_open ON receipts(opened_at) WHERE status='open';
+CREATE INDEX IF NOT EXISTS ix_receipts_done ON receipts(COALESCE(closed_at, opened_at)) WHERE status IN ('closed','void');
+DROP INDEX IF EXISTS ix_receipts_status;
 """
+
+
+def _m002_index_pack(conn):
+    run_script(conn, INDEX_PACK_SQL)
+
+
+MIGRATIONS = [
+    Migration(1, "schema inițială (solduri, expiry_iso, FTS)", _m001_schema_initiala),
+    Migration(2, "indexuri pe interogările calde", _m002_index_pack),
+]
+
+# Versiunea curentă a schemei (PRAGMA user_version); bazele la zi nu mai rulează nimic la pornire.
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
 def init_db(db_path: str):
     conn = connect(db_path)
-    with conn:
-        # rulează TOATA schema ca un singur script
-        conn.executescript(SCHEMA_SQL)
-    return conn
\ No newline at end of file
+    try:
+        migrate(conn, MIGRATIONS)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
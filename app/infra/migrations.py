@@ -0,0 +1,157 @@
+import argparse
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# ------------------------------ MIGRĂRI DE SCHEMĂ (PRAGMA user_version) ------------------------------
+# Fiecare modificare de schemă e o migrare numerotată (1, 2, 3, ...) din db_init.MIGRATIONS.
+# PRAGMA user_version din antetul bazei = ultima migrare aplicată; la pornire rulează doar cele mai noi.
+#   - fiecare migrare rulează într-o tranzacție proprie (BEGIN IMMEDIATE ... COMMIT), împreună cu
+#     actualizarea lui user_version → o migrare e aplicată complet sau deloc
+#   - DDL-ul e tranzacțional în SQLite, deci și dry_run e o rulare reală, urmată de ROLLBACK:
+#     timpii raportați sunt cei de la upgrade-ul adevărat
+#   - user_version se recitește după BEGIN IMMEDIATE: dacă mai multe case pornesc deodată, doar prima
+#     aplică migrarea, celelalte o găsesc deja aplicată și trec mai departe
+#   - backfill-urile mari (ex. umplerea tabelelor de sold) stau într-o migrare → rulează o singură dată
+# Nu folosim executescript: face COMMIT înainte de script, deci ar rupe tranzacția migrării.
+# Scripturile se împart în instrucțiuni cu split_sql și se rulează cu execute.
+#
+#   python -m app.infra.migrations [--db magazin.sqlite] [--status] [--dry-run] [--target N]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]   # rulează în tranzacția deschisă de migrate()
+
+
+def split_sql(script: str) -> List[str]:
+    """Împarte un script în instrucțiuni (corpurile BEGIN ... END ale triggerelor rămân întregi)."""
+    out, buf = [], ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip().strip(";").strip():
+                out.append(buf.strip())
+            buf = ""
+    if buf.strip():
+        out.append(buf.strip())
+    return out
+
+
+def run_script(conn: sqlite3.Connection, script: str) -> None:
+    """executescript fără COMMIT implicit: instrucțiunile rulează în tranzacția curentă."""
+    for stmt in split_sql(script):
+        conn.execute(stmt)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _check_order(migrations: Sequence[Migration]) -> None:
+    versions = [m.version for m in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise ValueError(f"Migrările trebuie numerotate consecutiv de la 1 (găsit: {versions}).")
+
+
+def pending(conn: sqlite3.Connection, migrations: Sequence[Migration],
+            target: Optional[int] = None) -> List[Migration]:
+    _check_order(migrations)
+    latest = migrations[-1].version if migrations else 0
+    version = current_version(conn)
+    if version > latest:
+        raise ValueError(f"Baza de date are schema v{version}, mai nouă decât aplicația (v{latest}). "
+                         "Actualizează aplicația.")
+    target = latest if target is None else target
+    if target < version:
+        raise ValueError(f"Nu se poate coborî schema de la v{version} la v{target}.")
+    return [m for m in migrations if version < m.version <= target]
+
+
+def migrate(conn: sqlite3.Connection, migrations: Sequence[Migration], *,
+            target: Optional[int] = None, dry_run: bool = False) -> List[Dict[str, Any]]:
+    """
+    Aplică migrările de după user_version (până la `target`, implicit ultima).
+    Întoarce raportul: [{version, name, duration_ms, status}], status = applied / dry_run.
+    Cu dry_run totul rulează într-o singură tranzacție anulată la final (baza rămâne neschimbată).
+    """
+    todo = pending(conn, migrations, target)
+    if not todo:
+        return []
+    if conn.in_transaction:
+        raise ValueError("Migrările trebuie pornite în afara unei tranzacții.")
+
+    report = []
+    if dry_run:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        for m in todo:
+            t0 = time.perf_counter()
+            if not dry_run:
+                conn.execute("BEGIN IMMEDIATE")
+                if current_version(conn) >= m.version:
+                    # altă casă (multi_client) a aplicat-o cât am așteptat lock-ul de scriere
+                    conn.rollback()
+                    continue
+            try:
+                m.apply(conn)
+                conn.execute(f"PRAGMA user_version={int(m.version)}")
+                if not dry_run:
+                    conn.commit()
+            except Exception as e:
+                if not dry_run:
+                    conn.rollback()
+                raise RuntimeError(f"Migrarea v{m.version} ({m.name}) a eșuat: {e}") from e
+            report.append({
+                "version": m.version,
+                "name": m.name,
+                "duration_ms": round((time.perf_counter() - t0) * 1000, 1),
+                "status": "dry_run" if dry_run else "applied",
+            })
+    finally:
+        if dry_run:
+            conn.rollback()
+    return report
+
+
+# ------------------------------------- CLI -------------------------------------
+# python -m app.infra.migrations --status      → versiunea bazei și migrările în așteptare
+# python -m app.infra.migrations --dry-run     → rulează migrările, raportează timpii, apoi ROLLBACK
+# python -m app.infra.migrations [--target N]  → aplică migrările (până la N)
+def main(argv=None) -> int:
+    from ..util.config import load_config
+    from .db import connect
+    from .db_init import MIGRATIONS
+
+    ap = argparse.ArgumentParser(description="Aplică migrările de schemă (PRAGMA user_version).")
+    ap.add_argument("--db", default=None, help="calea bazei (implicit: db_path din config.json)")
+    ap.add_argument("--status", action="store_true", help="doar afișează versiunea și ce e de aplicat")
+    ap.add_argument("--dry-run", action="store_true", help="rulează și anulează (timpi, fără modificări)")
+    ap.add_argument("--target", type=int, default=None, help="versiunea până la care se migrează")
+    args = ap.parse_args(argv)
+
+    conn = connect(args.db or load_config()["db_path"])
+    try:
+        todo = pending(conn, MIGRATIONS, args.target)
+        print(f"Schema bazei: v{current_version(conn)}, aplicația: v{MIGRATIONS[-1].version}.")
+        if args.status or not todo:
+            for m in todo:
+                print(f"  în așteptare: v{m.version} {m.name}")
+            return 0
+        t0 = time.perf_counter()
+        for r in migrate(conn, MIGRATIONS, target=args.target, dry_run=args.dry_run):
+            print(f"  v{r['version']:<3} {r['name']:<40} {r['duration_ms']:>10.1f} ms  {r['status']}")
+        print(f"Total {(time.perf_counter() - t0):.2f}s" + (" (dry run: nimic salvat)" if args.dry_run else ""))
+        return 0
+    except (ValueError, RuntimeError) as e:
+        print(e)
+        return 2
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,244 @@
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, Optional
+
+from .balances import verify_stock_balances
+from .db import write_transaction
+
+# ------------------------------ ÎNCHIDERE DE PERIOADĂ (compactarea registrului) ------------------------------
+# movements e append-only, deci orice recalculare de stoc crește cu toată istoria magazinului.
+# close_period(conn, cutoff, archive_path), într-o singură tranzacție:
+#   1) suma mișcărilor cu ts < cutoff, per (produs, lot) → adunată în stock_opening_balances
+#   2) mișcările respective + bonurile închise/anulate (cu liniile lor) → copiate în baza de arhivă
+#      (ATTACH la cerere) și șterse din baza curentă
+#   3) triggerele de pe movements scad din solduri ce s-a șters; adăugăm înapoi aceeași sumă,
+#      deci soldurile materializate nu se schimbă: sold = deschidere + mișcări recente
+#   4) o linie în period_closes
+# Arhiva are aceleași coloane (fără FK); inserarea e INSERT OR IGNORE pe id, așa că o închidere
+# întreruptă între commit-ul arhivei și cel al bazei principale (WAL → nu e atomic între fișiere)
+# se poate relua fără dubluri.
+#
+# Pentru audit: with attached_archive(conn, path): ... SELECT ... FROM all_movements / all_receipts
+
+ARCHIVE_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS archive.movements (
+  id INTEGER PRIMARY KEY,
+  uuid TEXT,
+  ts DATETIME NOT NULL,
+  product_id INTEGER NOT NULL,
+  batch_id INTEGER,
+  quantity_base INTEGER NOT NULL,
+  reason TEXT NOT NULL,
+  receipt_id INTEGER,
+  note TEXT
+);
+CREATE INDEX IF NOT EXISTS archive.ix_movements_product_ts ON movements(product_id, ts);
+CREATE INDEX IF NOT EXISTS archive.ix_movements_batch ON movements(batch_id);
+
+CREATE TABLE IF NOT EXISTS archive.receipts (
+  id INTEGER PRIMARY KEY,
+  uuid TEXT,
+  opened_at DATETIME NOT NULL,
+  closed_at DATETIME,
+  status TEXT NOT NULL,
+  total_cached_cents INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS archive.receipt_lines (
+  id INTEGER PRIMARY KEY,
+  receipt_id INTEGER NOT NULL,
+  product_id INTEGER NOT NULL,
+  qty_base INTEGER NOT NULL,
+  unit_price_cents INTEGER NOT NULL,
+  vat_rate INTEGER NOT NULL,
+  line_total_cents INTEGER NOT NULL,
+  created_at DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archive.ix_receipt_lines_receipt ON receipt_lines(receipt_id);
+"""
+
+MOVEMENT_COLUMNS = "id, uuid, ts, product_id, batch_id, quantity_base, reason, receipt_id, note"
+RECEIPT_COLUMNS = "id, uuid, opened_at, closed_at, status, total_cached_cents"
+RECEIPT_LINE_COLUMNS = "id, receipt_id, product_id, qty_base, unit_price_cents, vat_rate, line_total_cents, created_at"
+
+# bonuri de mutat: închise/anulate înainte de cut-off (cele deschise rămân, indiferent de vârstă)
+OLD_RECEIPTS_WHERE = "status IN ('closed','void') AND COALESCE(closed_at, opened_at) < :cutoff"
+
+AUDIT_VIEWS_SQL = f"""
+CREATE TEMP VIEW IF NOT EXISTS all_movements AS
+  SELECT {MOVEMENT_COLUMNS} FROM archive.movements
+  UNION ALL
+  SELECT {MOVEMENT_COLUMNS} FROM main.movements;
+CREATE TEMP VIEW IF NOT EXISTS all_receipts AS
+  SELECT {RECEIPT_COLUMNS} FROM archive.receipts
+  UNION ALL
+  SELECT {RECEIPT_COLUMNS} FROM main.receipts;
+CREATE TEMP VIEW IF NOT EXISTS all_receipt_lines AS
+  SELECT {RECEIPT_LINE_COLUMNS} FROM archive.receipt_lines
+  UNION ALL
+  SELECT {RECEIPT_LINE_COLUMNS} FROM main.receipt_lines;
+"""
+
+
+def _cutoff_text(cutoff) -> str:
+    if isinstance(cutoff, datetime):
+        return cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(cutoff, date):
+        return cutoff.isoformat()
+    try:
+        return date.fromisoformat(str(cutoff)).isoformat()
+    except ValueError:
+        raise ValueError(f"Dată de închidere invalidă: {cutoff} (format AAAA-LL-ZZ).")
+
+
+@contextmanager
+def attached_archive(conn: sqlite3.Connection, archive_path: str) -> Iterator[sqlite3.Connection]:
+    """ATTACH arhiva ca `archive` (o creează dacă lipsește) + vederile temporare all_movements / all_receipts."""
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+    try:
+        conn.executescript(ARCHIVE_SCHEMA_SQL + AUDIT_VIEWS_SQL)
+        yield conn
+    finally:
+        conn.executescript("""
+            DROP VIEW IF EXISTS temp.all_movements;
+            DROP VIEW IF EXISTS temp.all_receipts;
+            DROP VIEW IF EXISTS temp.all_receipt_lines;
+        """)
+        conn.execute("DETACH DATABASE archive")
+
+
+def last_cutoff(conn: sqlite3.Connection) -> Optional[str]:
+    row = conn.execute("SELECT MAX(cutoff) FROM period_closes").fetchone()
+    return row[0] if row else None
+
+
+def close_period(conn: sqlite3.Connection, cutoff, archive_path: str) -> Dict[str, Any]:
+    """Mută în arhivă registrul dinainte de `cutoff` (dată); întoarce ce s-a mutat."""
+    cut = _cutoff_text(cutoff)
+    if cut > date.today().isoformat():
+        raise ValueError("Nu se poate închide o perioadă în viitor.")
+    prev = last_cutoff(conn)
+    if prev is not None and cut <= str(prev):
+        raise ValueError(f"Perioada până la {prev} este deja închisă.")
+    if conn.in_transaction:
+        raise ValueError("Închiderea de perioadă trebuie pornită în afara unei tranzacții.")
+
+    t0 = time.perf_counter()
+    params = {"cutoff": cut}
+    with attached_archive(conn, archive_path):
+        with write_transaction(conn):   # BEGIN IMMEDIATE: nimic nu se scrie între calculul sumelor și ștergere
+            # 1) ce se mută, per (produs, lot)
+            conn.execute("DROP TABLE IF EXISTS temp.close_delta")
+            conn.execute("""
+                CREATE TEMP TABLE close_delta AS
+                SELECT product_id, batch_id, SUM(quantity_base) AS qty_base
+                FROM main.movements
+                WHERE ts < :cutoff
+                GROUP BY product_id, batch_id
+            """, params)
+
+            # 2) copiere în arhivă
+            n_mov = conn.execute(f"""
+                INSERT OR IGNORE INTO archive.movements({MOVEMENT_COLUMNS})
+                SELECT {MOVEMENT_COLUMNS} FROM main.movements WHERE ts < :cutoff
+            """, params).rowcount
+            n_rec = conn.execute(f"""
+                INSERT OR IGNORE INTO archive.receipts({RECEIPT_COLUMNS})
+                SELECT {RECEIPT_COLUMNS} FROM main.receipts WHERE {OLD_RECEIPTS_WHERE}
+            """, params).rowcount
+            n_lines = conn.execute(f"""
+                INSERT OR IGNORE INTO archive.receipt_lines({RECEIPT_LINE_COLUMNS})
+                SELECT {RECEIPT_LINE_COLUMNS} FROM main.receipt_lines
+                WHERE receipt_id IN (SELECT id FROM main.receipts WHERE {OLD_RECEIPTS_WHERE})
+            """, params).rowcount
+
+            # ... și ștergere din baza curentă (receipt_lines pleacă în cascadă cu bonurile)
+            conn.execute("DELETE FROM main.movements WHERE ts < :cutoff", params)
+            conn.execute(f"DELETE FROM main.receipts WHERE {OLD_RECEIPTS_WHERE}", params)
+
+            # 3) soldul de deschidere preia exact ce s-a șters → soldurile materializate rămân aceleași
+            conn.execute("""
+                CREATE TEMP TABLE close_opening AS
+                SELECT product_id, batch_id, SUM(qty_base) AS qty_base
+                FROM (SELECT product_id, batch_id, qty_base FROM main.stock_opening_balances
+                      UNION ALL
+                      SELECT product_id, batch_id, qty_base FROM temp.close_delta)
+                GROUP BY product_id, batch_id
+            """)
+            conn.execute("DELETE FROM main.stock_opening_balances")
+            conn.execute("""
+                INSERT INTO main.stock_opening_balances(product_id, batch_id, qty_base)
+                SELECT product_id, batch_id, qty_base FROM temp.close_opening WHERE qty_base <> 0
+            """)
+            conn.execute("""
+                UPDATE main.stock_balance_product AS sb
+                SET qty_base = sb.qty_base + d.qty_base,
+                    unbatched_qty_base = sb.unbatched_qty_base + d.unbatched_qty_base
+                FROM (SELECT product_id, SUM(qty_base) AS qty_base,
+                             SUM(CASE WHEN batch_id IS NULL THEN qty_base ELSE 0 END) AS unbatched_qty_base
+                      FROM temp.close_delta GROUP BY product_id) AS d
+                WHERE sb.product_id = d.product_id
+            """)
+            conn.execute("""
+                UPDATE main.stock_balance_batch AS sb
+                SET qty_base = sb.qty_base + d.qty_base
+                FROM temp.close_delta AS d
+                WHERE sb.batch_id = d.batch_id
+            """)
+            conn.execute("DROP TABLE temp.close_delta")
+            conn.execute("DROP TABLE temp.close_opening")
+
+            # 4) jurnal
+            conn.execute("""
+                INSERT INTO main.period_closes(cutoff, archive_path, movements, receipts, receipt_lines)
+                VALUES (?,?,?,?,?)
+            """, (cut, os.path.abspath(archive_path), n_mov, n_rec, n_lines))
+
+    return {
+        "cutoff": cut,
+        "archive_path": os.path.abspath(archive_path),
+        "movements": n_mov,
+        "receipts": n_rec,
+        "receipt_lines": n_lines,
+        "duration_s": round(time.perf_counter() - t0, 3),
+    }
+
+
+# ------------------------------------- CLI -------------------------------------
+# python -m app.infra.period_close --before 2025-01-01 --archive arhiva_2024.sqlite [--vacuum]
+def main(argv=None) -> int:
+    from ..util.config import load_config
+
+    ap = argparse.ArgumentParser(description="Închide perioada: mută registrul vechi într-o bază de arhivă.")
+    ap.add_argument("--db", default=None, help="calea bazei (implicit: db_path din config.json)")
+    ap.add_argument("--before", required=True, help="data de închidere AAAA-LL-ZZ (exclusiv)")
+    ap.add_argument("--archive", required=True, help="fișierul de arhivă (se creează dacă lipsește)")
+    ap.add_argument("--vacuum", action="store_true", help="VACUUM după mutare (micșorează fișierul)")
+    args = ap.parse_args(argv)
+
+    from .db_init import init_db   # schema la zi (period_closes / stock_opening_balances)
+    conn = init_db(args.db or load_config()["db_path"])
+    try:
+        res = close_period(conn, args.before, args.archive)
+        print(f"Mutate în {res['archive_path']}: {res['movements']} mișcări, {res['receipts']} bonuri, "
+              f"{res['receipt_lines']} linii de bon ({res['duration_s']:.1f}s).")
+        diffs = verify_stock_balances(conn)
+        if diffs:
+            print(f"ATENȚIE: {len(diffs)} diferențe de sold după închidere (python -m app.infra.balances).")
+            return 1
+        if args.vacuum:
+            conn.execute("VACUUM")
+        return 0
+    except ValueError as e:
+        print(e)
+        return 2
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+import re
+import sqlite3
+
+from .migrations import run_script
+
+# ------------------------------ PRODUCT SEARCH INDEX (FTS5) ------------------------------
+# LIKE '%text%' nu poate folosi niciun index și nu găsește "pâine" când cauți "paine".
+# products_fts e un index full-text peste products(name, barcode, internal_sku):
+#   - content='products' → nu dublăm textul, FTS ține doar indexul (rowid = products.id)
+#   - unicode61 remove_diacritics 2 → "paine" = "pâine", "sunca" = "Șuncă", fără diferență mari/mici
+#   - ținut la zi de triggerele de mai jos (insert / delete / update pe coloanele indexate)
+#
+# FTS5 e compilat în aproape toate build-urile SQLite, dar nu garantat; dacă lipsește,
+# ensure_product_fts() nu face nimic și serviciul revine la căutarea cu LIKE.
+
+FTS_SCHEMA_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+  name, barcode, internal_sku,
+  content='products', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2'
+);
+
+DROP TRIGGER IF EXISTS trg_products_fts_ai;
+DROP TRIGGER IF EXISTS trg_products_fts_ad;
+DROP TRIGGER IF EXISTS trg_products_fts_au;
+
+CREATE TRIGGER trg_products_fts_ai
+AFTER INSERT ON products
+FOR EACH ROW
+BEGIN
+  INSERT INTO products_fts(rowid, name, barcode, internal_sku)
+  VALUES (NEW.id, NEW.name, NEW.barcode, NEW.internal_sku);
+END;
+
+CREATE TRIGGER trg_products_fts_ad
+AFTER DELETE ON products
+FOR EACH ROW
+BEGIN
+  INSERT INTO products_fts(products_fts, rowid, name, barcode, internal_sku)
+  VALUES ('delete', OLD.id, OLD.name, OLD.barcode, OLD.internal_sku);
+END;
+
+CREATE TRIGGER trg_products_fts_au
+AFTER UPDATE OF name, barcode, internal_sku ON products
+FOR EACH ROW
+BEGIN
+  INSERT INTO products_fts(products_fts, rowid, name, barcode, internal_sku)
+  VALUES ('delete', OLD.id, OLD.name, OLD.barcode, OLD.internal_sku);
+  INSERT INTO products_fts(rowid, name, barcode, internal_sku)
+  VALUES (NEW.id, NEW.name, NEW.barcode, NEW.internal_sku);
+END;
+"""
+
+# ponderi bm25 pe coloane: potrivirea în denumire contează cel mai mult
+BM25_WEIGHTS = "10.0, 5.0, 5.0"
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    return bool(conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+
+
+def has_product_fts(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='products_fts'"
+    ).fetchone() is not None
+
+
+def ensure_product_fts(conn: sqlite3.Connection) -> bool:
+    """
+    Creează indexul + triggerele (idempotent), în tranzacția apelantului (migrarea de schemă).
+    La prima creare indexează produsele existente.
+    """
+    if not fts5_available(conn):
+        return False
+    existed = has_product_fts(conn)
+    run_script(conn, FTS_SCHEMA_SQL)
+    if not existed:
+        rebuild_product_fts(conn)
+    return True
+
+
+def rebuild_product_fts(conn: sqlite3.Connection) -> None:
+    conn.execute("INSERT INTO products_fts(products_fts) VALUES('rebuild')")
+
+
+def fts_match_query(text: str) -> str | None:
+    """
+    Transformă textul tastat într-o interogare FTS5: fiecare cuvânt devine prefix ("pai"*),
+    toate cuvintele trebuie să apară (AND implicit). None dacă nu rămâne niciun cuvânt.
+    """
+    terms = re.findall(r"\w+", text or "")
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
@@ -0,0 +1,80 @@
+from typing import Dict, List, Tuple, Any
+
+# ------------------------------ FIFO ALLOCATION (set-based) ------------------------------
+# finalize_receipt consuma stocul linie cu linie: pentru fiecare linie un SELECT agregat pe loturi,
+# INSERT-uri una câte una și încă un SELECT pentru stocul fără lot — totul în tranzacția de scriere.
+#
+# Aici aceeași regulă, dar în trei pași:
+#   1) load_receipt_stock  → o singură interogare: soldurile loturilor (stoc > 0) + stocul fără lot
+#                            pentru TOATE produsele din bon, deja în ordinea FIFO
+#   2) allocate_fifo       → împărțirea pe loturi în memorie (fără SQL)
+#   3) apelantul scrie toate mișcările 'sale' cu un singur executemany
+#
+# Ordinea FIFO (neschimbată): loturile cu expirare (cea mai apropiată întâi) → loturile fără expirare
+# → la final stocul fără lot (batch_id NULL), folosit doar dacă acoperă tot restul liniei.
+
+INSUFFICIENT_STOCK = "Stoc insuficient pentru unul dintre produse."
+
+# un rând per lot cu stoc > 0 (sau un singur rând cu batch_id NULL dacă produsul nu are loturi),
+# stocul fără lot vine pe fiecare rând din stock_balance_product
+RECEIPT_STOCK_SQL = """
+    SELECT sp.product_id, sp.unbatched_qty_base, sb.batch_id, sb.qty_base
+    FROM stock_balance_product sp
+    LEFT JOIN stock_balance_batch sb ON sb.product_id = sp.product_id AND sb.qty_base > 0
+    LEFT JOIN batches b ON b.id = sb.batch_id
+    WHERE sp.product_id IN (SELECT product_id FROM receipt_lines WHERE receipt_id=?)
+    ORDER BY sp.product_id, (b.expiry_date IS NULL), b.expiry_date ASC, b.id ASC
+"""
+
+
+def load_receipt_stock(conn, receipt_id: int) -> Tuple[Dict[int, List[List[int]]], Dict[int, int]]:
+    """
+    Returnează (batches, unbatched):
+      batches[product_id]   = [[batch_id, stock_base], ...] în ordinea FIFO
+      unbatched[product_id] = stocul fără lot
+    """
+    batches: Dict[int, List[List[int]]] = {}
+    unbatched: Dict[int, int] = {}
+    for pid, unbatched_qty, batch_id, qty_base in conn.execute(RECEIPT_STOCK_SQL, (receipt_id,)):
+        unbatched[pid] = int(unbatched_qty or 0)
+        if batch_id is not None:
+            batches.setdefault(pid, []).append([batch_id, int(qty_base)])
+    return batches, unbatched
+
+
+def allocate_fifo(
+    items: List[Tuple[int, int]],
+    batches: Dict[int, List[List[int]]],
+    unbatched: Dict[int, int],
+) -> List[Tuple[int, Any, int]]:
+    """
+    items = [(product_id, qty_base), ...] în ordinea liniilor din bon.
+    Returnează mișcările de vânzare [(product_id, batch_id|None, -qty_base), ...] în ordinea în care
+    trebuie inserate. Modifică `batches` / `unbatched` pe loc (soldurile rămase după alocare).
+    Ridică ValueError dacă o linie nu poate fi acoperită.
+    """
+    moves: List[Tuple[int, Any, int]] = []
+    for product_id, qty_base in items:
+        remaining = int(qty_base)
+
+        # 1) loturi cu stoc > 0, în ordinea FIFO
+        for lot in batches.get(product_id, ()):
+            if remaining <= 0:
+                break
+            take = min(remaining, lot[1])
+            if take > 0:
+                moves.append((product_id, lot[0], -take))
+                lot[1] -= take
+                remaining -= take
+
+        # 2) fallback: stoc fără lot, doar dacă acoperă tot restul
+        if remaining > 0:
+            s_null = unbatched.get(product_id, 0)
+            if s_null >= remaining:
+                moves.append((product_id, None, -remaining))
+                unbatched[product_id] = s_null - remaining
+                remaining = 0
+
+        if remaining > 0:
+            raise ValueError(INSUFFICIENT_STOCK)
+    return moves
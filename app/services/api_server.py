@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import base64
+import functools
+import hmac
+import inspect
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .use_cases import InventoryService
+
+# ------------------------------ SERVER HTTP/JSON (config.json: "db_mode": "server") ------------------------------
+# Un singur proces (PC-ul de la back-office) deschide magazin.sqlite; casele (db_mode "remote") vorbesc cu el
+# prin HTTP (services.remote_service.RemoteInventoryService), deci nu se mai bat pe lock-ul fișierului.
+#
+#   POST /api/<metodă>   corp JSON = argumentele metodei InventoryService (după nume) → 200 {"result": ...}
+#   GET  /health         → {"ok": true}
+# Erorile: ValueError → 400, RuntimeError → 409 (ex. bază ocupată), metodă / argumente greșite → 404 / 400,
+# altceva → 500; corpul e {"error": mesaj, "type": "ValueError" | "RuntimeError" | ...}.
+#
+#   - asyncio pentru rețea (conexiuni keep-alive, HTTP/1.1 fără chunked), serviciul rulează pe thread-uri:
+#   - citirile (READ_METHODS) în paralel, pe un pool de read_threads thread-uri (fiecare cu conexiunea lui)
+#   - scrierile (WRITE_METHODS) pe UN singur thread: coada executorului le ține în ordinea sosirii,
+#     serverul e singurul writer al bazei
+#   - import_stock_in_file primește fișierul în corp ({"session_id", "filename", "content_b64"}):
+#     calea de pe casă nu există pe server
+#   - cu group_commit_ms > 0 scrierile trec prin services.group_commit.GroupCommitWriter: cele sosite
+#     în aceeași fereastră împart un COMMIT durabil (fsync), fiecare cu rezultatul / excepția ei
+#   - cu api_token setat, cererile trebuie să aibă antetul "Authorization: Bearer <token>"
+#
+#   python -m app.services.api_server [--db magazin.sqlite] [--listen 0.0.0.0:8080] [--read-threads 4]
+#                                     [--group-commit-ms 2]
+
+READ_METHODS = (
+    "find_product_by_barcode", "search_products", "get_stock_list", "get_stock_products",
+    "count_stock_products", "get_product_batches", "get_expiring_batches",
+    "get_receipt", "get_open_receipts", "get_stock_in_summary", "get_stock_in_lines",
+)
+WRITE_METHODS = (
+    "create_product", "get_or_create_product", "update_product_price",
+    "start_stock_in_session", "add_stock_in_line", "update_stock_in_line", "delete_stock_in_line",
+    "import_stock_in_file", "close_stock_in_session", "discard_stock_in_session",
+    "open_receipt", "add_line_to_receipt", "add_lines_to_receipt", "remove_line",
+    "finalize_receipt", "void_receipt",
+)
+MAX_BODY = 20 * 1024 * 1024   # importurile de fișiere vin în corp (base64)
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def _json_default(o):
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    if isinstance(o, bytes):
+        return base64.b64encode(o).decode("ascii")
+    raise TypeError(f"{type(o).__name__} nu se poate trimite ca JSON")
+
+
+def parse_listen(url_or_addr: str, default_port: int = 8080) -> Tuple[str, int]:
+    """'http://0.0.0.0:8080' sau '0.0.0.0:8080' → (host, port)."""
+    parts = urlsplit(url_or_addr if "//" in url_or_addr else f"//{url_or_addr}")
+    return parts.hostname or "localhost", parts.port or default_port
+
+
+class ApiServer:
+    def __init__(self, svc: InventoryService, host: str = "localhost", port: int = 8080,
+                 read_threads: int = 4, token: str = "", group_commit_ms: float = 0):
+        self.svc = svc
+        self.host, self.port = host, port
+        self.token = token or ""
+        self._reads = ThreadPoolExecutor(read_threads, thread_name_prefix="api-read")
+        if group_commit_ms > 0:
+            # scrierile sosite în group_commit_ms intră într-un singur COMMIT (services.group_commit)
+            from .group_commit import GroupCommitWriter
+            self._writes = GroupCommitWriter(svc, window_ms=group_commit_ms)
+        else:
+            self._writes = ThreadPoolExecutor(1, thread_name_prefix="api-write")   # un singur writer → FIFO
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}   # conexiunile deschise
+        self._methods = {name: getattr(svc, name) for name in READ_METHODS + WRITE_METHODS}
+        self._methods["import_stock_in_file"] = self._import_upload
+        self._sigs = {name: inspect.signature(fn) for name, fn in self._methods.items()}
+
+    # ---------- pornire / oprire ----------
+    def start(self) -> "ApiServer":
+        """Pornește serverul pe un thread propriu; revine după ce portul e deschis (port 0 → unul liber)."""
+        self._thread = threading.Thread(target=self.serve_forever, name="api-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise RuntimeError(f"Serverul API nu a pornit pe {self.host}:{self.port}: {self._error}")
+        return self
+
+    def serve_forever(self) -> None:
+        try:
+            asyncio.run(self._serve())
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            if self._thread is None:   # apelat direct (CLI): eroarea ajunge la apelant
+                raise
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        await self._stopped.wait()   # până la stop() (sau Ctrl+C în CLI)
+
+    def stop(self) -> None:
+        """Nu mai acceptă cereri, termină cererile începute și scrierile din coadă."""
+        if self._loop is not None and self._server is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(timeout=30)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._writes.shutdown(wait=True)
+        self._reads.shutdown(wait=True)
+
+    async def _close(self) -> None:
+        self._server.close()
+        # conexiunile keep-alive inactive primesc EOF; o cerere în lucru își termină apelul (scrierea e completă)
+        for writer in self._clients.values():
+            writer.transport.close()
+        if self._clients:
+            await asyncio.wait(list(self._clients))
+        await self._server.wait_closed()
+        self._stopped.set()
+
+    # ---------- HTTP ----------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers: Dict[str, str] = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                size = int(headers.get("content-length") or 0)
+                if size > MAX_BODY:
+                    await self._send(writer, 413, {"error": "Cererea este prea mare."}, keep_alive=False)
+                    break
+                body = await reader.readexactly(size) if size else b""
+                status, payload = await self._dispatch(method, target, headers, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass   # clientul a închis conexiunea sau a trimis o cerere stricată
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        data = json.dumps(payload, default=_json_default, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Any]:
+        # comparație în timp constant: serverul ascultă și pentru alte PC-uri din rețea
+        if self.token and not hmac.compare_digest(headers.get("authorization", "").encode("utf-8"),
+                                                  f"Bearer {self.token}".encode("utf-8")):
+            return 401, {"error": "Token API lipsă sau greșit.", "type": "PermissionError"}
+        path = urlsplit(target).path
+        if path == "/health":
+            return 200, {"ok": True}
+        if not path.startswith("/api/"):
+            return 404, {"error": f"Adresă necunoscută: {path}", "type": "LookupError"}
+        name = path[len("/api/"):]
+        if name not in self._sigs:
+            return 404, {"error": f"Operație necunoscută: {name}", "type": "LookupError"}
+        if method != "POST":
+            return 405, {"error": "Folosește POST.", "type": "LookupError"}
+        try:
+            kwargs = json.loads(body or b"{}")
+            if not isinstance(kwargs, dict):
+                raise ValueError("corpul trebuie să fie un obiect JSON")
+            self._sigs[name].bind(**kwargs)   # argumente lipsă / în plus → 400, fără să atingă baza
+        except (ValueError, TypeError) as e:
+            return 400, {"error": f"Argumente greșite pentru {name}: {e}", "type": "TypeError"}
+
+        pool = self._writes if name in WRITE_METHODS else self._reads
+        try:
+            result = await self._loop.run_in_executor(pool, functools.partial(self._methods[name], **kwargs))
+        except ValueError as e:
+            return 400, {"error": str(e), "type": "ValueError"}
+        except RuntimeError as e:
+            return 409, {"error": str(e), "type": "RuntimeError"}
+        except Exception as e:   # trimis clientului, serverul merge mai departe
+            return 500, {"error": f"{type(e).__name__}: {e}", "type": type(e).__name__}
+        return 200, {"result": result}
+
+    def _import_upload(self, *, session_id: int, filename: str, content_b64: str) -> Dict[str, Any]:
+        # formatul e ales după extensie (csv / xlsx), deci fișierul temporar o păstrează
+        suffix = os.path.splitext(filename)[1]
+        fd, tmp = tempfile.mkstemp(suffix=suffix, prefix="import-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(base64.b64decode(content_b64))
+            return self.svc.import_stock_in_file(session_id, tmp)
+        finally:
+            os.unlink(tmp)
+
+
+# ------------------------------------- CLI -------------------------------------
+def main(argv=None) -> int:
+    from ..infra.db import lock_policy
+    from ..infra.db_init import init_db
+    from ..util.config import load_config
+
+    cfg = load_config()
+    ap = argparse.ArgumentParser(description="Server HTTP/JSON peste InventoryService.")
+    ap.add_argument("--db", default=None, help="calea bazei (implicit: db_path din config.json)")
+    ap.add_argument("--listen", default=None, help="host:port (implicit: din api_base_url)")
+    ap.add_argument("--read-threads", type=int, default=4)
+    ap.add_argument("--group-commit-ms", type=float, default=None,
+                    help="fereastra de group commit (implicit: group_commit_ms din config.json, 0 = oprit)")
+    args = ap.parse_args(argv)
+
+    db_path = args.db or cfg["db_path"]
+    host, port = parse_listen(args.listen or cfg["api_base_url"])
+    lock_policy.configure(cfg["multi_client"], cfg["busy_timeout_ms"], cfg["write_retries"])
+    init_db(db_path).close()
+    svc = InventoryService(db_path)
+    group_ms = cfg["group_commit_ms"] if args.group_commit_ms is None else args.group_commit_ms
+    server = ApiServer(svc, host, port, args.read_threads, cfg["api_token"], group_ms)
+    print(f"Server API pe http://{host}:{port} (baza {db_path}). Ctrl+C pentru oprire.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        svc.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
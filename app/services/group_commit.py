@@ -0,0 +1,159 @@
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..infra.db import pop_commit_hooks, write_transaction
+from .use_cases import InventoryService
+
+# ------------------------------ GROUP COMMIT (un writer, un COMMIT pentru mai multe comenzi) ------------------------------
+# Fiecare add_line_to_receipt / add_stock_in_line / remove_line e o tranzacție proprie → un COMMIT (și, cu
+# durabilitate, un fsync al WAL-ului) pentru fiecare scanare. Cu mai multe case pe același writer
+# (services.api_server, config.json: "group_commit_ms" > 0) comenzile se adună într-o singură tranzacție:
+#
+#   writer = GroupCommitWriter(svc, window_ms=2)
+#   fut = writer.submit(svc.add_line_to_receipt, rid, code, 1)   # Executor: run_in_executor(writer, ...)
+#   fut.result()                                                # după COMMIT
+#
+#   - un singur thread (cu conexiunea lui din ConnectionManager): prima comandă din coadă deschide
+#     BEGIN IMMEDIATE, apoi intră în aceeași tranzacție tot ce sosește în window_ms (cel mult max_batch)
+#   - fereastra se închide mai devreme când grupul a ajuns la mărimea celui anterior: casele așteaptă
+#     confirmarea înainte de următoarea scanare, deci după N comenzi de la N case nu mai vine nimic
+#     până la COMMIT; ce e deja în coadă intră oricum
+#   - fiecare comandă rulează într-un SAVEPOINT: dacă aruncă excepție, doar modificările ei din bază se
+#     anulează, apelantul ei primește excepția, celelalte merg mai departe (write_transaction din
+#     use_cases se alătură tranzacției deschise, nu face COMMIT)
+#   - rezultatele / excepțiile se livrează abia DUPĂ COMMIT; dacă COMMIT-ul eșuează, toate comenzile
+#     din grup primesc eroarea și modificările lor din bază se anulează
+#   - ROLLBACK-ul anulează doar baza de date. Efectele din afara ei (fișiere, stare în memorie) nu se
+#     fac direct în comandă, ci cu infra.db.after_commit: hook-urile fiecărei comenzi rulează după
+#     COMMIT-ul grupului și se aruncă dacă ea a fost anulată (SAVEPOINT) sau dacă grupul a eșuat;
+#     o eroare într-un hook ajunge doar la apelantul comenzii respective
+#   - durable=True: PRAGMA synchronous=FULL pe conexiunea writer-ului → fiecare COMMIT face fsync pe WAL,
+#     deci o comandă confirmată supraviețuiește și unei căderi de curent; costul fsync se împarte la grup
+#   - comenzile se execută în ordinea sosirii și văd ce au scris cele dinaintea lor din același grup
+#   - comenzile pe bonurile din memorie (services.receipt_buffer: scanare, ștergere, anulare) nu scriu în
+#     bază, iar efectul lor (memorie + jurnal) nu se poate anula cu ROLLBACK → rulează pe un thread
+#     separat, în afara grupului, și răspund imediat; finalize_receipt scrie în bază și intră în grup
+
+
+class GroupCommitWriter(Executor):
+    def __init__(self, svc: InventoryService, window_ms: float = 2.0, max_batch: int = 64, durable: bool = True):
+        self.svc = svc
+        self.window_ms = float(window_ms)
+        self.max_batch = int(max_batch)
+        self.durable = durable
+        self._queue: "queue.Queue[Optional[Tuple[Future, Callable, tuple, dict]]]" = queue.Queue()
+        self._shutdown = False
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.commands = 0
+        self.largest_batch = 0
+        self._expected = self.max_batch   # câte comenzi a avut grupul anterior (vezi _run)
+        self._direct = ThreadPoolExecutor(1, thread_name_prefix="group-commit-mem")   # bonuri din memorie
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    # ---------- Executor ----------
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Writer-ul este oprit.")
+            if self._in_memory(fn, args, kwargs):
+                return self._direct.submit(fn, *args, **kwargs)
+            fut: Future = Future()
+            self._queue.put((fut, fn, args, kwargs))
+        return fut
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """submit + așteptarea rezultatului (după COMMIT)."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+                self._queue.put(None)   # comenzile deja trimise se execută înainte de oprire
+        self._direct.shutdown(wait=wait)
+        if wait:
+            self._thread.join()
+
+    def _in_memory(self, fn: Callable, args: tuple, kwargs: dict) -> bool:
+        if isinstance(fn, functools.partial):   # ex. run_in_executor(writer, partial(...)) din api_server
+            fn, args, kwargs = fn.func, fn.args + args, {**fn.keywords, **kwargs}
+        return self.svc.in_memory_call(fn, args, kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"commits": self.commits, "commands": self.commands, "largest_batch": self.largest_batch,
+                "avg_batch": round(self.commands / self.commits, 2) if self.commits else 0.0}
+
+    # ---------- thread-ul writer ----------
+    def _run(self) -> None:
+        if self.durable:
+            self.svc._conn().execute("PRAGMA synchronous=FULL")
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.window_ms / 1000
+            while len(batch) < self.max_batch:
+                try:
+                    left = deadline - time.perf_counter()
+                    if left > 0 and len(batch) < self._expected:
+                        item = self._queue.get(timeout=left)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._expected = len(batch)
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Future, Callable, tuple, dict]]) -> None:
+        conn = self.svc._conn()
+        done: List[Tuple[Future, bool, Any, list]] = []
+        try:
+            with write_transaction(conn):
+                for fut, fn, args, kwargs in batch:
+                    if not fut.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT group_cmd")
+                    try:
+                        result = fn(*args, **kwargs)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO group_cmd")
+                        pop_commit_hooks(conn)       # efectele comenzii anulate nu se mai fac
+                        self.svc.products.clear()   # cache-ul poate ține ce s-a citit în comanda anulată
+                        done.append((fut, False, e, []))
+                    else:
+                        # hook-urile ei rulează după COMMIT-ul grupului (mai jos), nu la ieșirea din with
+                        done.append((fut, True, result, pop_commit_hooks(conn)))
+                    conn.execute("RELEASE group_cmd")
+        except Exception as e:   # BEGIN sau COMMIT eșuat → baza rămâne neschimbată, hook-urile se aruncă
+            if conn.in_transaction:
+                conn.rollback()
+            self.svc.products.clear()
+            for fut, _, _, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.commits += 1
+        self.commands += len(done)
+        self.largest_batch = max(self.largest_batch, len(done))
+        for fut, ok, payload, hooks in done:
+            for hook in hooks:
+                try:
+                    hook()
+                except Exception as e:   # datele comenzii sunt salvate; apelantul ei află că efectul a eșuat
+                    ok, payload = False, e
+            if ok:
+                fut.set_result(payload)
+            else:
+                fut.set_exception(payload)
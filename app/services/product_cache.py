@@ -0,0 +1,96 @@
+import threading
+from typing import Optional, Dict, Any
+
+# ------------------------------ PRODUCT CACHE (barcode → produs) ------------------------------
+# La casă, fiecare scanare căuta produsul de două ori (find_product_by_barcode + add_line_to_receipt).
+# Catalogul se schimbă rar, așa că îl ținem în memorie, cheie = codul de bare normalizat.
+#
+# Invalidare:
+#   - explicit, din serviciu: create_product / update_product_price → invalidate_*()
+#   - modificări făcute de ALTĂ conexiune (alt thread, alt proces, alt PC pe aceeași bază):
+#     PRAGMA data_version se schimbă → toate intrările devin "de verificat"; la următorul acces
+#     comparăm products.version (căutare pe cheia primară) și reîncărcăm doar ce s-a modificat.
+
+PRODUCT_BY_BARCODE_SQL = "SELECT * FROM products WHERE barcode=?"
+PRODUCT_VERSION_SQL = "SELECT version FROM products WHERE id=?"
+
+
+class ProductCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_barcode: Dict[str, Dict[str, Any]] = {}
+        self._gen: Dict[str, int] = {}          # generația la care a fost validată intrarea
+        self._barcode_by_id: Dict[int, str] = {}
+        self._generation = 0
+        self._data_versions: Dict[int, int] = {}  # id(conn) → ultimul PRAGMA data_version văzut
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def _check_external_changes(self, conn) -> None:
+        dv = conn.execute("PRAGMA data_version").fetchone()[0]
+        key = id(conn)
+        last = self._data_versions.get(key)
+        self._data_versions[key] = dv
+        # conexiune nouă (nu știm ce s-a schimbat înainte) sau scriere din altă conexiune
+        if last != dv:
+            self._generation += 1
+
+    def get(self, conn, barcode: str) -> Optional[Dict[str, Any]]:
+        barcode = (barcode or "").strip()
+        with self._lock:
+            self._check_external_changes(conn)
+            p = self._by_barcode.get(barcode)
+            if p is not None:
+                if self._gen[barcode] == self._generation:
+                    self.hits += 1
+                    return dict(p)
+                # altcineva a scris în bază între timp → verificăm versiunea produsului
+                self.revalidations += 1
+                row = conn.execute(PRODUCT_VERSION_SQL, (p["id"],)).fetchone()
+                if row is not None and row[0] == p["version"]:
+                    self._gen[barcode] = self._generation
+                    self.hits += 1
+                    return dict(p)
+                self._forget(barcode)
+
+            self.misses += 1
+            row = conn.execute(PRODUCT_BY_BARCODE_SQL, (barcode,)).fetchone()
+            if row is None:
+                return None
+            p = dict(row)
+            self._by_barcode[barcode] = p
+            self._gen[barcode] = self._generation
+            self._barcode_by_id[p["id"]] = barcode
+            return dict(p)
+
+    def _forget(self, barcode: str) -> None:
+        p = self._by_barcode.pop(barcode, None)
+        self._gen.pop(barcode, None)
+        if p is not None:
+            self._barcode_by_id.pop(p["id"], None)
+
+    def invalidate_barcode(self, barcode: str) -> None:
+        with self._lock:
+            self._forget((barcode or "").strip())
+
+    def invalidate_product(self, product_id: int) -> None:
+        with self._lock:
+            code = self._barcode_by_id.get(int(product_id))
+            if code is not None:
+                self._forget(code)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_barcode.clear()
+            self._gen.clear()
+            self._barcode_by_id.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._by_barcode),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+            }
@@ -0,0 +1,146 @@
+import argparse
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..infra.period_close import OLD_RECEIPTS_WHERE
+from . import use_cases as uc
+from .allocation import RECEIPT_STOCK_SQL
+from .product_cache import PRODUCT_BY_BARCODE_SQL, PRODUCT_VERSION_SQL
+from .stock_import import LOTS_BY_PRODUCTS_SQL, PRODUCTS_BY_BARCODES_SQL
+
+# ------------------------------ VERIFICAREA PLANURILOR DE EXECUȚIE ------------------------------
+# Interogările calde (constantele din use_cases / allocation / product_cache / stock_import) trebuie
+# să folosească indexurile din db_init (migrarea v2). O modificare de SQL sau de index care le-ar
+# întoarce la o scanare completă a tabelei trece altfel neobservată, până la o casă lentă.
+#
+# Pentru fiecare interogare: EXPLAIN QUERY PLAN cu parametri fictivi, apoi
+#   - fiecare text din `uses` trebuie să apară în plan (ex. "INDEX ix_receipt_lines_merge")
+#   - nicio linie "SCAN <tabel>" fără index, cu excepția tabelelor din `scans` (ex. products la lista completă)
+#
+# Verificarea rulează în tests/test_query_plans.py, pe o bază nouă creată cu init_db. CLI-ul de mai jos
+# verifică o bază existentă (ex. cea a magazinului, după un upgrade): o deschide doar pentru citire și
+# refuză o schemă care nu e la zi, în loc să o migreze — migrarea rămâne treaba aplicației / a
+# python -m app.infra.migrations.
+#
+#   python -m app.services.query_plans [--db magazin.sqlite] [-v]   → cod 1 dacă o verificare pică,
+#                                                                     2 dacă baza lipsește / nu e la zi
+
+# (nume, sql, indexuri cerute, tabele pe care scanarea e acceptată)
+PLAN_CHECKS: List[Tuple[str, str, Sequence[str], Sequence[str]]] = [
+    ("scanare: produs după cod", PRODUCT_BY_BARCODE_SQL, ["sqlite_autoindex_products"], []),
+    ("scanare: versiune produs", PRODUCT_VERSION_SQL, ["INTEGER PRIMARY KEY"], []),
+    ("bon: linia de cumulat", uc.RECEIPT_LINE_FIND_SQL, ["INDEX ix_receipt_lines_merge (receipt_id=? AND product_id=?"], []),
+    ("bon: total", uc.RECEIPT_SUM_SQL, ["ix_receipt_lines_merge"], []),
+    ("bon: linii", uc.RECEIPT_LINES_SQL, ["ix_receipt_lines_merge"], []),
+    ("bon: linii la finalizare", uc.RECEIPT_ITEMS_SQL, ["ix_receipt_lines_merge"], []),
+    ("bon: solduri FIFO", RECEIPT_STOCK_SQL, ["ix_receipt_lines_merge", "ix_stock_balance_batch_product"], []),
+    ("bonuri deschise", uc.OPEN_RECEIPTS_SQL, ["INDEX ix_receipts_open"], []),
+    ("închidere: bonuri vechi", f"SELECT id FROM receipts WHERE {OLD_RECEIPTS_WHERE}", ["INDEX ix_receipts_done"], []),
+    ("lot după cod", uc.BATCH_BY_LOT_SQL, ["INDEX ix_batches_product_lot (product_id=? AND lot_code=?)"], []),
+    ("lot după cheie", uc.BATCH_BY_KEY_SQL, ["(product_id=?)"], []),
+    ("intrare: grupare sesiune", uc.STOCK_IN_GROUPS_SQL, ["COVERING INDEX ix_stock_in_lines_session"], []),
+    ("stoc: loturile produsului", uc.PRODUCT_BATCHES_SQL, ["ix_stock_balance_batch_product"], []),
+    ("stoc: fără lot", uc.UNBATCHED_STOCK_SQL, ["INTEGER PRIMARY KEY"], []),
+    ("expirări", uc.EXPIRING_BATCHES_SQL, ["INDEX ix_batches_expiry_iso"], []),
+    ("import: produse după cod", PRODUCTS_BY_BARCODES_SQL.format(marks="?,?,?,?"), ["sqlite_autoindex_products"], []),
+    ("import: loturi", LOTS_BY_PRODUCTS_SQL.format(marks="?,?,?,?"), ["INDEX ix_batches_product_lot"], []),
+]
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def _params(sql: str) -> Any:
+    if ":cutoff" in sql:
+        return {"cutoff": "2000-01-01"}
+    return (0,) * sql.count("?")
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Any = None) -> List[str]:
+    """Liniile din EXPLAIN QUERY PLAN (coloana detail)."""
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, _params(sql) if params is None else params).fetchall()
+    return [r[3] for r in rows]
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    """alias → tabel (planul folosește aliasul: SCAN rl)."""
+    out = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+        out[table] = table
+        if alias and alias.upper() not in ("ON", "WHERE", "JOIN", "LEFT", "INNER", "ORDER", "GROUP", "USING"):
+            out[alias] = table
+    return out
+
+
+def check_query_plans(conn: sqlite3.Connection,
+                      checks: Optional[Sequence[Tuple[str, str, Sequence[str], Sequence[str]]]] = None
+                      ) -> List[Dict[str, Any]]:
+    """Rezultatul fiecărei verificări: {name, ok, plan, problems}."""
+    results = []
+    for name, sql, uses, scans in (PLAN_CHECKS if checks is None else checks):
+        try:
+            plan = explain(conn, sql)
+        except sqlite3.Error as e:
+            results.append({"name": name, "ok": False, "plan": [], "problems": [f"eroare SQL: {e}"]})
+            continue
+        text = "\n".join(plan)
+        problems = [f"lipsește „{u}”" for u in uses if u not in text]
+        aliases = _table_aliases(sql)
+        for line in plan:
+            m = _FULL_SCAN.match(line.strip())
+            if m and aliases.get(m.group(1), m.group(1)) not in scans:
+                problems.append(f"scanare completă: {line.strip()}")
+        results.append({"name": name, "ok": not problems, "plan": plan, "problems": problems})
+    return results
+
+
+# ------------------------------------- CLI -------------------------------------
+def open_read_only(db_path: str) -> sqlite3.Connection:
+    """Conexiune doar pentru citire la o bază existentă (nu o creează, nu o poate modifica)."""
+    path = Path(db_path)
+    if not path.is_file():
+        raise ValueError(f"Baza {db_path} nu există.")
+    return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+
+
+def main(argv=None) -> int:
+    from ..infra.db_init import MIGRATIONS
+    from ..infra.migrations import current_version, pending
+    from ..util.config import load_config
+
+    ap = argparse.ArgumentParser(description="Verifică planurile de execuție ale interogărilor calde.")
+    ap.add_argument("--db", default=None,
+                    help="calea unei baze existente, deschisă doar pentru citire (implicit: db_path din config.json)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="afișează și planurile corecte")
+    args = ap.parse_args(argv)
+
+    db_path = args.db or load_config()["db_path"]
+    try:
+        conn = open_read_only(db_path)
+        try:
+            # indexurile verificate vin din migrări: pe o schemă veche planurile ar pica oricum
+            todo = pending(conn, MIGRATIONS)
+            if todo:
+                raise ValueError(f"Baza {db_path} are schema v{current_version(conn)}, aplicația "
+                                 f"v{MIGRATIONS[-1].version}: rulează întâi python -m app.infra.migrations.")
+            results = check_query_plans(conn)
+        finally:
+            conn.close()
+    except (ValueError, sqlite3.Error) as e:
+        print(e)
+        return 2
+    for r in results:
+        print(f"{'OK  ' if r['ok'] else 'PICĂ'} {r['name']}")
+        for p in r["problems"]:
+            print(f"       {p}")
+        if args.verbose or not r["ok"]:
+            for line in r["plan"]:
+                print(f"         | {line}")
+    failed = sum(not r["ok"] for r in results)
+    print(f"{len(results) - failed}/{len(results)} interogări folosesc indexurile așteptate.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
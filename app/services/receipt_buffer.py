@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# ------------------------------ BONURI ÎN MEMORIE (config.json: "buffered_receipts": true) ------------------------------
+# Normal, bonul deschis stă în baza de date: open_receipt inserează antetul, fiecare scanare face
+# SELECT + UPDATE/INSERT pe receipt_lines (o tranzacție de scriere), iar void_receipt șterge liniile.
+# Cu ReceiptBuffer bonul deschis stă în procesul casei, până la finalizare:
+#
+#   - open_receipt / add_line(s)_to_receipt / remove_line / get_receipt / void_receipt nu scriu în bază
+#     (aceleași reguli de cumulare: același produs + același preț/TVA → aceeași linie)
+#   - finalize_receipt scrie antetul, liniile și mișcările FIFO într-o singură tranzacție
+#   - id-urile bonurilor și ale liniilor din memorie sunt negative (cele din bază sunt pozitive), deci
+#     InventoryService știe după id unde e bonul; bonurile deschise în bază (de dinainte) merg ca înainte
+#   - fiecare modificare e adăugată (o linie JSON, flush + fsync) în jurnalul local înainte de răspuns:
+#     dacă aplicația, sistemul sau curentul cade, la pornire bonurile nefinalizate se refac din jurnal;
+#     fișierul se golește când nu mai e niciun bon deschis (după COMMIT-ul finalizării, vezi use_cases).
+#     fsync=False (config.json: "receipt_journal_fsync": false) păstrează doar flush-ul: rezistă la
+#     căderea aplicației, nu și la o cădere de curent, dar scanarea nu mai așteaptă discul
+#   - uuid-ul bonului din memorie ajunge în receipts.uuid: o cădere între COMMIT și înregistrarea „end”
+#     din jurnal nu duce la o a doua vânzare (InventoryService.recover_receipts îl găsește în bază)
+#
+# Înregistrări în jurnal:
+#   {"op": "open", "r": -1, "uuid": "...", "at": "2026-01-01 10:00:00"}
+#   {"op": "line", "r": -1, "line": {...}}        starea completă a liniei după scanare (nu diferența)
+#   {"op": "del",  "r": -1, "l": -2}
+#   {"op": "end",  "r": -1, "status": "closed" | "void"}
+
+NOT_OPEN = "Bonul nu este în stare 'open'."
+
+
+class BufferedReceipt:
+    __slots__ = ("id", "uuid", "opened_at", "lines", "total_cents")
+
+    def __init__(self, receipt_id: int, receipt_uuid: str, opened_at: str):
+        self.id = receipt_id
+        self.uuid = receipt_uuid
+        self.opened_at = opened_at
+        self.lines: Dict[int, Dict[str, Any]] = {}   # line_id → linie, în ordinea din bon
+        self.total_cents = 0
+
+    def head(self) -> Dict[str, Any]:
+        # aceleași chei ca rândul din receipts (get_receipt)
+        return {"id": self.id, "uuid": self.uuid, "opened_at": self.opened_at, "closed_at": None,
+                "status": "open", "total_cached_cents": self.total_cents}
+
+    def items(self) -> List[Dict[str, Any]]:
+        return [dict(line) for line in self.lines.values()]
+
+
+class ReceiptBuffer:
+    def __init__(self, journal_path: str, fsync: bool = True):
+        self.path = journal_path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._receipts: Dict[int, BufferedReceipt] = {}
+        self._line_owner: Dict[int, int] = {}   # line_id → receipt_id
+        self._next_id = -1
+        # bonurile refăcute din jurnal la pornire (vezi InventoryService.recover_receipts)
+        self.recovered: List[int] = self._replay()
+        self._file = self._compact()
+
+    # ---------- jurnal ----------
+    def _replay(self) -> List[int]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for raw in f:
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    break   # ultima linie scrisă pe jumătate la cădere
+                self._apply(rec)
+        return list(self._receipts)
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        op, rid = rec["op"], rec["r"]
+        self._next_id = min(self._next_id, rid - 1)
+        if op == "open":
+            self._receipts[rid] = BufferedReceipt(rid, rec["uuid"], rec["at"])
+            return
+        r = self._receipts.get(rid)
+        if r is None:
+            return
+        if op == "line":
+            line = rec["line"]
+            old = r.lines.get(line["id"])
+            r.total_cents += line["line_total_cents"] - (old["line_total_cents"] if old else 0)
+            r.lines[line["id"]] = line
+            self._line_owner[line["id"]] = rid
+            self._next_id = min(self._next_id, line["id"] - 1)
+        elif op == "del":
+            line = r.lines.pop(rec["l"], None)
+            if line is not None:
+                r.total_cents -= line["line_total_cents"]
+                self._line_owner.pop(rec["l"], None)
+        elif op == "end":
+            for line_id in r.lines:
+                self._line_owner.pop(line_id, None)
+            del self._receipts[rid]
+
+    def _compact(self):
+        # rescriem jurnalul doar cu bonurile încă deschise (în ordine), apoi continuăm în el
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for r in self._receipts.values():
+                f.write(self._dump({"op": "open", "r": r.id, "uuid": r.uuid, "at": r.opened_at}))
+                for line in r.lines.values():
+                    f.write(self._dump({"op": "line", "r": r.id, "line": line}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if self.fsync and hasattr(os, "O_DIRECTORY"):   # redenumirea, pe disc (POSIX)
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        return open(self.path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _dump(rec: Dict[str, Any]) -> str:
+        return json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _log(self, rec: Dict[str, Any]) -> None:
+        # flush → în fișier (cache-ul sistemului); fsync → pe disc, înainte să răspundem
+        self._file.write(self._dump(rec))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    # ---------- bonuri ----------
+    def open(self) -> int:
+        with self._lock:
+            rid, self._next_id = self._next_id, self._next_id - 1
+            at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")   # ca CURRENT_TIMESTAMP
+            r = BufferedReceipt(rid, uuid.uuid4().hex, at)
+            self._log({"op": "open", "r": rid, "uuid": r.uuid, "at": at})
+            self._receipts[rid] = r
+            return rid
+
+    def _get(self, receipt_id: int) -> BufferedReceipt:
+        r = self._receipts.get(receipt_id)
+        if r is None:
+            raise ValueError(NOT_OPEN)
+        return r
+
+    def total(self, receipt_id: int) -> int:
+        with self._lock:
+            return self._get(receipt_id).total_cents
+
+    def add(self, receipt_id: int, p, qty_base: int, unit_price_cents: int,
+            vat_rate: int) -> Tuple[Dict[str, Any], bool, int]:
+        """Cumulează pe linia existentă (același produs + preț/TVA) sau adaugă; întoarce (linia, merged, total)."""
+        with self._lock:
+            r = self._get(receipt_id)
+            line = next((l for l in r.lines.values() if l["product_id"] == p["id"]
+                         and l["unit_price_cents"] == unit_price_cents and l["vat_rate"] == vat_rate), None)
+            merged = line is not None
+            if merged:
+                line = dict(line, qty_base=line["qty_base"] + qty_base)
+            else:
+                line_id, self._next_id = self._next_id, self._next_id - 1
+                line = {
+                    "id": line_id, "product_id": p["id"], "name": p["name"], "barcode": p["barcode"],
+                    "unit": p["unit"], "qty_base": qty_base, "unit_price_cents": unit_price_cents,
+                    "vat_rate": vat_rate,
+                }
+            line["line_total_cents"] = line["qty_base"] * unit_price_cents
+            self._log({"op": "line", "r": receipt_id, "line": line})
+            self._apply({"op": "line", "r": receipt_id, "line": line})
+            return dict(line), merged, r.total_cents
+
+    def owns_line(self, line_id: int) -> bool:
+        with self._lock:
+            return line_id in self._line_owner
+
+    def remove(self, line_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rid = self._line_owner.get(line_id)
+            if rid is None:
+                return None
+            rec = {"op": "del", "r": rid, "l": line_id}
+            self._log(rec)
+            self._apply(rec)
+            return {"line_id": line_id, "receipt_id": rid, "total_cents": self._receipts[rid].total_cents}
+
+    def snapshot(self, receipt_id: int) -> Optional[BufferedReceipt]:
+        """Copie a bonului (pentru get_receipt / finalizare), None dacă nu e deschis."""
+        with self._lock:
+            r = self._receipts.get(receipt_id)
+            if r is None:
+                return None
+            copy = BufferedReceipt(r.id, r.uuid, r.opened_at)
+            copy.lines = {k: dict(v) for k, v in r.lines.items()}
+            copy.total_cents = r.total_cents
+            return copy
+
+    def open_receipts(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"id": r.id, "opened_at": r.opened_at, "total_cents": r.total_cents}
+                    for r in self._receipts.values()]
+
+    def end(self, receipt_id: int, status: str) -> bool:
+        """Scoate bonul din memorie (finalizat în bază sau anulat); False dacă nu era deschis."""
+        with self._lock:
+            if receipt_id not in self._receipts:
+                return False
+            rec = {"op": "end", "r": receipt_id, "status": status}
+            if len(self._receipts) == 1:
+                # era ultimul bon deschis: jurnalul nu mai are nimic de refăcut → îl golim. Fără fsync:
+                # dacă golirea se pierde, bonul reapare la pornire și recover_receipts îl găsește în bază
+                # după uuid (finalizat); un bon anulat reapare deschis și se poate anula din nou
+                self._file.seek(0)
+                self._file.truncate()
+            else:
+                self._log(rec)
+            self._apply(rec)
+            if receipt_id in self.recovered:
+                self.recovered.remove(receipt_id)
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
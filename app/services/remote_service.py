@@ -0,0 +1,110 @@
+import base64
+import http.client
+import inspect
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from .api_server import READ_METHODS, WRITE_METHODS
+from .use_cases import InventoryService
+
+# ------------------------------ CLIENT PENTRU SERVERUL API (config.json: "db_mode": "remote") ------------------------------
+# Aceleași metode ca InventoryService (aceleași argumente, aceleași rezultate, după JSON: datele vin ca text
+# ISO, tuplurile ca liste), dar fiecare apel e un POST /api/<metodă> la services.api_server.
+# Ferestrele nu știu diferența: primesc RemoteInventoryService în loc de InventoryService.
+#   - o conexiune HTTP keep-alive per thread (AsyncService apelează din mai multe thread-uri)
+#   - erorile serverului revin ca ValueError / RuntimeError cu mesajul original (ex. „Stoc insuficient...”)
+#   - o citire pe o conexiune căzută se reîncearcă o dată; o scriere NU (poate a ajuns deja la server,
+#     iar o scanare trimisă de două ori ar dubla linia) → RuntimeError, utilizatorul verifică bonul
+
+
+class RemoteInventoryService:
+    STOCK_SORT_COLUMNS = InventoryService.STOCK_SORT_COLUMNS
+    from_base_qty = InventoryService.from_base_qty
+
+    def __init__(self, base_url: str, token: str = "", timeout: float = 15.0):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.host, self.port = parts.hostname or "localhost", parts.port or 80
+        self.timeout = timeout
+        self._headers = {"Content-Type": "application/json"}
+        if token:
+            self._headers["Authorization"] = f"Bearer {token}"
+        self._lock = threading.Lock()
+        # thread ident → conexiune (ca ConnectionManager: thread-urile QThreadPool pierd threading.local)
+        self._all: dict[int, http.client.HTTPConnection] = {}
+
+    def _http(self) -> http.client.HTTPConnection:
+        key = threading.get_ident()
+        conn = self._all.get(key)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            with self._lock:
+                self._all[key] = conn
+        return conn
+
+    def _request(self, method: str, path: str, body: Optional[bytes], retry: bool):
+        conn = self._http()
+        try:
+            conn.request(method, path, body=body, headers=self._headers)
+            resp = conn.getresponse()
+            return resp.status, json.loads(resp.read() or b"{}")
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()   # se redeschide la cererea următoare
+            if retry:
+                return self._request(method, path, body, retry=False)
+            raise RuntimeError(f"Serverul {self.base_url} nu răspunde: {e}") from e
+
+    def call(self, name: str, **kwargs) -> Any:
+        body = json.dumps(kwargs, ensure_ascii=False).encode("utf-8")
+        status, payload = self._request("POST", f"/api/{name}", body, retry=name in READ_METHODS)
+        if status == 200:
+            return payload.get("result")
+        msg = payload.get("error") or f"HTTP {status}"
+        if payload.get("type") == "ValueError":
+            raise ValueError(msg)
+        raise RuntimeError(msg)
+
+    def ping(self) -> Dict[str, Any]:
+        """GET /health: serverul e pornit și accesibil (la pornirea aplicației)."""
+        status, payload = self._request("GET", "/health", None, retry=True)
+        if status != 200:
+            raise RuntimeError(payload.get("error") or f"HTTP {status}")
+        return payload
+
+    def import_stock_in_file(self, session_id: int, path: str) -> Dict[str, Any]:
+        # fișierul e pe casă, importul rulează pe server → îl trimitem în corp
+        with open(path, "rb") as f:
+            content = base64.b64encode(f.read()).decode("ascii")
+        return self.call("import_stock_in_file", session_id=session_id,
+                         filename=os.path.basename(path), content_b64=content)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {}   # cache-ul de produse e pe server
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._all = list(self._all.values()), {}
+        for conn in conns:
+            conn.close()
+
+
+def _remote(name: str):
+    sig = inspect.signature(getattr(InventoryService, name))
+
+    def method(self, *args, **kwargs):
+        bound = sig.bind(self, *args, **kwargs)   # argumentele poziționale primesc numele din InventoryService
+        params = dict(bound.arguments)
+        params.pop("self")
+        return self.call(name, **params)
+
+    method.__name__ = name
+    method.__doc__ = getattr(InventoryService, name).__doc__
+    return method
+
+
+for _name in READ_METHODS + WRITE_METHODS:
+    if _name not in RemoteInventoryService.__dict__:
+        setattr(RemoteInventoryService, _name, _remote(_name))
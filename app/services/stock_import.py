@@ -0,0 +1,222 @@
+import csv
+import os
+import unicodedata
+from datetime import date, datetime
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+from ..util.barcode import normalize_barcode
+
+# ------------------------------ IMPORT INTRARE DIN FIȘIER (.xlsx / .csv) ------------------------------
+# Inversul exportului din IntrareDialog: aceleași coloane (Nr, Denumire, Cod, Unitate, Cantitate, Lot,
+# Expiră la, Cost/unit, Preț la raft, Valoare, Furnizor, Doc furnizor). Nr și Valoare se ignoră.
+#
+# În loc de câte o scanare per linie (produs → lot → secvență → linie, fiecare cu commit-ul ei):
+#   1) citim rândurile în flux (openpyxl read_only / csv) și le validăm → erori pe rând
+#   2) rezolvăm toate produsele și loturile din fișier cu câteva SELECT ... IN (...)
+#   3) creăm ce lipsește și inserăm toate liniile cu executemany, într-o singură tranzacție
+
+IMPORT_CHUNK = 500   # câte valori punem într-un IN (...)
+PRODUCTS_BY_BARCODES_SQL = "SELECT id, barcode, name, unit, price_per_unit_cents FROM products WHERE barcode IN ({marks})"
+LOTS_BY_PRODUCTS_SQL = """
+    SELECT id, product_id, lot_code, CAST(expiry_date AS TEXT) AS expiry
+    FROM batches
+    WHERE product_id IN ({marks}) AND lot_code IS NOT NULL
+    ORDER BY id
+"""
+
+# antet (fără diacritice, litere mici) → câmp
+HEADER_FIELDS = {
+    "denumire": "name",
+    "cod": "barcode",
+    "cod de bare": "barcode",
+    "unitate": "unit",
+    "unit.": "unit",
+    "cantitate": "quantity",
+    "cant.": "quantity",
+    "lot": "lot_code",
+    "expira la": "expiry_date",
+    "expirare": "expiry_date",
+    "cost/unit": "unit_cost_lei",
+    "pret la raft": "price_lei",
+    "pret": "price_lei",
+    "furnizor": "supplier_name",
+    "doc furnizor": "supplier_doc",
+}
+REQUIRED_FIELDS = ("barcode", "quantity")
+UNITS = ("buc", "kg", "l")
+DATE_FORMATS = ("%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d")   # ultimul: 2027-1-5
+
+
+def _fold(text: str) -> str:
+    nfkd = unicodedata.normalize("NFKD", str(text))
+    return "".join(ch for ch in nfkd if not unicodedata.combining(ch)).strip().lower()
+
+
+# ---------- CITIRE ----------
+def _iter_xlsx(path: str) -> Iterator[tuple]:
+    from openpyxl import load_workbook   # dependență opțională, doar pentru .xlsx
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _iter_csv(path: str) -> Iterator[tuple]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        # exportul nostru folosește ';' (Excel RO); acceptăm și ','
+        delimiter = ";" if sample.count(";") >= sample.count(",") else ","
+        for row in csv.reader(f, delimiter=delimiter):
+            yield tuple(row)
+
+
+def iter_import_rows(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(nr. rând în fișier, {câmp: valoare brută}) pentru fiecare rând de date nevid."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        rows = _iter_xlsx(path)
+    elif ext in (".csv", ".txt"):
+        rows = _iter_csv(path)
+    else:
+        raise ValueError("Format nesuportat (accept .xlsx sau .csv).")
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("Fișierul este gol.")
+    columns = {i: HEADER_FIELDS[_fold(h)] for i, h in enumerate(header)
+               if h is not None and _fold(h) in HEADER_FIELDS}
+    missing = [f for f in REQUIRED_FIELDS if f not in columns.values()]
+    if missing:
+        raise ValueError("Lipsesc coloanele obligatorii: Cod, Cantitate.")
+
+    for row_no, row in enumerate(rows, start=2):
+        values = {field: (row[i] if i < len(row) else None) for i, field in columns.items()}
+        if all(v is None or str(v).strip() == "" for v in values.values()):
+            continue
+        yield row_no, values
+
+
+# ---------- VALIDARE (un rând) ----------
+def _text(v) -> Optional[str]:
+    if v is None:
+        return None
+    s = str(v).strip()
+    return s or None
+
+
+def _number(v, label: str) -> Optional[float]:
+    if v is None or (isinstance(v, str) and not v.strip()):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return float(str(v).strip().replace(" ", "").replace(",", "."))
+    except ValueError:
+        raise ValueError(f"{label} invalid: {v}")
+
+
+def _barcode(v) -> str:
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)           # celulă numerică în Excel
+    s = _text(v)
+    if s is None:
+        raise ValueError("Lipsește codul de bare.")
+    if s.startswith('="') and s.endswith('"'):
+        s = s[2:-1]          # ="5941..." din exportul CSV
+    return normalize_barcode(s)
+
+
+def _expiry(v) -> Optional[str]:
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    s = _text(v)
+    if s is None:
+        return None
+    try:
+        return date.fromisoformat(s[:10]).isoformat()   # cazul obișnuit (exportul nostru), fără strptime
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"Dată de expirare invalidă: {s}")
+
+
+def parse_import_row(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Rând brut → rând validat (ridică ValueError cu mesajul pentru utilizator)."""
+    barcode = _barcode(values.get("barcode"))
+    qty = _number(values.get("quantity"), "Cantitate")
+    if qty is None or qty <= 0:
+        raise ValueError("Cantitatea trebuie să fie > 0.")
+    unit = (_text(values.get("unit")) or "buc").lower()
+    if unit not in UNITS:
+        raise ValueError(f"Unitate necunoscută: {unit}")
+    cost = _number(values.get("unit_cost_lei"), "Cost/unit")
+    price = _number(values.get("price_lei"), "Preț la raft")
+    if (cost is not None and cost < 0) or (price is not None and price < 0):
+        raise ValueError("Costul și prețul nu pot fi negative.")
+    return {
+        "barcode": barcode,
+        "name": _text(values.get("name")),
+        "unit": unit,
+        "quantity": qty,
+        "lot_code": _text(values.get("lot_code")),
+        "expiry_date": _expiry(values.get("expiry_date")),
+        "unit_cost_lei": cost if cost else None,      # 0 = necompletat, ca în formular
+        "price_lei": price if price else None,        # 0 / gol = nu modificăm prețul
+        "supplier_name": _text(values.get("supplier_name")),
+        "supplier_doc": _text(values.get("supplier_doc")),
+    }
+
+
+# ---------- REZOLVARE ÎN BLOC (aceeași tranzacție, conexiune primită) ----------
+def _chunks(items: list) -> Iterator[list]:
+    for i in range(0, len(items), IMPORT_CHUNK):
+        yield _padded(items[i:i + IMPORT_CHUNK])
+
+
+def _padded(part: list) -> list:
+    """
+    Completează bucata până la o putere a lui 2 (max IMPORT_CHUNK) repetând ultima valoare:
+    IN (...) dă același rezultat, iar numărul de texte SQL distincte rămâne mic (cache-ul de instrucțiuni).
+    """
+    size = 8
+    while size < len(part):
+        size *= 2
+    size = min(size, IMPORT_CHUNK)
+    return part + part[-1:] * (size - len(part))
+
+
+def load_products_by_barcode(conn, barcodes: List[str]) -> Dict[str, Dict[str, Any]]:
+    found: Dict[str, Dict[str, Any]] = {}
+    for part in _chunks(barcodes):
+        marks = ",".join("?" * len(part))
+        for r in conn.execute(PRODUCTS_BY_BARCODES_SQL.format(marks=marks), part):
+            found[r["barcode"]] = dict(r)
+    return found
+
+
+def load_lots(conn, product_ids: List[int]) -> Dict[Tuple[int, str], Tuple[int, Optional[str]]]:
+    """(product_id, lot_code) → (batch_id, expiry_date text); la duplicate câștigă primul lot (ca fetchone)."""
+    lots: Dict[Tuple[int, str], Tuple[int, Optional[str]]] = {}
+    for part in _chunks(product_ids):
+        marks = ",".join("?" * len(part))
+        for r in conn.execute(LOTS_BY_PRODUCTS_SQL.format(marks=marks), part):
+            lots.setdefault((r["product_id"], r["lot_code"]), (r["id"], r["expiry"]))
+    return lots
+
+
+def reserve_seq(conn, name: str, count: int) -> int:
+    """Rezervă `count` valori consecutive din contorul `name`; întoarce prima valoare."""
+    conn.execute("INSERT OR IGNORE INTO sequences(name, value) VALUES(?, 0)", (name,))
+    conn.execute("UPDATE sequences SET value = value + ? WHERE name=?", (count, name))
+    last = int(conn.execute("SELECT value FROM sequences WHERE name=?", (name,)).fetchone()["value"])
+    return last - count + 1
@@ -1,6 +1,13 @@
 from typing import Optional, List, Dict, Any
-from ..infra.db import connect
-from datetime import date, datetime 
+from ..infra.db import ConnectionManager, after_commit, write_transaction
+from ..infra.product_search import has_product_fts, fts_match_query, BM25_WEIGHTS
+from .allocation import load_receipt_stock, allocate_fifo
+from .product_cache import ProductCache
+from .receipt_buffer import ReceiptBuffer
+from .stock_import import (
+    iter_import_rows, parse_import_row, load_products_by_barcode, load_lots, reserve_seq,
+)
+from datetime import date, datetime, timedelta
 
 def lei_to_cents(lei: float | str | None) -> Optional[int]:
     if lei is None:
@@ -19,6 +26,15 @@ def to_base_qty(unit: str, qty: float) -> int:
     else:
         raise ValueError(f"Unitate necunoscută: {unit}")
 
+def receipt_line_price(p) -> tuple:
+    """(preț per unitate de bază, cota TVA) pentru o linie de bon cu produsul p."""
+    if p["unit"] == "buc":
+        unit_price_cents = int(p["price_per_unit_cents"])
+    else:
+        # preț/kg sau /l → transformăm la preț/gram ori /ml
+        unit_price_cents = int(round(p["price_per_unit_cents"] / 1000.0))
+    return unit_price_cents, int(p["vat_rate"])
+
 def _date_text(v):
     if v is None:
         return None
@@ -27,70 +43,190 @@ def _date_text(v):
     # e deja string
     return str(v)
 
+# ---------- SQL pe drumul cald (scanare → linie de bon → finalizare, intrări, solduri) ----------
+# sqlite3 ține pe fiecare conexiune un cache de instrucțiuni pregătite (cached_statements, vezi infra.db),
+# cheie = textul exact al SQL-ului. Cu conexiunile persistente, o instrucțiune definită o singură dată aici
+# e compilată o dată per thread; aceeași interogare scrisă diferit în două metode ar ocupa două intrări.
+# Mișcările primesc motivul ('sale' / 'stock_in') ca parametru → un singur INSERT pentru toate.
+
+RECEIPT_STATUS_SQL = "SELECT status, total_cached_cents FROM receipts WHERE id=?"
+RECEIPT_SUM_SQL = "SELECT COALESCE(SUM(line_total_cents),0) AS t FROM receipt_lines WHERE receipt_id=?"
+RECEIPT_TOTAL_UPDATE_SQL = "UPDATE receipts SET total_cached_cents=? WHERE id=?"
+RECEIPT_LINE_FIND_SQL = """
+    SELECT id, qty_base
+    FROM receipt_lines
+    WHERE receipt_id=? AND product_id=? AND unit_price_cents=? AND vat_rate=?
+    ORDER BY id LIMIT 1
+"""
+RECEIPT_LINE_UPDATE_SQL = "UPDATE receipt_lines SET qty_base=?, line_total_cents=? WHERE id=?"
+RECEIPT_LINE_INSERT_SQL = """
+    INSERT INTO receipt_lines
+        (receipt_id, product_id, qty_base, unit_price_cents, vat_rate, line_total_cents)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+RECEIPT_LINES_SQL = """
+    SELECT rl.id, rl.product_id, p.name, p.barcode, p.unit,
+        rl.qty_base, rl.unit_price_cents, rl.vat_rate, rl.line_total_cents
+    FROM receipt_lines rl
+    JOIN products p ON p.id = rl.product_id
+    WHERE rl.receipt_id=?
+    ORDER BY rl.id
+"""
+RECEIPT_ITEMS_SQL = """
+    SELECT product_id, qty_base, line_total_cents
+    FROM receipt_lines
+    WHERE receipt_id=?
+    ORDER BY id
+"""
+RECEIPT_CLOSE_SQL = """
+    UPDATE receipts
+    SET status='closed', closed_at=CURRENT_TIMESTAMP, total_cached_cents=?
+    WHERE id=?
+"""
+MOVEMENT_INSERT_SQL = """
+    INSERT INTO movements(product_id, batch_id, quantity_base, reason, note)
+    VALUES (?, ?, ?, ?, ?)
+"""
+BATCH_BY_LOT_SQL = "SELECT id, expiry_date FROM batches WHERE product_id=? AND lot_code=?"
+BATCH_BY_KEY_SQL = ("SELECT id FROM batches WHERE product_id=? AND IFNULL(expiry_date,'')=IFNULL(?, '') "
+                    "AND IFNULL(lot_code,'')=IFNULL(?, '')")
+BATCH_INSERT_SQL = "INSERT INTO batches(product_id, expiry_date, lot_code) VALUES(?,?,?)"
+STOCK_IN_LINE_INSERT_SQL = """
+    INSERT INTO stock_in_lines(session_id, product_id, batch_id, quantity_base, unit_cost_cents, supplier_name, supplier_doc)
+    VALUES(?,?,?,?,?,?,?)
+"""
+PRODUCT_BATCHES_SQL = """
+    SELECT b.id AS batch_id, b.lot_code, b.expiry_date,
+           sb.qty_base AS stock_base,
+           p.unit
+    FROM stock_balance_batch sb
+    JOIN batches b ON b.id = sb.batch_id
+    JOIN products p ON p.id = b.product_id
+    WHERE sb.product_id=? AND sb.qty_base <> 0
+    ORDER BY (b.expiry_date IS NULL), b.expiry_date ASC, b.id ASC
+"""
+UNBATCHED_STOCK_SQL = "SELECT unbatched_qty_base FROM stock_balance_product WHERE product_id=?"
+EXPIRING_BATCHES_SQL = """
+    SELECT p.name AS product_name, p.barcode, p.unit, b.expiry_iso,
+        sb.qty_base AS stock_base,
+        CAST(julianday(b.expiry_iso) - julianday(?) AS INTEGER) AS days_left
+    FROM batches b
+    JOIN stock_balance_batch sb ON sb.batch_id = b.id
+    JOIN products p ON p.id = b.product_id
+    WHERE b.expiry_iso BETWEEN ? AND ? AND sb.qty_base > 0
+    ORDER BY b.expiry_iso ASC, b.id ASC
+"""
+# metodele care, pe un bon din memorie, nu ating baza → argumentul după care se recunoaște bonul / linia
+# (services.group_commit le rulează în afara tranzacției de grup; vezi InventoryService.in_memory_call)
+RECEIPT_BUFFER_CALLS = {
+    "open_receipt": None, "add_line_to_receipt": "receipt_id", "add_lines_to_receipt": "receipt_id",
+    "get_receipt": "receipt_id", "remove_line": "line_id", "void_receipt": "receipt_id",
+}
+RECEIPT_BY_UUID_SQL = "SELECT id, status FROM receipts WHERE uuid=?"
+RECEIPT_HEAD_INSERT_SQL = "INSERT INTO receipts(uuid, opened_at, status, total_cached_cents) VALUES (?, ?, 'open', ?)"
+OPEN_RECEIPTS_SQL = "SELECT id, opened_at, total_cached_cents FROM receipts WHERE status='open' ORDER BY opened_at"
+STOCK_IN_GROUPS_SQL = """
+    SELECT product_id, batch_id, SUM(quantity_base) AS qty_base
+    FROM stock_in_lines
+    WHERE session_id=?
+    GROUP BY product_id, batch_id
+"""
+
+
 class InventoryService:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, connections: Optional[ConnectionManager] = None,
+                 receipt_journal: Optional[str] = None, journal_fsync: bool = True):
         self.db_path = db_path
+        # o conexiune persistentă per thread (PRAGMA-urile se aplică o singură dată)
+        self.connections = connections or ConnectionManager(db_path)
+        # catalogul de produse în memorie (barcode → produs), pentru scanări rapide la casă
+        self.products = ProductCache()
+        self._fts: Optional[bool] = None   # există products_fts? (aflat la prima căutare)
+        # bonuri deschise în memorie + jurnal local (services.receipt_buffer); None = în baza de date
+        self.receipts = ReceiptBuffer(receipt_journal, journal_fsync) if receipt_journal else None
+
+    def _conn(self):
+        return self.connections.get()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Contoare hit/miss pentru cache-ul de produse."""
+        return self.products.stats()
+
+    def close(self) -> None:
+        """Închide toate conexiunile deschise de serviciu (la ieșirea din aplicație)."""
+        self.connections.close_all()
+        if self.receipts is not None:
+            self.receipts.close()
 
     # ---------- PRODUSE ----------
     def find_product_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
-        conn = connect(self.db_path)
-        row = conn.execute("SELECT * FROM products WHERE barcode=?", (barcode,)).fetchone()
-        return dict(row) if row else None
+        return self.products.get(self._conn(), barcode)
 
     def create_product(self, *, barcode: str, name: str, unit: str='buc', price_per_unit_lei: float=0.0) -> int:
-        conn = connect(self.db_path)
-        with conn:
-            cur = conn.execute(
-                "INSERT INTO products(barcode, name, unit, price_per_unit_cents) VALUES(?,?,?,?)",
-                (barcode, name, unit, lei_to_cents(price_per_unit_lei))
-            )
-            return cur.lastrowid
+        conn = self._conn()
+        with write_transaction(conn):
+            pid = self._insert_product(conn, barcode, name, unit, price_per_unit_lei)
+        self.products.invalidate_barcode(barcode)
+        return pid
 
     def get_or_create_product(self, *, barcode: str, name: Optional[str], unit: str, price_per_unit_lei: float=0.0) -> Dict[str, Any]:
-        p = self.find_product_by_barcode(barcode)
+        conn = self._conn()
+        with write_transaction(conn):
+            p, created = self._get_or_create_product(conn, barcode, name, unit, price_per_unit_lei)
+        if created:
+            self.products.invalidate_barcode(barcode)
+        return p
+
+    # variantele cu conexiune explicită: rulează în tranzacția apelantului, fără commit propriu
+    def _insert_product(self, conn, barcode: str, name: str, unit: str, price_per_unit_lei: float) -> int:
+        cur = conn.execute(
+            "INSERT INTO products(barcode, name, unit, price_per_unit_cents) VALUES(?,?,?,?)",
+            (barcode, name, unit, lei_to_cents(price_per_unit_lei))
+        )
+        return cur.lastrowid
+
+    def _get_or_create_product(self, conn, barcode: str, name: Optional[str], unit: str, price_per_unit_lei: float):
+        """(produs, creat_acum). Apelantul invalidează cache-ul după commit dacă produsul e nou."""
+        p = self.products.get(conn, barcode)
         if p:
-            return p
+            return p, False
         if not name:
             name = f"Produs {barcode}"
-        pid = self.create_product(barcode=barcode, name=name, unit=unit, price_per_unit_lei=price_per_unit_lei)
-        return {"id": pid, "barcode": barcode, "name": name, "unit": unit}
+        pid = self._insert_product(conn, barcode, name, unit, price_per_unit_lei)
+        return {"id": pid, "barcode": barcode, "name": name, "unit": unit}, True
 
     # ---------- LOTURI ----------
     def get_or_create_batch(self, product_id: int, expiry_date: Optional[str], lot_code: Optional[str]) -> Optional[int]:
+        conn = self._conn()
+        with write_transaction(conn):
+            return self._get_or_create_batch(conn, product_id, expiry_date, lot_code)
+
+    def _get_or_create_batch(self, conn, product_id: int, expiry_date: Optional[str], lot_code: Optional[str]) -> Optional[int]:
         if not expiry_date and not lot_code:
             return None
-        conn = connect(self.db_path)
-        with conn:
-            if lot_code:
-                row = conn.execute(
-                    "SELECT id, expiry_date FROM batches WHERE product_id=? AND lot_code=?",
-                    (product_id, lot_code)
-                ).fetchone()
-                if row:
-                    old_txt = _date_text(row["expiry_date"])
-                    new_txt = _date_text(expiry_date)
-                    # Dacă vine o dată diferită -> actualizează lotul
-                    if new_txt and old_txt != new_txt:
-                        conn.execute("UPDATE batches SET expiry_date=? WHERE id=?", (new_txt, row["id"]))
-                    return row["id"]
-
-            row = conn.execute(
-                "SELECT id FROM batches WHERE product_id=? AND IFNULL(expiry_date,'')=IFNULL(?, '') AND IFNULL(lot_code,'')=IFNULL(?, '')",
-                (product_id, _date_text(expiry_date) or None, lot_code or None)
-            ).fetchone()
+        if lot_code:
+            row = conn.execute(BATCH_BY_LOT_SQL, (product_id, lot_code)).fetchone()
             if row:
+                old_txt = _date_text(row["expiry_date"])
+                new_txt = _date_text(expiry_date)
+                # Dacă vine o dată diferită -> actualizează lotul
+                if new_txt and old_txt != new_txt:
+                    conn.execute("UPDATE batches SET expiry_date=? WHERE id=?", (new_txt, row["id"]))
                 return row["id"]
 
-            cur = conn.execute(
-                "INSERT INTO batches(product_id, expiry_date, lot_code) VALUES(?,?,?)",
-                (product_id, _date_text(expiry_date) or None, lot_code or None)
-            )
-            return cur.lastrowid
+        row = conn.execute(
+            BATCH_BY_KEY_SQL, (product_id, _date_text(expiry_date) or None, lot_code or None)
+        ).fetchone()
+        if row:
+            return row["id"]
+
+        cur = conn.execute(BATCH_INSERT_SQL, (product_id, _date_text(expiry_date) or None, lot_code or None))
+        return cur.lastrowid
 
     # ---------- SESIUNI INTRARE ----------
     def start_stock_in_session(self, note: str='') -> int:
-        conn = connect(self.db_path)
-        with conn:
+        conn = self._conn()
+        with write_transaction(conn):
             cur = conn.execute("INSERT INTO stock_in_sessions(note) VALUES(?)", (note,))
             return cur.lastrowid
 
@@ -109,20 +245,20 @@ class InventoryService:
         supplier_name: Optional[str]=None,
         supplier_doc: Optional[str]=None
     ) -> int:
-        conn = connect(self.db_path)
-        with conn:
+        # o singură conexiune și o singură tranzacție pentru toată linia (produs, lot, secvență, linie):
+        # un singur commit și nicio scriere parțială dacă ceva eșuează la mijloc
+        conn = self._conn()
+        with write_transaction(conn):
             # produs (folosim unitatea din produs dacă există)
-            p = self.find_product_by_barcode(barcode)
-            if p is None:
-                p = self.get_or_create_product(barcode=barcode, name=product_name, unit=unit, price_per_unit_lei=price_per_unit_lei)
+            p, created = self._get_or_create_product(conn, barcode, product_name, unit, price_per_unit_lei)
             product_id = p["id"]
             prod_unit = p.get("unit", unit)
 
             # lot (opțional) – dacă nu s-a introdus, îl generăm automat
             if not lot_code:
-                lot_code = self._auto_lot_code(session_id)
+                lot_code = self._auto_lot_code(conn, session_id)
 
-            batch_id = self.get_or_create_batch(product_id, expiry_date, lot_code)
+            batch_id = self._get_or_create_batch(conn, product_id, expiry_date, lot_code)
 
 
             # cantitatea în unități de bază
@@ -132,44 +268,120 @@ class InventoryService:
             unit_cost_cents = lei_to_cents(unit_cost_lei)
 
             # doar linia în sesiune (NU scriem mișcarea încă!)
-            cur = conn.execute("""
-                INSERT INTO stock_in_lines(session_id, product_id, batch_id, quantity_base, unit_cost_cents, supplier_name, supplier_doc)
-                VALUES(?,?,?,?,?,?,?)
-            """, (session_id, product_id, batch_id, qty_base, unit_cost_cents, supplier_name, supplier_doc))
-            return cur.lastrowid
+            cur = conn.execute(STOCK_IN_LINE_INSERT_SQL, (
+                session_id, product_id, batch_id, qty_base, unit_cost_cents, supplier_name, supplier_doc))
+        if created:
+            self.products.invalidate_barcode(barcode)
+        return cur.lastrowid
+
+    # ---------- IMPORT INTRARE DIN FIȘIER ----------
+    def import_stock_in_file(self, session_id: int, path: str) -> Dict[str, Any]:
+        """
+        Importă în sesiune liniile dintr-un .xlsx/.csv (coloanele exportului de intrare).
+        Rândurile invalide sunt sărite și raportate în "errors"; restul intră într-o singură tranzacție.
+        """
+        errors: List[Dict[str, Any]] = []
+        rows: List[tuple] = []
+        for row_no, values in iter_import_rows(path):
+            try:
+                rows.append((row_no, parse_import_row(values)))
+            except ValueError as e:
+                errors.append({"row": row_no, "error": str(e)})
+
+        result = {"rows": len(rows) + len(errors), "imported": 0, "products_created": 0,
+                  "prices_updated": 0, "batches_created": 0, "errors": errors}
+        conn = self._conn()
+        with write_transaction(conn):
+            # --- produse: existente dintr-un SELECT ... IN, noi cu un executemany
+            products = load_products_by_barcode(conn, sorted({r["barcode"] for _, r in rows}))
+            new_products: Dict[str, Dict[str, Any]] = {}
+            last_price: Dict[str, int] = {}
+            valid = []
+            for row_no, r in rows:
+                code = r["barcode"]
+                # unitatea produsului existent are prioritate (ca la scanare); produs nou → primul rând
+                unit = (products.get(code) or new_products.get(code) or r)["unit"]
+                if unit == "buc" and not float(r["quantity"]).is_integer():
+                    errors.append({"row": row_no, "error": "Cantitatea pentru 'buc' trebuie să fie număr întreg."})
+                    continue
+                if code not in products and code not in new_products:
+                    new_products[code] = {"name": r["name"] or f"Produs {code}", "unit": unit}
+                if r["price_lei"] is not None:
+                    last_price[code] = lei_to_cents(r["price_lei"])
+                valid.append((row_no, r, unit))
+
+            if new_products:
+                conn.executemany(
+                    "INSERT INTO products(barcode, name, unit, price_per_unit_cents) VALUES(?,?,?,?)",
+                    [(code, p["name"], p["unit"], last_price.get(code, 0)) for code, p in new_products.items()]
+                )
+                products.update(load_products_by_barcode(conn, list(new_products)))
+            # prețul la raft: ultimul preț din fișier, doar dacă diferă de cel curent
+            price_updates = [(cents, products[code]["id"]) for code, cents in last_price.items()
+                             if code not in new_products and products[code]["price_per_unit_cents"] != cents]
+            conn.executemany("UPDATE products SET price_per_unit_cents=? WHERE id=?", price_updates)
+
+            # --- loturi: rândurile fără lot primesc coduri automate (o singură rezervare din secvență)
+            auto = iter(self._auto_lot_codes(conn, session_id, sum(1 for _, r, _ in valid if not r["lot_code"])))
+            keyed = []
+            final_expiry: Dict[tuple, Optional[str]] = {}
+            for row_no, r, unit in valid:
+                key = (products[r["barcode"]]["id"], r["lot_code"] or next(auto))
+                if r["expiry_date"] or key not in final_expiry:
+                    final_expiry[key] = r["expiry_date"] or final_expiry.get(key)
+                keyed.append((key, r, unit))
+
+            pids = sorted({pid for pid, _ in final_expiry})
+            lots = load_lots(conn, pids)
+            missing = [k for k in final_expiry if k not in lots]
+            # lot existent cu altă dată de expirare → se actualizează (ca get_or_create_batch)
+            conn.executemany("UPDATE batches SET expiry_date=? WHERE id=?", [
+                (final_expiry[k], lots[k][0]) for k in final_expiry
+                if k in lots and final_expiry[k] and final_expiry[k] != lots[k][1]
+            ])
+            if missing:
+                conn.executemany(BATCH_INSERT_SQL, [(pid, final_expiry[(pid, lot)], lot) for pid, lot in missing])
+                lots.update(load_lots(conn, sorted({pid for pid, _ in missing})))
+
+            # --- liniile sesiunii, toate odată
+            conn.executemany(STOCK_IN_LINE_INSERT_SQL, [
+                (session_id, key[0], lots[key][0], to_base_qty(unit, r["quantity"]),
+                 lei_to_cents(r["unit_cost_lei"]), r["supplier_name"], r["supplier_doc"])
+                for key, r, unit in keyed
+            ])
+
+        for code in list(new_products) + [c for c in last_price if c not in new_products]:
+            self.products.invalidate_barcode(code)
+        errors.sort(key=lambda e: e["row"])
+        result.update(imported=len(keyed), products_created=len(new_products),
+                      prices_updated=len(price_updates), batches_created=len(missing))
+        return result
 
     def close_stock_in_session(self, session_id: int):
         """
         La închidere: grupează liniile pe (product_id, batch_id) și scrie o singură mișcare 'stock_in' per grup.
         Apoi setează closed_at.
         """
-        conn = connect(self.db_path)
-        with conn:
-            rows = conn.execute("""
-                SELECT product_id, batch_id, SUM(quantity_base) AS qty_base
-                FROM stock_in_lines
-                WHERE session_id=?
-                GROUP BY product_id, batch_id
-            """, (session_id,)).fetchall()
+        conn = self._conn()
+        with write_transaction(conn):
+            rows = conn.execute(STOCK_IN_GROUPS_SQL, (session_id,)).fetchall()
 
             for r in rows:
-                conn.execute("""
-                    INSERT INTO movements(product_id, batch_id, quantity_base, reason, note)
-                    VALUES(?, ?, ?, 'stock_in', ?)
-                """, (r["product_id"], r["batch_id"], r["qty_base"], f"session:{session_id}"))
+                conn.execute(MOVEMENT_INSERT_SQL,
+                             (r["product_id"], r["batch_id"], r["qty_base"], "stock_in", f"session:{session_id}"))
 
             conn.execute("UPDATE stock_in_sessions SET closed_at=CURRENT_TIMESTAMP WHERE id=?", (session_id,))
 
     def discard_stock_in_session(self, session_id: int):
         """Anulează complet sesiunea (șterge liniile și sesiunea). Nicio mișcare în stoc."""
-        conn = connect(self.db_path)
-        with conn:
+        conn = self._conn()
+        with write_transaction(conn):
             conn.execute("DELETE FROM stock_in_lines WHERE session_id=?", (session_id,))
             conn.execute("DELETE FROM stock_in_sessions WHERE id=?", (session_id,))
 
     # ---------- REZUMAT SESIUNE ----------
     def get_stock_in_summary(self, session_id: int) -> Dict[str, Any]:
-        conn = connect(self.db_path)
+        conn = self._conn()
         rows = conn.execute("""
             SELECT p.id AS product_id, p.name, p.barcode, p.unit,
                 l.quantity_base, l.unit_cost_cents
@@ -239,7 +451,7 @@ class InventoryService:
 
     # ---------- LISTĂ STOC ----------
     def get_stock_list(self, search: str='') -> List[dict]:
-        conn = connect(self.db_path)
+        conn = self._conn()
         sql = """
         SELECT 
             p.id AS product_id, p.name AS product_name, p.barcode, p.unit,
@@ -247,97 +459,194 @@ class InventoryService:
         FROM products p
         LEFT JOIN current_stock_per_product v ON v.product_id = p.id
         """
-        params = ()
+        params = []
         if search:
-            like = f"%{search}%"
-            sql += " WHERE p.name LIKE ? OR p.barcode LIKE ?"
-            params = (like, like)
+            clause, params = self._product_search_clause(search)
+            sql += " WHERE " + clause
         sql += " ORDER BY p.name ASC"
         cur = conn.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
     
     def open_receipt(self) -> int:
-        conn = connect(self.db_path)
-        with conn:
-            cur = conn.execute("INSERT INTO receipts(status) VALUES('open')")
+        if self.receipts is not None:
+            return self.receipts.open()   # nimic în bază până la finalizare
+        conn = self._conn()
+        with write_transaction(conn):
+            cur = conn.execute("INSERT INTO receipts(status, total_cached_cents) VALUES('open', 0)")
             return cur.lastrowid
     
-    def add_line_to_receipt(self, receipt_id: int, barcode: str, qty_human: float) -> int:
+    def _receipt_running_total(self, conn, receipt_id: int, cached) -> int:
+        # bonuri deschise înainte de total_cached_cents incremental → îl calculăm o singură dată
+        if cached is not None:
+            return int(cached)
+        return int(conn.execute(RECEIPT_SUM_SQL, (receipt_id,)).fetchone()["t"])
+
+    def _open_receipt_total(self, conn, receipt_id: int) -> int:
+        st = conn.execute(RECEIPT_STATUS_SQL, (receipt_id,)).fetchone()
+        if not st or st["status"] != "open":
+            raise ValueError("Bonul nu este în stare 'open'.")
+        return self._receipt_running_total(conn, receipt_id, st["total_cached_cents"])
+
+    def _buffered(self, receipt_id: int) -> bool:
+        # bonurile din memorie au id negativ (vezi services.receipt_buffer)
+        return receipt_id < 0 and self.receipts is not None
+
+    def in_memory_call(self, fn, args: tuple, kwargs: dict) -> bool:
+        """fn(*args, **kwargs) e o metodă a serviciului care lucrează doar pe un bon din memorie (fără bază)."""
+        name = getattr(fn, "__name__", None)
+        if self.receipts is None or getattr(fn, "__self__", None) is not self or name not in RECEIPT_BUFFER_CALLS:
+            return False
+        key = RECEIPT_BUFFER_CALLS[name]
+        if key is None:
+            return True
+        target = args[0] if args else kwargs.get(key)
+        if target is None:
+            return False
+        if name == "remove_line":
+            return self.receipts.owns_line(int(target))
+        return self._buffered(int(target))
+
+    def _upsert_receipt_line(self, conn, receipt_id: int, p, qty_base: int):
+        """Cumulează pe linia existentă (același produs + preț/TVA) sau inserează; întoarce (linia, merged, delta)."""
+        unit_price_cents, vat_rate = receipt_line_price(p)
+
+        # Cumulăm dacă există linie cu același produs + același preț/vat (altfel inserăm nouă linie)
+        row = conn.execute(RECEIPT_LINE_FIND_SQL, (receipt_id, p["id"], unit_price_cents, vat_rate)).fetchone()
+
+        if row:
+            new_qty = int(row["qty_base"]) + qty_base
+            new_total = new_qty * unit_price_cents
+            conn.execute(RECEIPT_LINE_UPDATE_SQL, (new_qty, new_total, row["id"]))
+            line_id = row["id"]
+        else:
+            new_qty = qty_base
+            new_total = qty_base * unit_price_cents
+            cur = conn.execute(RECEIPT_LINE_INSERT_SQL,
+                               (receipt_id, p["id"], qty_base, unit_price_cents, vat_rate, new_total))
+            line_id = cur.lastrowid
+
+        line = {
+            "id": line_id, "product_id": p["id"], "name": p["name"], "barcode": p["barcode"],
+            "unit": p["unit"], "qty_base": new_qty, "unit_price_cents": unit_price_cents,
+            "vat_rate": vat_rate, "line_total_cents": new_total,
+        }
+        return line, row is not None, qty_base * unit_price_cents
+
+    def add_line_to_receipt(self, receipt_id: int, barcode: str, qty_human: float) -> Dict[str, Any]:
+        """
+        Adaugă (sau cumulează) o linie pe bonul deschis.
+        Returnează {"line": linia modificată (ca în get_receipt), "merged": bool, "total_cents": total nou}.
+        """
         if qty_human <= 0:
             raise ValueError("Cantitatea trebuie să fie > 0.")
 
-        conn = connect(self.db_path)
-        with conn:
-            st = conn.execute("SELECT status FROM receipts WHERE id=?", (receipt_id,)).fetchone()
-            if not st or st["status"] != "open":
-                raise ValueError("Bonul nu este în stare 'open'.")
+        conn = self._conn()
+        if self._buffered(receipt_id):
+            self.receipts.total(receipt_id)   # ValueError dacă bonul nu mai e deschis
+            p = self.products.get(conn, barcode)
+            if not p:
+                raise ValueError("Produs inexistent. Adaugă-l mai întâi (Intrare).")
+            line, merged, total_cents = self.receipts.add(receipt_id, p, to_base_qty(p["unit"], qty_human),
+                                                          *receipt_line_price(p))
+            return {"line": line, "merged": merged, "total_cents": total_cents}
+
+        with write_transaction(conn):
+            total_cents = self._open_receipt_total(conn, receipt_id)
 
-            p = conn.execute(
-                "SELECT id, unit, price_per_unit_cents, vat_rate, name FROM products WHERE barcode=?",
-                (barcode,)
-            ).fetchone()
+            p = self.products.get(conn, barcode)
             if not p:
                 raise ValueError("Produs inexistent. Adaugă-l mai întâi (Intrare).")
 
-            qty_base = to_base_qty(p["unit"], qty_human)
+            line, merged, delta = self._upsert_receipt_line(conn, receipt_id, p, to_base_qty(p["unit"], qty_human))
 
-            # preț per unitate de bază
-            if p["unit"] == "buc":
-                unit_price_cents = int(p["price_per_unit_cents"])
-            else:
-                # preț/kg sau /l → transformăm la preț/gram ori /ml
-                unit_price_cents = int(round(p["price_per_unit_cents"] / 1000.0))
+            # totalul bonului ținut la zi cât timp e deschis (nu doar la finalizare)
+            total_cents += delta
+            conn.execute(RECEIPT_TOTAL_UPDATE_SQL, (total_cents, receipt_id))
 
-            vat_rate = int(p["vat_rate"])
+        return {"line": line, "merged": merged, "total_cents": total_cents}
 
-            # Cumulăm dacă există linie cu același produs + același preț/vat (altfel inserăm nouă linie)
-            row = conn.execute("""
-                SELECT id, qty_base
-                FROM receipt_lines
-                WHERE receipt_id=? AND product_id=? AND unit_price_cents=? AND vat_rate=?
-                ORDER BY id LIMIT 1
-            """, (receipt_id, p["id"], unit_price_cents, vat_rate)).fetchone()
+    def add_lines_to_receipt(self, receipt_id: int, items: List[tuple]) -> Dict[str, Any]:
+        """
+        Mai multe scanări [(barcode, qty_human), ...] într-o singură tranzacție (rafală de la scaner).
+        Scanările invalide nu opresc restul: apar în "errors" ca {"barcode", "error"}.
+        Returnează {"lines": liniile modificate (starea finală, o dată fiecare), "errors": [...], "total_cents"}.
+        """
+        lines: Dict[int, Dict[str, Any]] = {}
+        errors: List[Dict[str, Any]] = []
+        conn = self._conn()
+        if self._buffered(receipt_id):
+            total_cents = self.receipts.total(receipt_id)
+            for p, qty_base in self._valid_scans(conn, items, errors):
+                line, _, total_cents = self.receipts.add(receipt_id, p, qty_base, *receipt_line_price(p))
+                lines.pop(line["id"], None)
+                lines[line["id"]] = line
+            return {"lines": list(lines.values()), "errors": errors, "total_cents": total_cents}
+
+        with write_transaction(conn):
+            total_cents = self._open_receipt_total(conn, receipt_id)
+            for p, qty_base in self._valid_scans(conn, items, errors):
+                line, _, delta = self._upsert_receipt_line(conn, receipt_id, p, qty_base)
+                lines.pop(line["id"], None)      # ordinea = ultima atingere
+                lines[line["id"]] = line
+                total_cents += delta
+            if lines:
+                conn.execute(RECEIPT_TOTAL_UPDATE_SQL, (total_cents, receipt_id))
+
+        return {"lines": list(lines.values()), "errors": errors, "total_cents": total_cents}
+
+    def _valid_scans(self, conn, items: List[tuple], errors: List[Dict[str, Any]]):
+        """(produs, qty_base) pentru scanările valide; celelalte ajung în errors."""
+        for barcode, qty_human in items:
+            if qty_human <= 0:
+                errors.append({"barcode": barcode, "error": "Cantitatea trebuie să fie > 0."})
+                continue
+            p = self.products.get(conn, barcode)
+            if not p:
+                errors.append({"barcode": barcode, "error": "Produs inexistent. Adaugă-l mai întâi (Intrare)."})
+                continue
+            # dacă produsul e 'buc', nu permitem zecimale
+            if p["unit"] == "buc" and abs(qty_human - round(qty_human)) > 1e-9:
+                errors.append({"barcode": barcode, "error": "Cantitatea pentru 'buc' trebuie să fie întreagă."})
+                continue
+            yield p, to_base_qty(p["unit"], qty_human)
+
+    def get_open_receipts(self) -> List[Dict[str, Any]]:
+        """Bonurile rămase deschise (ex. după o închidere bruscă a aplicației), cele mai vechi primele."""
+        rows = self._conn().execute(OPEN_RECEIPTS_SQL).fetchall()
+        out = [{"id": r["id"], "opened_at": r["opened_at"], "total_cents": int(r["total_cached_cents"] or 0)}
+               for r in rows]
+        if self.receipts is not None:
+            out = sorted(out + self.receipts.open_receipts(), key=lambda r: r["opened_at"])
+        return out
+
+    def recover_receipts(self) -> List[Dict[str, Any]]:
+        """
+        Bonurile din memorie refăcute din jurnal la pornire, încă nefinalizate (după init_db).
+        Cele deja scrise în bază (căderea a venit după COMMIT) se scot din jurnal.
+        """
+        if self.receipts is None:
+            return []
+        conn = self._conn()
+        for rid in list(self.receipts.recovered):
+            r = self.receipts.snapshot(rid)
+            if r is not None and conn.execute(RECEIPT_BY_UUID_SQL, (r.uuid,)).fetchone():
+                self.receipts.end(rid, "closed")
+        return [r for r in self.receipts.open_receipts() if r["id"] in self.receipts.recovered]
 
-            if row:
-                new_qty = int(row["qty_base"]) + qty_base
-                new_total = new_qty * unit_price_cents
-                conn.execute("""
-                    UPDATE receipt_lines
-                    SET qty_base=?, line_total_cents=?
-                    WHERE id=?
-                """, (new_qty, new_total, row["id"]))
-                line_id = row["id"]
-            else:
-                line_total = qty_base * unit_price_cents
-                cur = conn.execute("""
-                    INSERT INTO receipt_lines
-                        (receipt_id, product_id, qty_base, unit_price_cents, vat_rate, line_total_cents)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (receipt_id, p["id"], qty_base, unit_price_cents, vat_rate, line_total))
-                line_id = cur.lastrowid
-
-        return line_id
-    
     def get_receipt(self, receipt_id: int) -> Dict[str, Any]:
+        if self._buffered(receipt_id):
+            r = self.receipts.snapshot(receipt_id)
+            if r is None:
+                return {"head": None, "items": [], "total_cents": 0}
+            return {"head": r.head(), "items": r.items(), "total_cents": r.total_cents}
 
-        conn = connect(self.db_path)
+        conn = self._conn()
 
         head = conn.execute("SELECT * FROM receipts WHERE id=?", (receipt_id,)).fetchone()
 
-        lines = conn.execute("""
-            SELECT rl.id, rl.product_id, p.name, p.barcode, p.unit,
-                rl.qty_base, rl.unit_price_cents, rl.vat_rate, rl.line_total_cents
-            FROM receipt_lines rl
-            JOIN products p ON p.id = rl.product_id
-            WHERE rl.receipt_id=?
-            ORDER BY rl.id
-        """, (receipt_id,)).fetchall()
-
-        total_cents = conn.execute("""
-            SELECT COALESCE(SUM(line_total_cents),0) AS t
-            FROM receipt_lines
-            WHERE receipt_id=?
-        """, (receipt_id,)).fetchone()["t"]
+        lines = conn.execute(RECEIPT_LINES_SQL, (receipt_id,)).fetchall()
+
+        total_cents = conn.execute(RECEIPT_SUM_SQL, (receipt_id,)).fetchone()["t"]
 
         return {
             "head": dict(head) if head else None,
@@ -345,22 +654,36 @@ class InventoryService:
             "total_cents": int(total_cents),
         }
 
-    def remove_line(self, line_id: int):
-        conn = connect(self.db_path)
-        with conn:
+    def remove_line(self, line_id: int) -> Optional[Dict[str, Any]]:
+        """Șterge linia; returnează {"line_id", "receipt_id", "total_cents"} (None dacă linia nu există)."""
+        if self.receipts is not None and self.receipts.owns_line(line_id):
+            return self.receipts.remove(line_id)
+        conn = self._conn()
+        with write_transaction(conn):
+            row = conn.execute("""
+                SELECT rl.receipt_id, rl.line_total_cents, r.total_cached_cents
+                FROM receipt_lines rl
+                JOIN receipts r ON r.id = rl.receipt_id
+                WHERE rl.id=?
+            """, (line_id,)).fetchone()
+            if not row:
+                return None
+            receipt_id = int(row["receipt_id"])
+            total_cents = self._receipt_running_total(conn, receipt_id, row["total_cached_cents"])
+            total_cents -= int(row["line_total_cents"])
             conn.execute("DELETE FROM receipt_lines WHERE id=?", (line_id,))
+            conn.execute(RECEIPT_TOTAL_UPDATE_SQL, (total_cents, receipt_id))
+        return {"line_id": int(line_id), "receipt_id": receipt_id, "total_cents": total_cents}
 
     # ---------- FIFO pe lot la finalizare ----------
     def _available_batches(self, conn, product_id: int) -> List[Dict]:
         # loturi cu stoc > 0, ordonate: cele cu expirare (cea mai apropiată) → apoi fără expirare
         rows = conn.execute("""
             SELECT b.id AS batch_id, b.expiry_date,
-                   COALESCE(SUM(m.quantity_base),0) AS stock_base
-            FROM batches b
-            LEFT JOIN movements m ON m.batch_id = b.id
-            WHERE b.product_id=?
-            GROUP BY b.id
-            HAVING stock_base > 0
+                   sb.qty_base AS stock_base
+            FROM stock_balance_batch sb
+            JOIN batches b ON b.id = sb.batch_id
+            WHERE sb.product_id=? AND sb.qty_base > 0
             ORDER BY (b.expiry_date IS NULL), b.expiry_date ASC, b.id ASC
         """, (product_id,)).fetchall()
         return [dict(r) for r in rows]
@@ -370,99 +693,92 @@ class InventoryService:
         for r in self._available_batches(conn, product_id):
             take = min(remaining, int(r["stock_base"]))
             if take > 0:
-                conn.execute("""
-                    INSERT INTO movements(product_id, batch_id, quantity_base, reason, note)
-                    VALUES(?, ?, ?, 'sale', ?)
-                """, (product_id, r["batch_id"], -take, note))
+                conn.execute(MOVEMENT_INSERT_SQL, (product_id, r["batch_id"], -take, "sale", note))
                 remaining -= take
             if remaining == 0:
                 break
         if remaining > 0:
             # dacă vrei să permiți consum și din "fără loturi", scoate comentariul de mai jos
-            # conn.execute("INSERT INTO movements(product_id, batch_id, quantity_base, reason, note) VALUES(?, NULL, ?, 'sale', ?)", (product_id, -remaining, note))
+            # conn.execute(MOVEMENT_INSERT_SQL, (product_id, None, -remaining, "sale", note))
             # remaining = 0
             raise ValueError("Stoc insuficient pentru produs.")
         
-    def finalize_receipt(self, receipt_id: int):
-        conn = connect(self.db_path)
-        with conn:
+    def finalize_receipt(self, receipt_id: int) -> int:
+        """Închide bonul (mișcări FIFO de vânzare); întoarce id-ul bonului în bază."""
+        if self._buffered(receipt_id):
+            return self._finalize_buffered(receipt_id)
+        conn = self._conn()
+        with write_transaction(conn):
             head = conn.execute("SELECT status FROM receipts WHERE id=?", (receipt_id,)).fetchone()
             if not head:
                 raise ValueError("Bon inexistent.")
             if head["status"] != "open":
                 raise ValueError("Bonul nu este în stare 'open'.")
-
-            # luăm liniile bonului
-            items = conn.execute("""
-                SELECT product_id, qty_base
-                FROM receipt_lines
-                WHERE receipt_id=?
-                ORDER BY id
-            """, (receipt_id,)).fetchall()
-
-            # pentru fiecare produs, consumăm FIFO pe lot
-            for it in items:
-                product_id = int(it["product_id"])
-                remaining  = int(it["qty_base"])
-
-                # 1) loturi cu stoc > 0, ordonate: expirare apropiată → NULL la final
-                rows = conn.execute("""
-                    SELECT b.id AS batch_id,
-                        COALESCE(SUM(m.quantity_base),0) AS stock_base,
-                        b.expiry_date
-                    FROM batches b
-                    LEFT JOIN movements m ON m.batch_id = b.id
-                    WHERE b.product_id=?
-                    GROUP BY b.id
-                    HAVING stock_base > 0
-                    ORDER BY (b.expiry_date IS NULL), b.expiry_date ASC, b.id ASC
-                """, (product_id,)).fetchall()
-
-                for r in rows:
-                    if remaining <= 0:
-                        break
-                    take = min(remaining, int(r["stock_base"]))
-                    if take > 0:
-                        conn.execute("""
-                            INSERT INTO movements(product_id, batch_id, quantity_base, reason, note)
-                            VALUES (?, ?, ?, 'sale', ?)
-                        """, (product_id, r["batch_id"], -take, f"receipt:{receipt_id}"))
-                        remaining -= take
-
-                # 2) fallback: stoc fără lot (batch_id IS NULL)
-                if remaining > 0:
-                    s_null = conn.execute("""
-                        SELECT COALESCE(SUM(quantity_base),0) AS stock_base
-                        FROM movements
-                        WHERE product_id=? AND batch_id IS NULL
-                    """, (product_id,)).fetchone()["stock_base"]
-                    s_null = int(s_null)
-                    if s_null >= remaining:
-                        conn.execute("""
-                            INSERT INTO movements(product_id, batch_id, quantity_base, reason, note)
-                            VALUES (?, NULL, ?, 'sale', ?)
-                        """, (product_id, -remaining, f"receipt:{receipt_id}"))
-                        remaining = 0
-
-                if remaining > 0:
-                    raise ValueError("Stoc insuficient pentru unul dintre produse.")
-
-            # total din SUM(line_total_cents)
-            total_cents = conn.execute("""
-                SELECT COALESCE(SUM(line_total_cents),0) AS t
-                FROM receipt_lines
-                WHERE receipt_id=?
-            """, (receipt_id,)).fetchone()["t"]
-
-            conn.execute("""
-                UPDATE receipts
-                SET status='closed', closed_at=CURRENT_TIMESTAMP, total_cached_cents=?
-                WHERE id=?
-            """, (int(total_cents), receipt_id))
+            self._close_receipt(conn, receipt_id)
+        return receipt_id
+
+    def _finalize_buffered(self, receipt_id: int) -> int:
+        # antet + linii + mișcări FIFO + închidere: o singură tranzacție, la fel ca bonul din bază
+        r = self.receipts.snapshot(receipt_id)
+        if r is None:
+            raise ValueError("Bon inexistent.")
+        conn = self._conn()
+        # tranzacția e a noastră → COMMIT cu fsync: jurnalul se golește doar după o vânzare care
+        # supraviețuiește și unei căderi de curent (sub GroupCommitWriter decide durable al writer-ului)
+        durable = not conn.in_transaction
+        if durable:
+            sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+            conn.execute("PRAGMA synchronous=FULL")
+        try:
+            db_id = self._write_buffered(conn, receipt_id, r)
+        finally:
+            if durable:
+                conn.execute(f"PRAGMA synchronous={int(sync)}")
+        return db_id
+
+    def _write_buffered(self, conn, receipt_id: int, r) -> int:
+        with write_transaction(conn):
+            row = conn.execute(RECEIPT_BY_UUID_SQL, (r.uuid,)).fetchone()
+            if row is not None:
+                db_id = int(row["id"])   # deja scris (cădere după COMMIT, bon refăcut din jurnal)
+            else:
+                db_id = conn.execute(RECEIPT_HEAD_INSERT_SQL, (r.uuid, r.opened_at, r.total_cents)).lastrowid
+                conn.executemany(RECEIPT_LINE_INSERT_SQL, [
+                    (db_id, l["product_id"], l["qty_base"], l["unit_price_cents"], l["vat_rate"],
+                     l["line_total_cents"])
+                    for l in r.lines.values()
+                ])
+                self._close_receipt(conn, db_id)
+            # bonul iese din memorie / jurnal abia după COMMIT (sub GroupCommitWriter: după COMMIT-ul
+            # grupului); dacă alocarea FIFO sau COMMIT-ul eșuează, rămâne deschis și în jurnal
+            after_commit(conn, lambda: self.receipts.end(receipt_id, "closed"))
+        return db_id
+
+    def _close_receipt(self, conn, receipt_id: int):
+        """Liniile bonului (deja în receipt_lines) → mișcări FIFO de vânzare + închiderea bonului."""
+        # luăm liniile bonului
+        items = conn.execute(RECEIPT_ITEMS_SQL, (receipt_id,)).fetchall()
+
+        # FIFO pe lot pentru tot bonul: o interogare de solduri, alocare în memorie, un executemany
+        batches, unbatched = load_receipt_stock(conn, receipt_id)
+        moves = allocate_fifo(
+            [(int(it["product_id"]), int(it["qty_base"])) for it in items],
+            batches, unbatched,
+        )
+        note = f"receipt:{receipt_id}"
+        conn.executemany(MOVEMENT_INSERT_SQL, [(pid, bid, qty, "sale", note) for pid, bid, qty in moves])
+
+        # total din SUM(line_total_cents)
+        total_cents = sum(int(it["line_total_cents"]) for it in items)
+
+        conn.execute(RECEIPT_CLOSE_SQL, (int(total_cents), receipt_id))
 
     def void_receipt(self, receipt_id: int):
-        conn = connect(self.db_path)
-        with conn:
+        if self._buffered(receipt_id):
+            self.receipts.end(receipt_id, "void")   # nu a ajuns în bază, nu e nimic de șters
+            return
+        conn = self._conn()
+        with write_transaction(conn):
             conn.execute("UPDATE receipts SET status='void' WHERE id=? AND status='open'", (receipt_id,))
             conn.execute("DELETE FROM receipt_lines WHERE receipt_id=?", (receipt_id,))
 
@@ -475,59 +791,131 @@ class InventoryService:
         raise ValueError("Unitate necunoscută")
 
     # ---- listare stoc pe produs (cu filtrare) ----
-    def get_stock_products(self, search: str = "", low_only: bool = False, low_threshold_human: float = 0.0) -> list[dict]:
-        conn = connect(self.db_path)
-        rows = conn.execute("""
-        SELECT p.id AS product_id, p.name, p.barcode, p.unit,
-                COALESCE(SUM(m.quantity_base),0) AS stock_base
-        FROM products p
-        LEFT JOIN movements m ON m.product_id = p.id
-        GROUP BY p.id
-        """).fetchall()
-
-        items = []
+    # coloanele după care se poate sorta lista de stoc (sortarea se face în SQL)
+    STOCK_SORT_COLUMNS = {
+        "name": "p.name",
+        "barcode": "p.barcode",
+        "unit": "p.unit",
+        "stock": "stock_human",
+    }
+
+    @staticmethod
+    def _like_pattern(search: str) -> str:
+        # textul căutat e literal: %, _ și \ tastate de utilizator nu sunt wildcard-uri
+        esc = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{esc}%"
+
+    def _has_fts(self) -> bool:
+        # products_fts e creat de init_db doar dacă SQLite are FTS5; verificăm o singură dată
+        if self._fts is None:
+            self._fts = has_product_fts(self._conn())
+        return self._fts
+
+    def _product_search_clause(self, search: str):
+        """Condiție pe `p` (products): prin indexul FTS dacă există, altfel subșir cu LIKE."""
+        match = fts_match_query(search) if self._has_fts() else None
+        if match is not None:
+            # prefix pe fiecare cuvânt, fără diacritice / litere mari: "paine alb" → "Pâine albă"
+            return "p.id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)", [match]
+        like = self._like_pattern(search)
+        return "(p.name LIKE ? ESCAPE '\\' OR p.barcode LIKE ? ESCAPE '\\')", [like, like]
+
+    def search_products(self, query: str, limit: int = 20) -> list[dict]:
+        """
+        Căutare de produse pentru tastare live (fereastra de stoc, alegere produs):
+        cele mai relevante `limit` produse, cu stocul curent.
+        """
+        query = (query or "").strip()
+        if not query:
+            return []
+        cols = """
+            p.id AS product_id, p.name, p.barcode, p.internal_sku, p.unit,
+            p.price_per_unit_cents, p.vat_rate, COALESCE(sb.qty_base,0) AS stock_base
+        """
+        match = fts_match_query(query) if self._has_fts() else None
+        if match is not None:
+            rows = self._conn().execute(f"""
+                SELECT {cols}
+                FROM products_fts
+                JOIN products p ON p.id = products_fts.rowid
+                LEFT JOIN stock_balance_product sb ON sb.product_id = p.id
+                WHERE products_fts MATCH ?
+                ORDER BY bm25(products_fts, {BM25_WEIGHTS}), p.name
+                LIMIT ?
+            """, (match, int(limit))).fetchall()
+        else:
+            clause, params = self._product_search_clause(query)
+            rows = self._conn().execute(f"""
+                SELECT {cols}
+                FROM products p
+                LEFT JOIN stock_balance_product sb ON sb.product_id = p.id
+                WHERE {clause}
+                ORDER BY p.name
+                LIMIT ?
+            """, (*params, int(limit))).fetchall()
+        out = []
         for r in rows:
-            unit = r["unit"]
-            stock_base = int(r["stock_base"] or 0)
-            stock_human = float(stock_base) if unit == "buc" else stock_base / 1000.0
-            items.append({
-                "product_id": r["product_id"],
-                "name": r["name"],
-                "barcode": r["barcode"],
-                "unit": unit,
-                "stock_base": stock_base,
-                "stock_human": stock_human,
-            })
-
-        # căutare
+            d = dict(r)
+            d["stock_human"] = self.from_base_qty(d["unit"], int(d["stock_base"]))
+            out.append(d)
+        return out
+
+    def _stock_products_filter(self, search: str, low_only: bool, low_threshold_human: float):
+        """WHERE + parametri pentru lista de stoc (căutare și prag de stoc scăzut, totul în SQL)."""
+        where, params = [], []
+        # căutare în denumire / cod / cod intern (index FTS, cu fallback pe LIKE)
         if search:
-            s = search.lower()
-            items = [it for it in items if s in (it["name"] or "").lower() or s in (it["barcode"] or "").lower()]
-
-        # stoc scăzut per unitatea produsului
+            clause, search_params = self._product_search_clause(search)
+            where.append(clause)
+            params += search_params
+        # stoc scăzut per unitatea produsului: pragul e în buc / kg / l → în unități de bază
         if low_only:
-            def thr_base_for(unit: str) -> int:
-                return int(round(low_threshold_human)) if unit == "buc" else int(round(low_threshold_human * 1000))
-            items = [it for it in items if it["stock_base"] <= thr_base_for(it["unit"])]
+            where.append("COALESCE(sb.qty_base,0) <= CASE WHEN p.unit = 'buc' THEN ? ELSE ? END")
+            params += [int(round(low_threshold_human)), int(round(low_threshold_human * 1000))]
+        return (" WHERE " + " AND ".join(where)) if where else "", params
 
-        items.sort(key=lambda x: x["name"] or "")
-        return items
+    def get_stock_products(
+        self,
+        search: str = "",
+        low_only: bool = False,
+        low_threshold_human: float = 0.0,
+        *,
+        order_by: str = "name",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> list[dict]:
+        if order_by not in self.STOCK_SORT_COLUMNS:
+            raise ValueError(f"Coloană de sortare necunoscută: {order_by}")
+        where, params = self._stock_products_filter(search, low_only, low_threshold_human)
+        direction = "DESC" if descending else "ASC"
+        sql = f"""
+        SELECT p.id AS product_id, p.name, p.barcode, p.unit,
+                COALESCE(sb.qty_base,0) AS stock_base,
+                CASE WHEN p.unit = 'buc' THEN CAST(COALESCE(sb.qty_base,0) AS REAL)
+                     ELSE COALESCE(sb.qty_base,0) / 1000.0 END AS stock_human
+        FROM products p
+        LEFT JOIN stock_balance_product sb ON sb.product_id = p.id
+        {where}
+        ORDER BY {self.STOCK_SORT_COLUMNS[order_by]} {direction}, p.id {direction}
+        """
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+        return [dict(r) for r in self._conn().execute(sql, params)]
+
+    def count_stock_products(self, search: str = "", low_only: bool = False, low_threshold_human: float = 0.0) -> int:
+        where, params = self._stock_products_filter(search, low_only, low_threshold_human)
+        return int(self._conn().execute(f"""
+            SELECT COUNT(*) FROM products p
+            LEFT JOIN stock_balance_product sb ON sb.product_id = p.id
+            {where}
+        """, params).fetchone()[0])
 
 
     def get_product_batches(self, product_id: int) -> list[dict]:
-        conn = connect(self.db_path)
-        rows = conn.execute("""
-        SELECT b.id AS batch_id,  b.lot_code, b.expiry_date,
-                COALESCE(SUM(m.quantity_base),0) AS stock_base,
-                p.unit
-        FROM batches b
-        JOIN products p ON p.id = b.product_id
-        LEFT JOIN movements m ON m.batch_id = b.id
-        WHERE b.product_id=?
-        GROUP BY b.id
-        HAVING stock_base <> 0
-        ORDER BY (b.expiry_date IS NULL), b.expiry_date ASC, b.id ASC
-        """, (product_id,)).fetchall()
+        conn = self._conn()
+        rows = conn.execute(PRODUCT_BATCHES_SQL, (product_id,)).fetchall()
 
         items = []
         unit = None
@@ -543,11 +931,8 @@ class InventoryService:
             })
 
         # pseudo-lot pentru batch_id IS NULL
-        null_stock = int(conn.execute("""
-                SELECT COALESCE(SUM(quantity_base),0) AS stock_base
-                FROM movements
-                WHERE product_id=? AND batch_id IS NULL
-            """, (product_id,)).fetchone()["stock_base"] or 0)
+        row = conn.execute(UNBATCHED_STOCK_SQL, (product_id,)).fetchone()
+        null_stock = int(row["unbatched_qty_base"] or 0) if row else 0
 
         if null_stock != 0:
             if unit is None:
@@ -567,82 +952,46 @@ class InventoryService:
         Loturi care expiră în următoarele `days` zile (inclusiv azi), doar cu stoc > 0.
         Returnează: product_name, barcode, expiry_date (YYYY-MM-DD), stock_human, days_left
         """
-        conn = connect(self.db_path)
-        rows = conn.execute("""
-            SELECT p.name AS product_name, p.barcode, p.unit, b.expiry_date,
-                COALESCE(SUM(m.quantity_base),0) AS stock_base
-            FROM batches b
-            JOIN products p ON p.id = b.product_id
-            LEFT JOIN movements m ON m.batch_id = b.id
-            WHERE b.expiry_date IS NOT NULL
-            GROUP BY b.id
-            HAVING stock_base > 0
-            ORDER BY b.expiry_date ASC, b.id ASC
-        """).fetchall()
-
+        conn = self._conn()
         today = date.today()
-        items = []
-
-        for r in rows:
-            raw = r["expiry_date"]
-
-            # normalizează la datetime.date
-            if isinstance(raw, datetime):
-                d = raw.date()
-            elif isinstance(raw, date):
-                d = raw
-            elif isinstance(raw, str) and raw:
-                try:
-                    d = date.fromisoformat(raw)
-                except ValueError:
-                    continue
-            else:
-                continue
-
-            days_left = (d - today).days
-            if 0 <= days_left <= int(days):
-                stock_base = int(r["stock_base"] or 0)
-                stock_human = self.from_base_qty(r["unit"], stock_base)
-                items.append({
-                    "product_name": r["product_name"],
-                    "barcode": r["barcode"],
-                    "expiry_date": d.isoformat(),   # UI primește mereu text
-                    "stock_human": stock_human,
-                    "days_left": days_left,
-                })
-
-        items.sort(key=lambda x: (x["days_left"], x["expiry_date"]))
-        return items
+        # intervalul [azi, azi+days] pe indexul ix_batches_expiry_iso: citim doar loturile din fereastră
+        rows = conn.execute(EXPIRING_BATCHES_SQL, (
+            today.isoformat(), today.isoformat(), (today + timedelta(days=int(days))).isoformat())).fetchall()
+
+        return [{
+            "product_name": r["product_name"],
+            "barcode": r["barcode"],
+            "expiry_date": r["expiry_iso"],   # UI primește mereu text
+            "stock_human": self.from_base_qty(r["unit"], int(r["stock_base"] or 0)),
+            "days_left": int(r["days_left"]),
+        } for r in rows]
     
     def update_product_price(self, product_id: int, price_per_unit_lei: float) -> None:
-        conn = connect(self.db_path)
-        with conn:
+        conn = self._conn()
+        with write_transaction(conn):
             conn.execute(
                 "UPDATE products SET price_per_unit_cents=? WHERE id=?",
                 (lei_to_cents(price_per_unit_lei), int(product_id))
             )
+        self.products.invalidate_product(int(product_id))
 
     
-    def _next_seq(self, name: str) -> int:
-        ### Contor atomic pe cheie (ex: 'lot:session:15:20250919').
-        conn = connect(self.db_path)
-        with conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS sequences (
-                    name TEXT PRIMARY KEY,
-                    value INTEGER NOT NULL
-                )
-            """)
-            conn.execute("INSERT OR IGNORE INTO sequences(name, value) VALUES(?, 0)", (name,))
-            conn.execute("UPDATE sequences SET value = value + 1 WHERE name=?", (name,))
-            row = conn.execute("SELECT value FROM sequences WHERE name=?", (name,)).fetchone()
-            return int(row["value"])
+    def _next_seq(self, conn, name: str) -> int:
+        ### Contor atomic pe cheie (ex: 'lot:session:15:20250919'), în tranzacția apelantului.
+        ### Tabela sequences e creată de init_db.
+        return reserve_seq(conn, name, 1)
+
+    def _auto_lot_codes(self, conn, session_id: int, count: int) -> List[str]:
+        """`count` coduri de lot automate consecutive (o singură rezervare din secvență)."""
+        if count <= 0:
+            return []
+        ymd = date.today().strftime("%Y%m%d")
+        first = reserve_seq(conn, f"lot:session:{session_id}:{ymd}", count)   # contor pe sesiune + zi
+        return [f"S{session_id}-{ymd}-{seq:04d}" for seq in range(first, first + count)]
 
-    def _auto_lot_code(self, session_id: int) -> str:
+    def _auto_lot_code(self, conn, session_id: int) -> str:
         """Generează un cod de lot lizibil și unic. Format: S<sess>-<zi>-<nr> (ex. S12-20250919-0001)."""
-        ymd = date.today().strftime("%Y%m%d")
-        seq = self._next_seq(f"lot:session:{session_id}:{ymd}")   # contor pe sesiune + zi
-        return f"S{session_id}-{ymd}-{seq:04d}"
+        return self._auto_lot_codes(conn, session_id, 1)[0]
     
     # --- Liniile dintr-o sesiune de intrare (pt. UI) ---
     def get_stock_in_lines(self, session_id: int) -> list[dict]:
@@ -651,7 +1000,7 @@ class InventoryService:
         line_id, product_id, name, barcode, unit, qty_human, expiry_date, lot_code,
         unit_cost_lei, line_value_lei
         """
-        conn = connect(self.db_path)
+        conn = self._conn()
         rows = conn.execute("""
             SELECT l.id AS line_id, l.product_id, l.quantity_base, l.unit_cost_cents,
                 l.supplier_name, l.supplier_doc,
@@ -710,7 +1059,13 @@ class InventoryService:
         supplier_name: str | None | object = ...,
         supplier_doc: str | None | object = ...,
     ) -> None:
-        conn = connect(self.db_path)
+        conn = self._conn()
+        with write_transaction(conn):
+            self._update_stock_in_line(conn, line_id, qty_human, expiry_date, lot_code,
+                                       unit_cost_lei, supplier_name, supplier_doc)
+
+    def _update_stock_in_line(self, conn, line_id, qty_human, expiry_date, lot_code,
+                              unit_cost_lei, supplier_name, supplier_doc) -> None:
         row = conn.execute("""
             SELECT l.product_id, l.quantity_base, l.unit_cost_cents, l.batch_id,
                 p.unit, l.supplier_name, l.supplier_doc
@@ -739,26 +1094,25 @@ class InventoryService:
         if (expiry_date is not ...) or (lot_code is not ...):
             exp = None if expiry_date is ... else expiry_date
             lot = None if lot_code is ... else (lot_code or None)
-            new_batch_id = self.get_or_create_batch(product_id, exp, lot)
+            new_batch_id = self._get_or_create_batch(conn, product_id, exp, lot)
 
         # supplier fields (păstrează-vechile dacă nu-s transmise)
         new_supplier_name = row["supplier_name"] if supplier_name is ... else supplier_name
         new_supplier_doc  = row["supplier_doc"]  if supplier_doc  is ... else supplier_doc
 
-        with conn:
-            conn.execute("""
-                UPDATE stock_in_lines
-                SET quantity_base=?,
-                    unit_cost_cents=?,
-                    batch_id=?,
-                    supplier_name=?,
-                    supplier_doc=?
-                WHERE id=?
-            """, (new_qty_base, new_cost_cents, new_batch_id, new_supplier_name, new_supplier_doc, line_id))
+        conn.execute("""
+            UPDATE stock_in_lines
+            SET quantity_base=?,
+                unit_cost_cents=?,
+                batch_id=?,
+                supplier_name=?,
+                supplier_doc=?
+            WHERE id=?
+        """, (new_qty_base, new_cost_cents, new_batch_id, new_supplier_name, new_supplier_doc, line_id))
 
     def delete_stock_in_line(self, line_id: int) -> None:
-        conn = connect(self.db_path)
-        with conn:
+        conn = self._conn()
+        with write_transaction(conn):
             conn.execute("DELETE FROM stock_in_lines WHERE id=?", (line_id,))
 
 
@@ -0,0 +1,133 @@
+from typing import Callable, Dict, Optional, Set
+
+from PySide6 import QtCore
+from ..services.use_cases import InventoryService
+
+# Apeluri InventoryService în afara thread-ului GUI.
+#
+#   tasks = AsyncService(svc, parent)
+#   tasks.read(svc.get_expiring_batches, 7, on_done=self._fill, key="expirare", owner=self)
+#   tasks.write(svc.add_line_to_receipt, rid, code, qty, on_done=self._line_added, owner=self)
+#
+# - citirile rulează în paralel pe un QThreadPool (fiecare thread are conexiunea lui din ConnectionManager)
+# - scrierile rulează pe un singur thread, strict în ordinea trimiterii (scanările nu se pot inversa,
+#   finalize/void ajung după toate liniile trimise înainte)
+# - rezultatul / excepția se livrează pe thread-ul GUI, prin semnal (callback-urile pot atinge widget-uri)
+# - `key`: o cerere nouă cu aceeași cheie o anulează pe cea veche (ex. căutarea de la tastarea anterioară);
+#   dacă a pornit deja, rezultatul ei e ignorat
+# - `owner`: la închiderea dialogului, detach(owner) renunță la callback-urile lui (scrierile tot se execută)
+
+
+class Task(QtCore.QRunnable):
+    def __init__(self, facade: "AsyncService", fn: Callable, args, kwargs,
+                 on_done, on_error, key: Optional[str], owner, write: bool):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.facade = facade
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.on_done, self.on_error = on_done, on_error
+        self.key, self.owner, self.write = key, owner, write
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        # o scriere trimisă nu se anulează niciodată (ordinea lor e garanția pentru UI); doar callback-urile
+        if not self.write:
+            self.cancelled = True
+        self.on_done = self.on_error = None
+
+    def run(self):
+        if self.cancelled:
+            self.facade._delivered.emit(self, None, None)
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:   # livrat pe GUI, nu pierdut în thread
+            self.facade._delivered.emit(self, False, e)
+        else:
+            self.facade._delivered.emit(self, True, result)
+
+
+class AsyncService(QtCore.QObject):
+    busyChanged = QtCore.Signal(bool)
+    failed = QtCore.Signal(str)              # erori fără on_error propriu
+    _delivered = QtCore.Signal(object, object, object)   # task, ok (None = anulat), rezultat / excepție
+
+    READ_THREADS = 2
+
+    def __init__(self, svc: InventoryService, parent=None):
+        super().__init__(parent)
+        self.svc = svc
+        self._reads = QtCore.QThreadPool(self)
+        self._reads.setMaxThreadCount(self.READ_THREADS)
+        self._reads.setExpiryTimeout(-1)           # ca la scriere: un thread expirat și-ar lăsa conexiunea deschisă
+        self._writes = QtCore.QThreadPool(self)
+        self._writes.setMaxThreadCount(1)          # un singur writer → FIFO
+        self._writes.setExpiryTimeout(-1)          # thread-ul (și conexiunea lui) rămâne în viață
+        self._live: Set[Task] = set()
+        self._latest: Dict[str, Task] = {}
+        self._delivered.connect(self._deliver)     # emis din worker → coadă pe thread-ul GUI
+
+    # ---------- trimitere ----------
+    def read(self, fn: Callable, *args, on_done=None, on_error=None,
+             key: Optional[str] = None, owner=None, **kwargs) -> Task:
+        return self._submit(self._reads, fn, args, kwargs, on_done, on_error, key, owner, write=False)
+
+    def write(self, fn: Callable, *args, on_done=None, on_error=None, owner=None, **kwargs) -> Task:
+        return self._submit(self._writes, fn, args, kwargs, on_done, on_error, None, owner, write=True)
+
+    def _submit(self, pool, fn, args, kwargs, on_done, on_error, key, owner, write) -> Task:
+        task = Task(self, fn, args, kwargs, on_done, on_error, key, owner, write)
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = task
+        was_idle = not self._live
+        self._live.add(task)
+        pool.start(task)
+        if was_idle:
+            self.busyChanged.emit(True)
+        return task
+
+    # ---------- anulare ----------
+    def cancel(self, key: str) -> None:
+        old = self._latest.pop(key, None)
+        if old is not None:
+            old.cancel()
+
+    def detach(self, owner) -> None:
+        """Dialogul se închide: citirile lui nepornite se anulează, callback-urile nu se mai apelează."""
+        for task in list(self._live):
+            if task.owner is owner:
+                task.cancel()
+                task.owner = None
+        for key in [k for k, t in self._latest.items() if t.owner is None]:
+            self._latest.pop(key, None)
+
+    # ---------- stare ----------
+    def pending(self) -> int:
+        return len(self._live)
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Blochează până se termină tot ce e în lucru (la închiderea aplicației)."""
+        ok = self._writes.waitForDone(msecs) and self._reads.waitForDone(msecs)
+        QtCore.QCoreApplication.sendPostedEvents(self)   # livrează rezultatele rămase în coadă
+        return ok
+
+    # ---------- livrare (thread GUI) ----------
+    @QtCore.Slot(object, object, object)
+    def _deliver(self, task: Task, ok, payload):
+        self._live.discard(task)
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        try:
+            if ok is None or task.cancelled:
+                return
+            if ok:
+                if task.on_done is not None:
+                    task.on_done(payload)
+            elif task.on_error is not None:
+                task.on_error(payload)
+            else:
+                self.failed.emit(str(payload))
+        finally:
+            if not self._live:
+                self.busyChanged.emit(False)
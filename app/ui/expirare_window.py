@@ -1,10 +1,12 @@
 from PySide6 import QtWidgets, QtCore
 from ..services.use_cases import InventoryService
+from .async_service import AsyncService
 
 class ExpirareWindow(QtWidgets.QDialog):
-    def __init__(self, svc: InventoryService, parent=None):
+    def __init__(self, svc: InventoryService, parent=None, tasks: AsyncService = None):
         super().__init__(parent)
         self.svc = svc
+        self.tasks = tasks or AsyncService(svc, self)
         self.setWindowTitle("Alerte expirare")
         self.resize(720, 520)
 
@@ -28,11 +30,16 @@ class ExpirareWindow(QtWidgets.QDialog):
         layout.addWidget(self.table)
 
         self.btn_refresh.clicked.connect(self.refresh)
+        self.spin_days.valueChanged.connect(self.refresh)
         self.refresh()
 
     def refresh(self):
         days = int(self.spin_days.value())
-        items = self.svc.get_expiring_batches(days)
+        # dacă se apasă din nou înainte să vină rezultatul, cererea veche se anulează
+        self.tasks.read(self.svc.get_expiring_batches, days, key=f"expirare:{id(self)}", owner=self,
+                        on_done=self._fill)
+
+    def _fill(self, items: list):
         self.table.setRowCount(0)
         for it in items:
             r = self.table.rowCount(); self.table.insertRow(r)
@@ -48,3 +55,7 @@ class ExpirareWindow(QtWidgets.QDialog):
                 for c in range(5):
                     cell = self.table.item(r, c)
                     if cell: cell.setBackground(QtCore.Qt.GlobalColor.yellow)
+
+    def done(self, r):
+        self.tasks.detach(self)
+        super().done(r)
@@ -1,5 +1,6 @@
 from PySide6 import QtWidgets, QtCore, QtGui
 from ..services.use_cases import InventoryService
+from .async_service import AsyncService
 from datetime import date, datetime 
 import csv, os
 
@@ -8,14 +9,19 @@ import csv, os
 # O optiune de a exporta totul ca si tabel (tot ce adaugasem in sesiunea respectiva)
 
 class IntrareDialog(QtWidgets.QDialog):
-    def __init__(self, svc: InventoryService, parent=None):
+    def __init__(self, svc: InventoryService, parent=None, tasks: AsyncService = None):
         super().__init__(parent)
         self.svc = svc
+        self.tasks = tasks or AsyncService(svc, self)
+        self._key = f"intrare:{id(self)}"
+        self._closing = False
+        self._last_lines = []
         self.setWindowTitle("Intrare în stoc (Sesiune)")
         self.resize(760, 560)
 
-        # 1) Pornește o sesiune nouă
-        self.session_id = self.svc.start_stock_in_session()
+        # 1) Pornește o sesiune nouă — pe thread-ul de scriere, id-ul vine în _session_started
+        self.session_id = None
+        self._started_id = None            # scris de thread-ul de scriere (vezi _start_session / _discard)
 
         # 2) Formularele de introducere
         form = QtWidgets.QFormLayout()
@@ -87,11 +93,14 @@ class IntrareDialog(QtWidgets.QDialog):
 
         # 3) Butoane acțiune
         self.btn_add = QtWidgets.QPushButton("Adaugă în sesiune (Enter)")
+        self.btn_import = QtWidgets.QPushButton("Importă din fișier…")
+        self.btn_import.setToolTip("Excel (.xlsx) sau CSV cu aceleași coloane ca exportul sesiunii.")
         self.btn_close = QtWidgets.QPushButton("Închide sesiunea")
         self.btn_cancel = QtWidgets.QPushButton("Anulează")
 
         btns = QtWidgets.QHBoxLayout()
         btns.addWidget(self.btn_add)
+        btns.addWidget(self.btn_import)
         btns.addStretch()
         btns.addWidget(self.btn_close)
         btns.addWidget(self.btn_cancel)
@@ -121,6 +130,7 @@ class IntrareDialog(QtWidgets.QDialog):
 
         # 6) Conexiuni
         self.btn_add.clicked.connect(self.add_line)
+        self.btn_import.clicked.connect(self.import_file)
         self.btn_close.clicked.connect(self.finish_session)
         self.btn_cancel.clicked.connect(self.reject)
 
@@ -129,9 +139,32 @@ class IntrareDialog(QtWidgets.QDialog):
         QtGui.QShortcut(QtGui.QKeySequence("Enter"),  self, activated=self.add_line)
         QtGui.QShortcut(QtGui.QKeySequence("Esc"),    self, activated=self.reject)
 
+        # adăugarea, importul și închiderea rămân oprite până avem id-ul sesiunii
+        self._set_ready(False)
+        self.tasks.write(self._start_session, owner=self, on_done=self._session_started,
+                         on_error=self._start_failed)
+
+    def _start_session(self) -> int:
+        # thread-ul de scriere; id-ul rămâne și pentru un reject() trimis înainte să ajungă pe GUI
+        self._started_id = self.svc.start_stock_in_session()
+        return self._started_id
+
+    def _session_started(self, session_id: int):
+        self.session_id = session_id
+        if self._closing:
+            return
+        self._set_ready(True)
         self.in_barcode.setFocus()
-        self.refresh_lines()          # populeaza tabelul cu liniile reale
-        self.refresh_summary()        # doar labelul de sumar
+        self.refresh()                # tabelul cu liniile reale + labelul de sumar
+
+    def _start_failed(self, e: Exception):
+        QtWidgets.QMessageBox.critical(self, "Eroare", f"Sesiunea nu a putut fi pornită: {e}")
+        self._closing = True
+        super().reject()
+
+    def _set_ready(self, ready: bool):
+        for w in (self.btn_add, self.btn_import, self.btn_close):
+            w.setEnabled(ready)
 
 
     # ----- helpers -----
@@ -158,6 +191,8 @@ class IntrareDialog(QtWidgets.QDialog):
 
     # ----- acțiuni -----
     def add_line(self):
+        if self._closing or self.session_id is None:
+            return
         raw = self.in_barcode.text().strip()
         if not raw:
             QtWidgets.QMessageBox.warning(self, "Eroare", "Scanează sau introdu un cod de bare.")
@@ -178,15 +213,7 @@ class IntrareDialog(QtWidgets.QDialog):
             QtWidgets.QMessageBox.warning(self, "Eroare", "Cantitatea trebuie să fie > 0.")
             return
 
-        # daca produsul exista si pretul introdus difera, actualizeaza pretul la raft
-        p = self.svc.find_product_by_barcode(barcode)
-        if p:
-            old_price = (p["price_per_unit_cents"] / 100.0) if p.get("price_per_unit_cents") is not None else None
-            new_price = float(self.in_price.value())
-            if old_price is None or abs(new_price - old_price) > 1e-9:
-                self.svc.update_product_price(int(p["id"]), new_price)
-
-        self.svc.add_stock_in_line(
+        fields = dict(
             session_id=self.session_id,
             barcode=barcode,
             quantity=qty,
@@ -200,15 +227,71 @@ class IntrareDialog(QtWidgets.QDialog):
             supplier_doc=(self.in_doc.text().strip() or None),
         )
 
-        # reset pentru următoarea scanare
+        # reset pentru următoarea scanare (linia se scrie în fundal)
         self.in_barcode.clear()
         self.in_name.clear()
         self.in_lot.clear()
         self.in_qty.setValue(1.000)
         self.in_barcode.setFocus()
 
-        self.refresh_lines()
-        self.refresh_summary()
+        self.tasks.write(self._add_line, fields, owner=self, on_done=lambda _: self.refresh(),
+                         on_error=self._write_failed)
+
+    def _add_line(self, fields: dict) -> int:
+        # thread-ul de scriere: actualizare preț + linia, în ordinea scanărilor
+        # daca produsul exista si pretul introdus difera, actualizeaza pretul la raft
+        p = self.svc.find_product_by_barcode(fields["barcode"])
+        if p:
+            old_price = (p["price_per_unit_cents"] / 100.0) if p.get("price_per_unit_cents") is not None else None
+            new_price = fields["price_per_unit_lei"]
+            if old_price is None or abs(new_price - old_price) > 1e-9:
+                self.svc.update_product_price(int(p["id"]), new_price)
+        return self.svc.add_stock_in_line(**fields)
+
+    def _write_failed(self, e: Exception):
+        self.refresh()
+        QtWidgets.QMessageBox.critical(self, "Eroare", str(e))
+
+    def import_file(self):
+        if self.session_id is None:
+            return
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Importă intrare", "", "Excel / CSV (*.xlsx *.csv);;Excel (*.xlsx);;CSV (*.csv)"
+        )
+        if not path:
+            return
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        self.btn_import.setEnabled(False)
+        self.tasks.write(self.svc.import_stock_in_file, self.session_id, path, owner=self,
+                         on_done=self._import_done, on_error=self._import_failed)
+
+    def _import_failed(self, e: Exception):
+        QtWidgets.QApplication.restoreOverrideCursor()
+        self.btn_import.setEnabled(True)
+        if isinstance(e, ImportError):
+            QtWidgets.QMessageBox.warning(self, "Import", "Pentru .xlsx este necesar pachetul openpyxl.")
+        elif isinstance(e, (ValueError, OSError)):
+            QtWidgets.QMessageBox.warning(self, "Import", str(e))
+        else:
+            QtWidgets.QMessageBox.critical(self, "Import", str(e))
+
+    def _import_done(self, res: dict):
+        QtWidgets.QApplication.restoreOverrideCursor()
+        self.btn_import.setEnabled(True)
+        self.refresh()
+
+        text = (f"Linii importate: {res['imported']} din {res['rows']}\n"
+                f"Produse noi: {res['products_created']} | Prețuri actualizate: {res['prices_updated']}")
+        errors = res["errors"]
+        if not errors:
+            QtWidgets.QMessageBox.information(self, "Import", text)
+            return
+        msg = QtWidgets.QMessageBox(self)
+        msg.setIcon(QtWidgets.QMessageBox.Warning)
+        msg.setWindowTitle("Import")
+        msg.setText(f"{text}\nRânduri cu erori: {len(errors)} (nu au fost importate)")
+        msg.setDetailedText("\n".join(f"Rând {e['row']}: {e['error']}" for e in errors))
+        msg.exec()
 
     def _prefill_from_barcode(self):
         raw = self.in_barcode.text().strip()
@@ -218,7 +301,15 @@ class IntrareDialog(QtWidgets.QDialog):
             code = self._normalize_barcode(raw)
         except Exception:
             return
-        p = self.svc.find_product_by_barcode(code)
+        self.tasks.read(self.svc.find_product_by_barcode, code, key=f"{self._key}:prefill", owner=self,
+                        on_done=lambda p: self._prefill(code, p))
+
+    def _prefill(self, code: str, p):
+        try:
+            if self._normalize_barcode(self.in_barcode.text().strip()) != code:
+                return   # între timp s-a scanat alt cod
+        except ValueError:
+            return
         if p:
             # pune automat nume/unit/preț curent
             if p.get("name"): self.in_name.setText(p["name"])
@@ -229,8 +320,15 @@ class IntrareDialog(QtWidgets.QDialog):
                 self.in_price.setValue(p["price_per_unit_cents"] / 100.0)
 
 
-    def refresh_lines(self):
-        rows = self.svc.get_stock_in_lines(self.session_id)
+    def refresh(self):
+        # o singură citire pentru tabel + sumar; cererile repetate (scanări rapide) o înlocuiesc pe cea veche
+        self.tasks.read(self._load_session, key=f"{self._key}:lines", owner=self,
+                        on_done=lambda res: (self.refresh_lines(res[0]), self.refresh_summary(res[1])))
+
+    def _load_session(self):
+        return self.svc.get_stock_in_lines(self.session_id), self.svc.get_stock_in_summary(self.session_id)
+
+    def refresh_lines(self, rows: list):
         self._last_lines = rows   # păstrăm pentru edit
         self.table.setRowCount(0)
         for idx, it in enumerate(rows, start=1):
@@ -256,8 +354,7 @@ class IntrareDialog(QtWidgets.QDialog):
 
         self.table.resizeColumnsToContents()
 
-    def refresh_summary(self):
-        summary = self.svc.get_stock_in_summary(self.session_id)
+    def refresh_summary(self, summary: dict):
         qty_text = self._format_unit_totals(summary)
         self.lbl_summary.setText(
             f"Distincte: {summary['total_distinct']}  |  Cantități: {qty_text}  |  Valoare (cost): {summary['total_value_lei']:.2f} lei"
@@ -265,9 +362,25 @@ class IntrareDialog(QtWidgets.QDialog):
 
 
     def finish_session(self):
-        # scrie mișcările în stoc și închide sesiunea
+        if self._closing or self.session_id is None:
+            return
+        # scrie mișcările în stoc și închide sesiunea — după toate liniile încă în coadă
+        self._closing = True
+        self.btn_close.setEnabled(False)
+        self.tasks.write(self._close_session, owner=self, on_done=self._session_closed,
+                         on_error=self._close_failed)
+
+    def _close_session(self):
         self.svc.close_stock_in_session(self.session_id)
-        summary = self.svc.get_stock_in_summary(self.session_id)
+        return self.svc.get_stock_in_summary(self.session_id), self.svc.get_stock_in_lines(self.session_id)
+
+    def _close_failed(self, e: Exception):
+        self._closing = False
+        self.btn_close.setEnabled(True)
+        QtWidgets.QMessageBox.critical(self, "Eroare", str(e))
+
+    def _session_closed(self, res):
+        summary, rows = res
 
         # mesaj + butoane custom
         msg = QtWidgets.QMessageBox(self)
@@ -297,15 +410,30 @@ class IntrareDialog(QtWidgets.QDialog):
         msg.exec()
 
         if msg.clickedButton() is btn_export:
-            self._export_session_to_file()
+            self._export_session_to_file(rows)
 
         self.accept()
 
 
     def reject(self):
-        # Anulează sesiunea: șterge linii + sesiunea; NU afectează stocul
-        self.svc.discard_stock_in_session(self.session_id)
+        if self._closing:
+            return
+        # Anulează sesiunea: șterge linii + sesiunea; NU afectează stocul (după liniile încă în coadă)
+        self._closing = True
+        self.tasks.write(self._discard, owner=self)
         super().reject()
+
+    def _discard(self):
+        # thread-ul de scriere: după _start_session (FIFO), deci sesiunea are deja id, chiar dacă
+        # _session_started nu a ajuns încă pe GUI; dacă pornirea a eșuat, nu e nimic de anulat
+        session_id = self.session_id if self.session_id is not None else self._started_id
+        if session_id is not None:
+            self.svc.discard_stock_in_session(session_id)
+
+    def done(self, r):
+        self.tasks.detach(self)
+        super().done(r)
+
     def _ean13_check_digit(self, body12: str) -> int:
         if len(body12) != 12 or not body12.isdigit():
             raise ValueError("EAN-13 trebuie să aibă 12 cifre + cifră de control.")
@@ -397,21 +525,19 @@ class IntrareDialog(QtWidgets.QDialog):
         if not line_id: return
         data = next((x for x in getattr(self, "_last_lines", []) if x["line_id"] == line_id), None)
         if not data: return
-        dlg = EditStockInLineDialog(self.svc, data, self)
+        dlg = EditStockInLineDialog(self.svc, data, self, self.tasks)
         if dlg.exec() == QtWidgets.QDialog.Accepted:
-            self.refresh_lines()
-            self.refresh_summary()
+            self.refresh()
 
     def _delete_selected_line(self):
         line_id = self._selected_line_id()
         if not line_id: return
         if QtWidgets.QMessageBox.question(self, "Confirmare", "Ștergi această linie?") == QtWidgets.QMessageBox.Yes:
-            self.svc.delete_stock_in_line(int(line_id))
-            self.refresh_lines()
-            self.refresh_summary()
+            self.tasks.write(self.svc.delete_stock_in_line, int(line_id), owner=self,
+                             on_done=lambda _: self.refresh(), on_error=self._write_failed)
 
     # export csv fereastra finalizare
-    def _export_session_to_file(self):
+    def _export_session_to_file(self, rows: list):
 
         suggested = f"intrare-S{self.session_id}-{date.today().isoformat()}.csv"
         path, selected_filter = QtWidgets.QFileDialog.getSaveFileName(
@@ -423,8 +549,6 @@ class IntrareDialog(QtWidgets.QDialog):
         if not path:
             return
 
-        rows = self.svc.get_stock_in_lines(self.session_id)
-
         headers = [
             "Nr", "Denumire", "Cod", "Unitate", "Cantitate",
             "Lot", "Expiră la", "Cost/unit", "Preț la raft", "Valoare",
@@ -548,9 +672,10 @@ class IntrareDialog(QtWidgets.QDialog):
 ### -----------------------------------------------------------------------------------------------------------------------------------
 
 class EditStockInLineDialog(QtWidgets.QDialog):
-    def __init__(self, svc: InventoryService, line: dict, parent=None):
+    def __init__(self, svc: InventoryService, line: dict, parent=None, tasks: AsyncService = None):
         super().__init__(parent)
         self.svc = svc
+        self.tasks = tasks or AsyncService(svc, self)
         self.line = line
         self.setWindowTitle(f"Editează – {line['name']}")
         self.resize(420, 300)
@@ -615,34 +740,48 @@ class EditStockInLineDialog(QtWidgets.QDialog):
         self.btn_cancel.clicked.connect(self.reject)
 
     def save(self):
+        qty = float(self.sp_qty.value())
+        exp = self.dt_exp.date().toString("yyyy-MM-dd") if self.chk_exp.isChecked() else None
+        lot = (self.ed_lot.text().strip() or None)
+        cost = float(self.sp_cost.value())
+        sup  = self.ed_sup.text().strip() or None
+        doc  = self.ed_doc.text().strip() or None
+        shelf_price = float(self.sp_price.value())
+
+        self.btn_ok.setEnabled(False)
+        self.tasks.write(self._save, qty, exp, lot, cost, sup, doc, shelf_price, owner=self,
+                         on_done=self._saved, on_error=self._save_failed)
+
+    def _save(self, qty, exp, lot, cost, sup, doc, shelf_price):
+        # thread-ul de scriere; întoarce avertismentul pentru preț (dacă e cazul)
+        warning = None
+        # actualizează prețul din products doar dacă s-a schimbat
         try:
-            qty = float(self.sp_qty.value())
-            exp = self.dt_exp.date().toString("yyyy-MM-dd") if self.chk_exp.isChecked() else None
-            lot = (self.ed_lot.text().strip() or None)
-            cost = float(self.sp_cost.value())
-            sup  = self.ed_sup.text().strip() or None
-            doc  = self.ed_doc.text().strip() or None
-            shelf_price = float(self.sp_price.value())
-
-            # actualizează prețul din products doar dacă s-a schimbat
-            try:
-                if abs(shelf_price - float(self.line.get("price_per_unit_lei", 0.0))) > 1e-9:
-                    self.svc.update_product_price(int(self.line["product_id"]), shelf_price)
-            except Exception as e:
-                QtWidgets.QMessageBox.warning(self, "Atenție", f"Prețul la raft nu a putut fi actualizat: {e}")
-
-
-            self.svc.update_stock_in_line(
-                self.line["line_id"],
-                qty_human=qty,
-                expiry_date=exp,      # setează/șterge expirarea
-                lot_code=lot,         # setează/șterge lotul
-                unit_cost_lei=cost,
-                supplier_name=sup,
-                supplier_doc=doc,
-            )
-            self.accept()
+            if abs(shelf_price - float(self.line.get("price_per_unit_lei", 0.0))) > 1e-9:
+                self.svc.update_product_price(int(self.line["product_id"]), shelf_price)
         except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Eroare", str(e))
+            warning = f"Prețul la raft nu a putut fi actualizat: {e}"
+
+        self.svc.update_stock_in_line(
+            self.line["line_id"],
+            qty_human=qty,
+            expiry_date=exp,      # setează/șterge expirarea
+            lot_code=lot,         # setează/șterge lotul
+            unit_cost_lei=cost,
+            supplier_name=sup,
+            supplier_doc=doc,
+        )
+        return warning
+
+    def _saved(self, warning):
+        if warning:
+            QtWidgets.QMessageBox.warning(self, "Atenție", warning)
+        self.accept()
 
+    def _save_failed(self, e: Exception):
+        self.btn_ok.setEnabled(True)
+        QtWidgets.QMessageBox.critical(self, "Eroare", str(e))
 
+    def done(self, r):
+        self.tasks.detach(self)
+        super().done(r)
@@ -1,11 +1,12 @@
 from PySide6 import QtWidgets, QtCore, QtGui
 from ..util.config import load_config
-from ..infra.db_init import init_db
+from ..infra.db import lock_policy, query_stats
 from ..services.use_cases import InventoryService
-from .intrare_dialog import IntrareDialog
-from .vanzare_dialog import VanzareDialog
-from .stoc_window import StocWindow
-from .expirare_window import ExpirareWindow
+from .async_service import AsyncService
+
+# Pornire rapidă: ferestrele (și ce importă ele: openpyxl la export, modelele de tabel etc.) se importă
+# la prima deschidere, iar baza se deschide/verifică pe thread-ul de scriere după ce fereastra e afișată.
+# Până atunci butoanele sunt inactive.
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -15,8 +16,25 @@ class MainWindow(QtWidgets.QMainWindow):
         self.resize(900, 600)
 
         self.cfg = load_config()
-        self.conn = init_db(self.cfg["db_path"])
-        self.svc = InventoryService(self.cfg["db_path"])
+        # statistici per interogare (Setări → Interogări SQL); trebuie setate înainte de prima conexiune
+        query_stats.configure(self.cfg["sql_stats"], self.cfg["sql_slow_ms"], self.cfg["sql_slow_log"])
+        lock_policy.configure(self.cfg["multi_client"], self.cfg["busy_timeout_ms"], self.cfg["write_retries"])
+        if self.cfg["db_mode"] == "remote":
+            # fără bază locală: totul trece prin serverul API (services.api_server) de la api_base_url
+            from ..services.remote_service import RemoteInventoryService
+            self.svc = RemoteInventoryService(self.cfg["api_base_url"], self.cfg["api_token"])
+        else:
+            # nu atinge baza până la primul apel; cu buffered_receipts bonul deschis stă în memorie + jurnal
+            journal = self.cfg["receipt_journal"] if self.cfg["buffered_receipts"] else None
+            self.svc = InventoryService(self.cfg["db_path"], receipt_journal=journal,
+                                        journal_fsync=self.cfg["receipt_journal_fsync"])
+        self.backups = None
+        self.api = None
+        self._ready = False
+        self._recovered = []   # bonuri nefinalizate refăcute din jurnal (se reiau la următoarea vânzare)
+        # un singur set de thread-uri (cititori + writer) pentru toate ferestrele
+        self.tasks = AsyncService(self.svc, self)
+        self.tasks.failed.connect(lambda msg: QtWidgets.QMessageBox.warning(self, "Eroare", msg))
 
         central = QtWidgets.QWidget()
         self.setCentralWidget(central)
@@ -40,7 +58,8 @@ class MainWindow(QtWidgets.QMainWindow):
         layout.addWidget(self.btn_setari)
         layout.insertWidget(3, self.btn_expirare)
 
-        self.statusBar().showMessage("Pregătit")
+        central.setEnabled(False)
+        self.statusBar().showMessage("Se deschide baza de date…")
 
         # Conectări
         self.btn_intrare.clicked.connect(self.open_intrare)
@@ -63,23 +82,107 @@ class MainWindow(QtWidgets.QMainWindow):
         self.sc_f4.activated.connect(self.open_expirare)
         self.sc_f10.activated.connect(self.open_setari)
 
-
+        # schema (init_db) pe thread-ul de scriere: orice scriere trimisă ulterior vine după ea
+        self.tasks.write(self._init_db, on_done=self._db_ready, on_error=self._db_failed)
+
+    # ---------- pornire ----------
+    def _init_db(self):
+        if self.cfg["db_mode"] == "remote":
+            self.svc.ping()   # schema e treaba serverului; aici doar verificăm că răspunde
+            return
+        from ..infra.db_init import init_db
+        init_db(self.cfg["db_path"]).close()   # la o bază deja la zi: doar PRAGMA user_version
+        return [r["id"] for r in self.svc.recover_receipts()]
+
+    def _db_ready(self, recovered):
+        self._ready = True
+        self.centralWidget().setEnabled(True)
+        self.statusBar().showMessage("Pregătit")
+        self._recovered = list(recovered or [])
+        # mesajul temporar e înlocuit de „Se lucrează…” / „Pregătit” → etichetă permanentă cât timp mai sunt
+        self.lbl_recovered = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.lbl_recovered)
+        self._show_recovered()
+        self.tasks.busyChanged.connect(lambda busy: self.statusBar().showMessage("Se lucrează…" if busy else "Pregătit"))
+        if self.cfg["db_mode"] == "remote":
+            self.btn_setari.setEnabled(False)   # backup-ul și statisticile SQL sunt pe server
+            self.btn_setari.setToolTip(f"Setările bazei se fac pe server ({self.cfg['api_base_url']}).")
+            return
+        from ..infra.backup import BackupScheduler
+        # backup automat, pe thread-ul lui (config.json: backup_dir, backup_interval_min, ...)
+        self.backups = BackupScheduler(self.cfg["db_path"], self.cfg)
+        self.backups.start()
+        if self.cfg["db_mode"] == "server":
+            self._start_api()
+
+    def _start_api(self):
+        # celelalte case (db_mode "remote") lucrează prin acest proces; serverul are thread-urile lui
+        # (citiri în paralel + un writer) și folosește același serviciu (cache de produse, conexiuni per thread)
+        from ..services.api_server import ApiServer, parse_listen
+        host, port = parse_listen(self.cfg["api_base_url"])
+        try:
+            self.api = ApiServer(self.svc, host, port, token=self.cfg["api_token"],
+                                 group_commit_ms=self.cfg["group_commit_ms"]).start()
+        except RuntimeError as e:
+            QtWidgets.QMessageBox.warning(self, "Server API", str(e))
+            return
+        self.setWindowTitle(f"{self.windowTitle()} — server API {host}:{self.api.port}")
+
+    def _show_recovered(self):
+        n = len(self._recovered)
+        self.lbl_recovered.setText(f"Bonuri nefinalizate refăcute din jurnal: {n} (F2 le reia)" if n else "")
+
+    def _db_failed(self, e: Exception):
+        self.statusBar().showMessage("Baza de date nu a putut fi deschisă")
+        QtWidgets.QMessageBox.critical(self, "Eroare", f"Baza de date nu a putut fi deschisă:\n{e}")
+
+    # ---------- ferestre (importate la prima folosire) ----------
     def open_intrare(self):
-        dlg = IntrareDialog(self.svc, self)
+        if not self._ready:
+            return
+        from .intrare_dialog import IntrareDialog
+        dlg = IntrareDialog(self.svc, self, self.tasks)
         dlg.exec()
 
     def open_vanzare(self):
-        dlg = VanzareDialog(self.svc, self)
+        if not self._ready:
+            return
+        from .vanzare_dialog import VanzareDialog
+        # după o cădere: întâi bonurile refăcute din jurnal, apoi bonuri noi
+        receipt_id = self._recovered.pop(0) if self._recovered else None
+        self._show_recovered()
+        dlg = VanzareDialog(self.svc, self, self.tasks, receipt_id=receipt_id)
         dlg.exec()
 
     def open_stoc(self):
-        dlg = StocWindow(self.svc, self)
+        if not self._ready:
+            return
+        from .stoc_window import StocWindow
+        dlg = StocWindow(self.svc, self, self.tasks)
         dlg.exec()
 
     def open_setari(self):
-        QtWidgets.QMessageBox.information(self, "Setări & Backup", "Aici vei seta backup zilnic, praguri alerte etc.")
+        if not self._ready:
+            return
+        from .setari_dialog import SetariDialog
+        dlg = SetariDialog(self.cfg, self.backups, self.tasks, self)
+        dlg.exec()
 
     def open_expirare(self):
-        dlg = ExpirareWindow(self.svc, self)
+        if not self._ready:
+            return
+        from .expirare_window import ExpirareWindow
+        dlg = ExpirareWindow(self.svc, self, self.tasks)
         dlg.exec()
 
+    def closeEvent(self, event):
+        # așteptăm scrierile încă în coadă (ex. anularea ultimului bon), apoi
+        # închidem conexiunile persistente ale serviciului
+        self.tasks.wait()
+        if self.api is not None:
+            self.api.stop()
+        if self.backups is not None:
+            self.backups.stop()
+        self.svc.close()
+        super().closeEvent(event)
+
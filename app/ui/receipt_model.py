@@ -0,0 +1,81 @@
+from PySide6 import QtCore
+
+# Model pentru liniile bonului deschis (VanzareDialog).
+# Se încarcă o singură dată la deschidere (load), apoi fiecare scanare/ștergere modifică DOAR
+# rândul afectat, pe baza liniei întoarse de add_line_to_receipt / remove_line — fără get_receipt
+# și fără reconstruirea tabelului de la rândul 0.
+
+class ReceiptModel(QtCore.QAbstractTableModel):
+    HEADERS = ["#", "Denumire", "Cod", "Cant.", "Subtotal"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lines: list[dict] = []
+        self._row_by_id: dict[int, int] = {}
+
+    # ---- API Qt ----
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        it = self._lines[index.row()]
+        col = index.column()
+        if role == QtCore.Qt.UserRole:
+            return it["id"]  # id linie pentru ștergere
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if col == 0:
+            return str(index.row() + 1)
+        if col == 1:
+            return it["name"]
+        if col == 2:
+            return it["barcode"] or ""
+        if col == 3:
+            qty_base = int(it["qty_base"])
+            return str(qty_base) if it["unit"] == "buc" else f"{qty_base/1000:.3f}"
+        if col == 4:
+            return f"{it['line_total_cents'] / 100.0:.2f} lei"
+        return None
+
+    # ---- actualizări incrementale ----
+    def load(self, items: list[dict]):
+        self.beginResetModel()
+        self._lines = [dict(it) for it in items]
+        self._row_by_id = {it["id"]: r for r, it in enumerate(self._lines)}
+        self.endResetModel()
+
+    def upsert_line(self, line: dict):
+        r = self._row_by_id.get(line["id"])
+        if r is None:
+            r = len(self._lines)
+            self.beginInsertRows(QtCore.QModelIndex(), r, r)
+            self._lines.append(dict(line))
+            self._row_by_id[line["id"]] = r
+            self.endInsertRows()
+        else:
+            self._lines[r] = dict(line)
+            self.dataChanged.emit(self.index(r, 0), self.index(r, len(self.HEADERS) - 1))
+        return r
+
+    def remove_line(self, line_id: int):
+        r = self._row_by_id.pop(line_id, None)
+        if r is None:
+            return
+        self.beginRemoveRows(QtCore.QModelIndex(), r, r)
+        del self._lines[r]
+        for rr in range(r, len(self._lines)):
+            self._row_by_id[self._lines[rr]["id"]] = rr
+        self.endRemoveRows()
+
+    def line_id(self, row: int):
+        return self._lines[row]["id"] if 0 <= row < len(self._lines) else None
@@ -0,0 +1,73 @@
+from collections import deque
+from typing import Callable, Deque, List, Tuple
+
+from PySide6 import QtCore
+
+# Coadă pentru scanări în rafală (scaner USB "wedge": 13 cifre + Enter în câteva ms).
+#
+#   buf = ScanBuffer(submit, parent)     # submit(batch) trimite lotul și apelează buf.batch_done() la final
+#   buf.push(code, qty)                  # din handler-ul de Enter: doar adaugă în coadă, nu așteaptă nimic
+#
+# - câte un singur lot în lucru: ce se scanează între timp se adună și pleacă într-un singur apel
+#   (sub sarcină loturile cresc singure, fără întârziere fixă pentru scanarea izolată)
+# - în lot, scanările repetate ale aceluiași cod devin o singură cantitate (ordinea primei apariții)
+# - ordinea e păstrată: lotul următor pleacă doar după ce s-a terminat cel curent (sau forțat, prin flush)
+
+Scan = Tuple[str, float]
+
+
+def coalesce(scans: List[Scan]) -> List[Scan]:
+    """[(cod, cant), ...] → un element per cod, cantitățile adunate, în ordinea primei scanări."""
+    merged: dict = {}
+    for code, qty in scans:
+        merged[code] = merged.get(code, 0.0) + qty
+    return list(merged.items())
+
+
+class ScanBuffer(QtCore.QObject):
+    def __init__(self, submit: Callable[[List[Scan]], None], parent=None):
+        super().__init__(parent)
+        self._submit = submit
+        self._queue: Deque[Scan] = deque()
+        self._in_flight = 0            # loturi trimise și neterminate
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)     # după evenimentele deja în coadă (Enter-urile din aceeași rafală)
+        self._timer.timeout.connect(self._drain)
+
+    def push(self, code: str, qty: float) -> None:
+        self._queue.append((code, qty))
+        if not self._in_flight:
+            self._timer.start()
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def busy(self) -> bool:
+        """Mai sunt scanări în coadă sau loturi trimise și neterminate."""
+        return bool(self._queue) or self._in_flight > 0
+
+    def batch_done(self) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        if self._queue and not self._in_flight:
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Trimite imediat tot ce e în coadă, chiar dacă un lot e încă în lucru (ex. înainte de finalizare)."""
+        self._timer.stop()
+        if self._queue:
+            self._send()
+
+    def clear(self) -> None:
+        self._timer.stop()
+        self._queue.clear()
+
+    def _drain(self):
+        if not self._in_flight and self._queue:
+            self._send()
+
+    def _send(self):
+        batch = coalesce(list(self._queue))
+        self._queue.clear()
+        self._in_flight += 1
+        self._submit(batch)
@@ -0,0 +1,238 @@
+from PySide6 import QtWidgets, QtCore
+from ..infra.backup import BackupScheduler, backup_history
+from ..infra.db import lock_policy, query_stats
+from ..util.config import save_config
+from .async_service import AsyncService
+
+
+class SetariDialog(QtWidgets.QDialog):
+    def __init__(self, cfg: dict, scheduler: BackupScheduler, tasks: AsyncService, parent=None):
+        super().__init__(parent)
+        self.cfg = cfg
+        self.scheduler = scheduler
+        self.tasks = tasks
+        self.setWindowTitle("Setări & Backup")
+        self.resize(720, 520)
+
+        # ---- backup ----
+        form = QtWidgets.QFormLayout()
+        self.ed_dir = QtWidgets.QLineEdit(cfg["backup_dir"])
+        btn_browse = QtWidgets.QPushButton("…")
+        btn_browse.clicked.connect(self._browse)
+        h_dir = QtWidgets.QHBoxLayout()
+        h_dir.addWidget(self.ed_dir, 1)
+        h_dir.addWidget(btn_browse)
+        form.addRow("Director backup", h_dir)
+
+        self.sp_interval = QtWidgets.QSpinBox()
+        self.sp_interval.setRange(0, 7 * 24 * 60)
+        self.sp_interval.setSuffix(" min")
+        self.sp_interval.setSpecialValueText("oprit")
+        self.sp_interval.setValue(int(cfg["backup_interval_min"]))
+        form.addRow("Backup automat la", self.sp_interval)
+
+        self.sp_keep_count = QtWidgets.QSpinBox()
+        self.sp_keep_count.setRange(0, 10_000)
+        self.sp_keep_count.setSpecialValueText("toate")
+        self.sp_keep_count.setValue(int(cfg["backup_keep_count"]))
+        form.addRow("Păstrează ultimele", self.sp_keep_count)
+
+        self.sp_keep_days = QtWidgets.QSpinBox()
+        self.sp_keep_days.setRange(0, 3650)
+        self.sp_keep_days.setSuffix(" zile")
+        self.sp_keep_days.setSpecialValueText("fără limită")
+        self.sp_keep_days.setValue(int(cfg["backup_keep_days"]))
+        form.addRow("Șterge copiile mai vechi de", self.sp_keep_days)
+
+        self.chk_compress = QtWidgets.QCheckBox("Comprimă copiile (.gz)")
+        self.chk_compress.setChecked(bool(cfg["backup_compress"]))
+        self.chk_verify = QtWidgets.QCheckBox("Verifică integritatea fiecărei copii (mai lent)")
+        self.chk_verify.setChecked(bool(cfg["backup_verify"]))
+        form.addRow("", self.chk_compress)
+        form.addRow("", self.chk_verify)
+
+        # ---- istoric ----
+        self.table = QtWidgets.QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Data", "Fișier", "Durată (s)", "Mărime (MB)", "Integritate"])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+
+        self.lbl_status = QtWidgets.QLabel("")
+
+        self.btn_backup = QtWidgets.QPushButton("Backup acum")
+        self.btn_save = QtWidgets.QPushButton("Salvează")
+        self.btn_close = QtWidgets.QPushButton("Închide")
+        btns = QtWidgets.QHBoxLayout()
+        btns.addWidget(self.btn_backup)
+        btns.addStretch()
+        btns.addWidget(self.btn_save)
+        btns.addWidget(self.btn_close)
+
+        tab_backup = QtWidgets.QWidget()
+        v_backup = QtWidgets.QVBoxLayout(tab_backup)
+        v_backup.addLayout(form)
+        v_backup.addWidget(QtWidgets.QLabel("Ultimele copii"))
+        v_backup.addWidget(self.table)
+
+        self.tabs = QtWidgets.QTabWidget()
+        self.tabs.addTab(tab_backup, "Backup")
+        self.tabs.addTab(self._build_sql_tab(), "Interogări SQL")
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.tabs)
+        layout.addWidget(self.lbl_status)
+        layout.addLayout(btns)
+
+        self.btn_backup.clicked.connect(self.backup_now)
+        self.btn_save.clicked.connect(self.save)
+        self.btn_close.clicked.connect(self.reject)
+
+        if scheduler.last_error:
+            self.lbl_status.setText(f"Ultimul backup automat a eșuat: {scheduler.last_error}")
+        self.refresh()
+
+    # ---------- interogări SQL (app.infra.db.query_stats) ----------
+    def _build_sql_tab(self) -> QtWidgets.QWidget:
+        tab = QtWidgets.QWidget()
+        self.chk_sql = QtWidgets.QCheckBox("Măsoară interogările (se aplică la repornirea aplicației)")
+        self.chk_sql.setChecked(bool(self.cfg["sql_stats"]))
+        self.sp_slow = QtWidgets.QSpinBox()
+        self.sp_slow.setRange(1, 60_000)
+        self.sp_slow.setSuffix(" ms")
+        self.sp_slow.setValue(int(self.cfg["sql_slow_ms"]))
+        self.chk_multi = QtWidgets.QCheckBox("Mai multe case pe aceeași bază (se aplică la repornirea aplicației)")
+        self.chk_multi.setChecked(bool(self.cfg["multi_client"]))
+        self.chk_buffered = QtWidgets.QCheckBox("Bonul deschis în memorie, scris în bază doar la finalizare "
+                                                "(se aplică la repornirea aplicației)")
+        self.chk_buffered.setChecked(bool(self.cfg["buffered_receipts"]))
+        form = QtWidgets.QFormLayout()
+        form.addRow("", self.chk_sql)
+        form.addRow("Interogare lentă peste", self.sp_slow)
+        form.addRow("", self.chk_multi)
+        form.addRow("", self.chk_buffered)
+
+        self.sql_table = QtWidgets.QTableWidget(0, 6)
+        self.sql_table.setHorizontalHeaderLabels(["SQL", "Apeluri", "Total (ms)", "Medie (ms)", "Max (ms)", "Rânduri"])
+        self.sql_table.verticalHeader().setVisible(False)
+        self.sql_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.sql_table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        self.sql_table.setWordWrap(False)
+
+        self.sql_slow = QtWidgets.QPlainTextEdit()
+        self.sql_slow.setReadOnly(True)
+        self.sql_slow.setMaximumHeight(140)
+        self.lbl_locks = QtWidgets.QLabel("")
+
+        btn_refresh = QtWidgets.QPushButton("Reîmprospătează")
+        btn_reset = QtWidgets.QPushButton("Resetează")
+        btn_refresh.clicked.connect(self.refresh_sql)
+        btn_reset.clicked.connect(self.reset_sql)
+        h = QtWidgets.QHBoxLayout()
+        h.addStretch()
+        h.addWidget(btn_refresh)
+        h.addWidget(btn_reset)
+
+        v = QtWidgets.QVBoxLayout(tab)
+        v.addLayout(form)
+        v.addWidget(self.sql_table, 1)
+        v.addWidget(QtWidgets.QLabel("Ultimele interogări lente (cu planul de execuție)"))
+        v.addWidget(self.sql_slow)
+        v.addWidget(self.lbl_locks)
+        v.addLayout(h)
+        self.refresh_sql()
+        return tab
+
+    def refresh_sql(self):
+        rows = query_stats.snapshot(200)
+        self.sql_table.setRowCount(len(rows))
+        for r, it in enumerate(rows):
+            sql_item = QtWidgets.QTableWidgetItem(it["sql"])
+            sql_item.setToolTip(it["sql"])
+            self.sql_table.setItem(r, 0, sql_item)
+            for c, text in enumerate((str(it["calls"]), f"{it['total_ms']:.1f}", f"{it['avg_ms']:.3f}",
+                                      f"{it['max_ms']:.1f}", str(it["rows"])), start=1):
+                item = QtWidgets.QTableWidgetItem(text)
+                item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.sql_table.setItem(r, c, item)
+        lines = []
+        for it in reversed(query_stats.slow):
+            lines.append(f"{it['ts']}  {it['ms']:.1f} ms  {it['sql']}")
+            lines.extend(f"    {p}" for p in it["plan"] or [])
+        if not query_stats.enabled:
+            lines.insert(0, "Măsurarea interogărilor este oprită.")
+        self.sql_slow.setPlainText("\n".join(lines))
+        lk = lock_policy.snapshot()
+        self.lbl_locks.setText(
+            f"Așteptare lock de scriere: {lk['transactions']} tranzacții, p50 {lk['p50_ms']:.1f} ms, "
+            f"p95 {lk['p95_ms']:.1f} ms, max {lk['max_ms']:.1f} ms, {lk['retries']} reîncercări, "
+            f"{lk['failed']} eșuate")
+
+    def reset_sql(self):
+        query_stats.reset()
+        lock_policy.reset()
+        self.refresh_sql()
+
+    # ---------- acțiuni ----------
+    def _browse(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, "Director backup", self.ed_dir.text())
+        if path:
+            self.ed_dir.setText(path)
+
+    def refresh(self):
+        self.tasks.read(backup_history, self.scheduler.backup_dir, key=f"setari:{id(self)}", owner=self,
+                        on_done=self._fill)
+
+    def _fill(self, items: list):
+        self.table.setRowCount(0)
+        for it in items:
+            r = self.table.rowCount(); self.table.insertRow(r)
+            stamp = QtCore.QDateTime.fromString(it.get("started_at", ""), "yyyyMMdd_HHmmss")
+            self.table.setItem(r, 0, QtWidgets.QTableWidgetItem(stamp.toString("yyyy-MM-dd HH:mm:ss")))
+            self.table.setItem(r, 1, QtWidgets.QTableWidgetItem(it.get("path", "")))
+            self.table.setItem(r, 2, QtWidgets.QTableWidgetItem(f"{it.get('duration_s', 0):.2f}"))
+            self.table.setItem(r, 3, QtWidgets.QTableWidgetItem(f"{it.get('file_bytes', 0) / 1e6:.1f}"))
+            self.table.setItem(r, 4, QtWidgets.QTableWidgetItem(it.get("integrity") or "—"))
+        self.table.resizeColumnsToContents()
+
+    def backup_now(self):
+        self.btn_backup.setEnabled(False)
+        self.lbl_status.setText("Backup în curs…")
+        self.tasks.read(self.scheduler.backup_now, owner=self, on_done=self._backup_done,
+                        on_error=self._backup_failed)
+
+    def _backup_done(self, info: dict):
+        self.btn_backup.setEnabled(True)
+        self.lbl_status.setText(f"Backup salvat: {info['path']} ({info['duration_s']:.2f} s)")
+        self.refresh()
+
+    def _backup_failed(self, e: Exception):
+        self.btn_backup.setEnabled(True)
+        self.lbl_status.setText("")
+        QtWidgets.QMessageBox.critical(self, "Backup", str(e))
+
+    def save(self):
+        backup_dir = self.ed_dir.text().strip()
+        if not backup_dir:
+            QtWidgets.QMessageBox.warning(self, "Eroare", "Alege un director pentru backup.")
+            return
+        self.cfg.update({
+            "backup_dir": backup_dir,
+            "backup_interval_min": self.sp_interval.value(),
+            "backup_keep_count": self.sp_keep_count.value(),
+            "backup_keep_days": self.sp_keep_days.value(),
+            "backup_compress": self.chk_compress.isChecked(),
+            "backup_verify": self.chk_verify.isChecked(),
+            "sql_stats": self.chk_sql.isChecked(),
+            "sql_slow_ms": self.sp_slow.value(),
+            "multi_client": self.chk_multi.isChecked(),
+            "buffered_receipts": self.chk_buffered.isChecked(),
+        })
+        save_config(self.cfg)
+        self.scheduler.configure(self.cfg)
+        query_stats.slow_ms = float(self.cfg["sql_slow_ms"])   # pragul se aplică imediat
+        self.accept()
+
+    def done(self, r):
+        self.tasks.detach(self)
+        super().done(r)
@@ -1,12 +1,16 @@
 from PySide6 import QtWidgets, QtCore, QtGui
 from ..services.use_cases import InventoryService
+from .stock_model import StockTableModel
+from .async_service import AsyncService
 
 #TO DO, caseta lot are elemente editabile
 
 class LoturiDialog(QtWidgets.QDialog):
-    def __init__(self, svc: InventoryService, product_id: int, product_name: str, parent=None):
+    def __init__(self, svc: InventoryService, product_id: int, product_name: str, parent=None,
+                 tasks: AsyncService = None):
         super().__init__(parent)
         self.svc = svc
+        self.tasks = tasks or AsyncService(svc, self)
         self.product_id = product_id
         self.setWindowTitle(f"Loturi – {product_name}")
         self.resize(560, 420)
@@ -20,13 +24,16 @@ class LoturiDialog(QtWidgets.QDialog):
         self.refresh()
 
     def refresh(self):
+        self.tasks.read(self.svc.get_product_batches, self.product_id,
+                        key=f"loturi:{id(self)}", owner=self, on_done=self._fill)
+
+    def _fill(self, items: list):
         def _datestr(v):
             if not v:
                 return ""
             # suportă TEXT, datetime.date/datetime
             return getattr(v, "isoformat", lambda: str(v))()
 
-        items = self.svc.get_product_batches(self.product_id)
         self.table.setRowCount(0)
         for it in items:
             r = self.table.rowCount()
@@ -57,18 +64,26 @@ class LoturiDialog(QtWidgets.QDialog):
 
         self.table.resizeColumnsToContents()
 
+    def done(self, r):
+        self.tasks.detach(self)
+        super().done(r)
+
 
 
 class StocWindow(QtWidgets.QDialog):
-    def __init__(self, svc: InventoryService, parent=None):
+    SEARCH_DEBOUNCE_MS = 250
+
+    def __init__(self, svc: InventoryService, parent=None, tasks: AsyncService = None):
         super().__init__(parent)
         self.svc = svc
+        # interogările rulează în fundal; fereastra rămâne responsivă la tastare/scroll
+        self.tasks = tasks or AsyncService(svc, self)
         self.setWindowTitle("Stoc curent")
         self.resize(900, 600)
 
         # --- filtre ---
         filt = QtWidgets.QHBoxLayout()
-        self.search = QtWidgets.QLineEdit(); self.search.setPlaceholderText("Caută nume sau cod...")
+        self.search = QtWidgets.QLineEdit(); self.search.setPlaceholderText("Caută nume sau cod (ex: paine alb)...")
         self.low_only = QtWidgets.QCheckBox("Doar stoc scăzut")
         self.low_threshold = QtWidgets.QDoubleSpinBox()
         self.low_threshold.setDecimals(3); self.low_threshold.setMaximum(1e9); self.low_threshold.setValue(5.0)
@@ -81,13 +96,16 @@ class StocWindow(QtWidgets.QDialog):
         filt.addStretch()
         filt.addWidget(self.btn_refresh)
 
-        # --- tabel produse ---
-        self.table = QtWidgets.QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(["#", "Denumire", "Cod", "Unit.", "Stoc"])
+        # --- tabel produse (model paginat: rândurile se aduc din SQL pe măsură ce derulezi) ---
+        self.model = StockTableModel(self.svc, self, self.tasks)
+        self.model.loaded.connect(self.table_loaded)
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setStretchLastSection(True)
+        # resizeColumnsToContents ia în calcul doar rândurile vizibile, nu tot catalogul
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
         self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
-        self.table.setSortingEnabled(True)
         self.table.setAlternatingRowColors(True)
         self.table.verticalHeader().setVisible(False)
 
@@ -107,80 +125,69 @@ class StocWindow(QtWidgets.QDialog):
         self.btn_loturi.clicked.connect(self.open_loturi)
         self.table.doubleClicked.connect(self.open_loturi)
         self.search.returnPressed.connect(self.refresh)
+        # căutare pe măsură ce tastezi: reîncărcăm doar după o scurtă pauză, nu la fiecare literă
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self.refresh)
+        self.search.textChanged.connect(lambda _text: self._search_timer.start())
         self.btn_export.clicked.connect(self.export_csv)
 
+        # sortarea pe coloane o face modelul în SQL; implicit după denumire
+        self.table.horizontalHeader().setSortIndicator(1, QtCore.Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+
         self.refresh()
 
     def refresh(self):
-        threshold = float(self.low_threshold.value())
-        items = self.svc.get_stock_products(
-            search=self.search.text().strip(),
-            low_only=self.low_only.isChecked(),
-            low_threshold_human=threshold,           # prag în buc/kg/l, după unitatea produsului
+        self._search_timer.stop()
+        self.model.set_filter(
+            self.search.text().strip(),
+            self.low_only.isChecked(),
+            float(self.low_threshold.value()),   # prag în buc/kg/l, după unitatea produsului
         )
 
-        was_sorting = self.table.isSortingEnabled()
-        self.table.setSortingEnabled(False)          # nu lăsăm Qt să re-sorteze în timp ce populăm
-
-        self.table.setRowCount(0)
-        for idx, it in enumerate(items, start=1):
-            r = self.table.rowCount(); self.table.insertRow(r)
-
-            # # (1) cu product_id în UserRole
-            cell0 = QtWidgets.QTableWidgetItem(str(idx))
-            cell0.setData(QtCore.Qt.UserRole, it["product_id"])
-            self.table.setItem(r, 0, cell0)
-
-            self.table.setItem(r, 1, QtWidgets.QTableWidgetItem(it["name"] or ""))
-            self.table.setItem(r, 2, QtWidgets.QTableWidgetItem(it["barcode"] or ""))
-            self.table.setItem(r, 3, QtWidgets.QTableWidgetItem(it["unit"]))
-
-            st = it["stock_human"]
-            st_text = f"{int(st)}" if float(st).is_integer() else f"{st:.3f}"
-            cell_st = QtWidgets.QTableWidgetItem(st_text)
-            cell_st.setData(QtCore.Qt.EditRole, float(st))  # sortare numerică pe „Stoc”
-            self.table.setItem(r, 4, cell_st)
-
-            # highlight stoc scăzut (doar când nu e filtrul activ)
-            if (not self.low_only.isChecked()) and (it["stock_human"] <= threshold):
-                for c in range(5):
-                    cell = self.table.item(r, c)
-                    if cell:
-                        cell.setBackground(QtGui.QColor(255, 245, 200))
-
-        self.table.setSortingEnabled(was_sorting)
-        if was_sorting:
-            self.table.sortItems(1, QtCore.Qt.AscendingOrder)  # denumire
+    def table_loaded(self):
         self.table.resizeColumnsToContents()
 
     def open_loturi(self):
-        row = self.table.currentRow()
-        if row < 0: return
-        cell_id = self.table.item(row, 0)
-        cell_name = self.table.item(row, 1)
-        product_id = cell_id.data(QtCore.Qt.UserRole) if cell_id else None
-        product_name = cell_name.text() if cell_name else ""
-        if not product_id: return
-        dlg = LoturiDialog(self.svc, int(product_id), product_name, self)
+        it = self.model.product_at(self.table.currentIndex().row())
+        if not it: return
+        dlg = LoturiDialog(self.svc, int(it["product_id"]), it["name"] or "", self, self.tasks)
         dlg.exec()
 
     def export_csv(self):
         path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export CSV", "stoc.csv", "CSV Files (*.csv)")
         if not path:
             return
+        self.btn_export.setEnabled(False)
+        # pentru export folosim exact filtrul și sortarea din tabel (toate paginile)
+        self.tasks.read(self._write_csv, path, self.model.filter_args(), owner=self,
+                        on_done=self._export_done, on_error=self._export_failed)
+
+    def _write_csv(self, path: str, filter_args: dict) -> int:
+        # rulează în fundal: citire + scriere fișier
         import csv
+        items = self.svc.get_stock_products(**filter_args)
         with open(path, "w", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
             w.writerow(["#","Denumire","Cod","Unit.","Stoc"])
-            # pentru export folosim exact lista din refresh
-            threshold = float(self.low_threshold.value())
-            items = self.svc.get_stock_products(
-                search=self.search.text().strip(),
-                low_only=self.low_only.isChecked(),
-                low_threshold_human=threshold,
-            )
             for idx, it in enumerate(items, start=1):
                 st = it["stock_human"]
                 st_val = int(st) if float(st).is_integer() else round(st, 3)
                 w.writerow([idx, it["name"] or "", it["barcode"] or "", it["unit"], st_val])
+        return len(items)
+
+    def _export_done(self, n: int):
+        self.btn_export.setEnabled(True)
         QtWidgets.QMessageBox.information(self, "Export", "Export efectuat.")
+
+    def _export_failed(self, e: Exception):
+        self.btn_export.setEnabled(True)
+        QtWidgets.QMessageBox.critical(self, "Export", f"Eroare la scrierea fișierului:\n{e}")
+
+    def done(self, r):
+        self._search_timer.stop()
+        self.model.shutdown()
+        self.tasks.detach(self)
+        super().done(r)
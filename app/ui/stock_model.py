@@ -0,0 +1,150 @@
+from PySide6 import QtCore, QtGui
+from ..services.use_cases import InventoryService
+from .async_service import AsyncService
+
+# Model virtualizat pentru lista de stoc (StocWindow).
+# În loc să creeze 5 QTableWidgetItem pentru fiecare produs din catalog, modelul ține doar
+# rândurile deja aduse și cere următoarea pagină de la serviciu când view-ul ajunge la final
+# (canFetchMore / fetchMore). Filtrarea și sortarea se fac în SQL (get_stock_products).
+# Interogările rulează în fundal (AsyncService); o reîncărcare nouă o anulează pe cea în curs.
+
+class StockTableModel(QtCore.QAbstractTableModel):
+    HEADERS = ["#", "Denumire", "Cod", "Unit.", "Stoc"]
+    # coloana din view → cheia de sortare din InventoryService.STOCK_SORT_COLUMNS
+    SORT_KEYS = {1: "name", 2: "barcode", 3: "unit", 4: "stock"}
+    PAGE_SIZE = 200
+    LOW_STOCK_BG = QtGui.QColor(255, 245, 200)
+
+    loaded = QtCore.Signal()   # prima pagină a unei reîncărcări a sosit
+
+    def __init__(self, svc: InventoryService, parent=None, tasks: AsyncService = None):
+        super().__init__(parent)
+        self.svc = svc
+        self.tasks = tasks or AsyncService(svc, self)
+        self._rows: list[dict] = []
+        self._total = 0
+        self._search = ""
+        self._low_only = False
+        self._threshold = 0.0
+        self._order_by = "name"
+        self._descending = False
+        self._generation = 0       # crește la fiecare reîncărcare; paginile vechi se ignoră
+        self._fetching = False
+        self._key = f"stock-model:{id(self)}"
+
+    # ---- filtre / sortare (resetează paginile) ----
+    def set_filter(self, search: str, low_only: bool, threshold: float):
+        self._search, self._low_only, self._threshold = search, low_only, threshold
+        self.reload()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        key = self.SORT_KEYS.get(column)
+        descending = (order == QtCore.Qt.DescendingOrder)
+        if key is None or (key == self._order_by and descending == self._descending):
+            return
+        self._order_by = key
+        self._descending = descending
+        self.reload()
+
+    def _first_page(self, args: dict):
+        # rulează pe un thread din pool
+        total = self.svc.count_stock_products(args["search"], args["low_only"], args["low_threshold_human"])
+        return total, self.svc.get_stock_products(**args, limit=self.PAGE_SIZE, offset=0)
+
+    def reload(self):
+        self._generation += 1
+        gen = self._generation
+        self._fetching = False
+        self.tasks.cancel(self._key + ":page")
+        self.tasks.read(self._first_page, self.filter_args(), key=self._key, owner=self,
+                        on_done=lambda res: self._on_first_page(gen, res))
+
+    def _on_first_page(self, gen: int, res):
+        if gen != self._generation:
+            return
+        total, page = res
+        self.beginResetModel()
+        self._rows = list(page)
+        self._total = total if page else 0
+        self.endResetModel()
+        self.loaded.emit()
+
+    def filter_args(self) -> dict:
+        return {
+            "search": self._search, "low_only": self._low_only, "low_threshold_human": self._threshold,
+            "order_by": self._order_by, "descending": self._descending,
+        }
+
+    def shutdown(self):
+        self.tasks.detach(self)
+
+    # ---- paginare ----
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and not self._fetching and len(self._rows) < self._total
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self._fetching:
+            return
+        self._fetching = True
+        gen = self._generation
+        self.tasks.read(self.svc.get_stock_products, **self.filter_args(), limit=self.PAGE_SIZE,
+                        offset=len(self._rows), key=self._key + ":page", owner=self,
+                        on_done=lambda page: self._on_page(gen, page), on_error=self._on_page_error)
+
+    def _on_page_error(self, exc: Exception):
+        self._fetching = False
+        self.tasks.failed.emit(str(exc))
+
+    def _on_page(self, gen: int, page: list):
+        if gen != self._generation:
+            return
+        self._fetching = False
+        if not page:
+            self._total = len(self._rows)  # catalogul s-a micșorat între timp
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    # ---- API Qt ----
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        it = self._rows[index.row()]
+        col = index.column()
+        if role == QtCore.Qt.UserRole:
+            return it["product_id"]
+        if role == QtCore.Qt.BackgroundRole:
+            # highlight stoc scăzut (doar când nu e filtrul activ)
+            if not self._low_only and it["stock_human"] <= self._threshold:
+                return self.LOW_STOCK_BG
+            return None
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if col == 0:
+            return str(index.row() + 1)
+        if col == 1:
+            return it["name"] or ""
+        if col == 2:
+            return it["barcode"] or ""
+        if col == 3:
+            return it["unit"]
+        if col == 4:
+            st = it["stock_human"]
+            return f"{int(st)}" if float(st).is_integer() else f"{st:.3f}"
+        return None
+
+    def product_at(self, row: int):
+        return self._rows[row] if 0 <= row < len(self._rows) else None
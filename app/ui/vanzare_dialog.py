@@ -1,15 +1,28 @@
 from PySide6 import QtWidgets, QtCore, QtGui
 from ..services.use_cases import InventoryService
 from ..util.barcode import normalize_barcode  # ← validarea EAN/UPC
+from .receipt_model import ReceiptModel
+from .async_service import AsyncService
+from .scan_buffer import ScanBuffer
 
 class VanzareDialog(QtWidgets.QDialog):
-    def __init__(self, svc: InventoryService, parent=None):
+    def __init__(self, svc: InventoryService, parent=None, tasks: AsyncService = None, receipt_id: int = None):
         super().__init__(parent)
         self.svc = svc
+        # scanările se scriu în fundal, în ordine; câmpul de cod rămâne liber pentru următoarea
+        self.tasks = tasks or AsyncService(svc, self)
         self.setWindowTitle("Vânzare / Bon intern")
         self.resize(800, 600)
 
-        self.receipt_id = self.svc.open_receipt()
+        # receipt_id dat = reluăm un bon deja deschis (ex. refăcut din jurnal după o cădere);
+        # altfel bonul nou se deschide pe thread-ul de scriere și id-ul vine în _receipt_opened
+        self.receipt_id = receipt_id
+        self._opened_id = None             # scris de thread-ul de scriere (vezi _open_receipt / _void)
+        self._closing = False
+        self._finalize_requested = False   # F12 apăsat, așteptăm loturile de scanări încă în lucru
+        self._scans_rejected = False       # un lot terminat după F12 a eșuat / a avut coduri respinse
+        # scanările se adună aici și se scriu în loturi (un singur lot în lucru)
+        self.scans = ScanBuffer(self._write_scans, self)
 
         # ---- controale ----
         form = QtWidgets.QHBoxLayout()
@@ -26,8 +39,10 @@ class VanzareDialog(QtWidgets.QDialog):
         form.addWidget(self.in_qty, 1)
         form.addWidget(self.btn_add)
 
-        self.table = QtWidgets.QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(["#", "Denumire", "Cod", "Cant.", "Subtotal"])
+        self.model = ReceiptModel(self)
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
@@ -37,6 +52,11 @@ class VanzareDialog(QtWidgets.QDialog):
         self.table.customContextMenuRequested.connect(self._table_menu)
         QtGui.QShortcut(QtGui.QKeySequence("Del"), self, activated=self.remove_selected_line)
 
+        # erorile de scanare nu deschid ferestre modale (ar "înghiți" următoarea scanare)
+        self.lbl_scan_error = QtWidgets.QLabel("")
+        self.lbl_scan_error.setStyleSheet("color: #b00020; font-weight: 600;")
+        self.lbl_scan_error.setWordWrap(True)
+
         self.lbl_total = QtWidgets.QLabel("Total: 0,00 lei")
         f = self.lbl_total.font()
         f.setPointSize(22); f.setBold(True)
@@ -52,6 +72,7 @@ class VanzareDialog(QtWidgets.QDialog):
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.addLayout(form)
+        layout.addWidget(self.lbl_scan_error)
         layout.addWidget(self.table)
         layout.addLayout(btns)
 
@@ -64,21 +85,51 @@ class VanzareDialog(QtWidgets.QDialog):
         QtGui.QShortcut(QtGui.QKeySequence("F12"),    self, activated=self.finalize)
         QtGui.QShortcut(QtGui.QKeySequence("Esc"),    self, activated=self.reject)
 
+        self.btn_finalize.setEnabled(False)
+        if receipt_id is not None:
+            self.in_barcode.setFocus()
+            self.refresh()
+        else:
+            # scanarea și finalizarea rămân oprite până avem id-ul bonului
+            self._set_ready(False)
+            self.tasks.write(self._open_receipt, owner=self, on_done=self._receipt_opened,
+                             on_error=self._open_failed)
+
+    # ---------------- deschidere ----------------
+    def _open_receipt(self) -> int:
+        # thread-ul de scriere; id-ul rămâne și pentru un reject() trimis înainte să ajungă pe GUI
+        self._opened_id = self.svc.open_receipt()
+        return self._opened_id
+
+    def _receipt_opened(self, receipt_id: int):
+        self.receipt_id = receipt_id
+        if self._closing:
+            return
+        self._set_ready(True)
         self.in_barcode.setFocus()
         self.refresh()
 
+    def _open_failed(self, e: Exception):
+        QtWidgets.QMessageBox.critical(self, "Eroare", f"Bonul nu a putut fi deschis: {e}")
+        self._closing = True
+        super().reject()
+
+    def _set_ready(self, ready: bool):
+        self.in_barcode.setEnabled(ready)
+        self.btn_add.setEnabled(ready)
+
     # ---------------- actions ----------------
     def add_line(self):
         raw = self.in_barcode.text().strip()
-        if not raw:
+        if not raw or self._closing or self.receipt_id is None:
             return
 
         # validare/normalizare EAN/UPC
         try:
             code = normalize_barcode(raw)
         except ValueError as e:
-            QtWidgets.QMessageBox.warning(self, "Cod invalid", str(e))
-            self.in_barcode.setFocus(); self.in_barcode.selectAll()
+            self._scan_error(f"{raw}: {e}")
+            self.in_barcode.clear()
             return
 
         qty = float(self.in_qty.value())
@@ -86,72 +137,108 @@ class VanzareDialog(QtWidgets.QDialog):
             QtWidgets.QMessageBox.warning(self, "Eroare", "Cantitatea trebuie > 0.")
             return
 
-        # dacă produsul e 'buc', nu permitem zecimale
-        p = self.svc.find_product_by_barcode(code)
-        if not p:
-            QtWidgets.QMessageBox.warning(self, "Eroare", "Produs inexistent. Adaugă-l întâi la Intrare.")
-            return
-        if p["unit"] == "buc" and abs(qty - round(qty)) > 1e-9:
-            QtWidgets.QMessageBox.warning(self, "Eroare", "Cantitatea pentru 'buc' trebuie să fie întreagă.")
-            return
+        # reset imediat: următoarea scanare poate veni cât timp asta încă se scrie
+        self.in_barcode.clear()
+        self.in_qty.setValue(1.000)
+        self.in_barcode.setFocus()
+        self.scans.push(code, qty)
 
-        try:
-            self.svc.add_line_to_receipt(self.receipt_id, code, qty)
-            # reset
-            self.in_barcode.clear()
-            self.in_qty.setValue(1.000)
-            self.in_barcode.setFocus()
-            self.refresh()
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Eroare", str(e))
+    def _write_scans(self, batch: list):
+        # un lot din ScanBuffer (coduri deja cumulate) → o tranzacție pe thread-ul de scriere
+        self.tasks.write(self.svc.add_lines_to_receipt, self.receipt_id, batch, owner=self,
+                         on_done=self._lines_added, on_error=self._scans_failed)
+
+    def _lines_added(self, res: dict):
+        self.scans.batch_done()
+        if res["errors"]:
+            self._scans_rejected = True
+        # actualizăm doar rândurile afectate + totalul (fără get_receipt)
+        r = -1
+        for line in res["lines"]:
+            r = self.model.upsert_line(line)
+        if r >= 0:
+            self.table.scrollTo(self.model.index(r, 0))
+        self._set_total(res["total_cents"])
+        if res["errors"]:
+            self._scan_error("\n".join(f"{e['barcode']}: {e['error']}" for e in res["errors"]))
+        elif res["lines"]:
+            self.lbl_scan_error.clear()
+        self._finalize_when_written()
+
+    def _scans_failed(self, e: Exception):
+        self.scans.batch_done()
+        self._scans_rejected = True
+        QtWidgets.QMessageBox.critical(self, "Eroare", str(e))
+        self._finalize_when_written()
+
+    def _scan_error(self, text: str):
+        self.lbl_scan_error.setText(text)
+        QtWidgets.QApplication.beep()
 
     def refresh(self):
-        data = self.svc.get_receipt(self.receipt_id)
-        items = data["items"]
-
-        self.table.setRowCount(0)
-        for idx, it in enumerate(items, start=1):
-            r = self.table.rowCount()
-            self.table.insertRow(r)
-
-            qty_base = int(it["qty_base"])
-            unit = it["unit"]
-            qty_text = str(qty_base) if unit == "buc" else f"{qty_base/1000:.3f}"
-            subtotal_lei = it["line_total_cents"] / 100.0
-
-            it0 = QtWidgets.QTableWidgetItem(str(idx))
-            it0.setData(QtCore.Qt.UserRole, it["id"])  # păstrăm id linie pentru ștergere
-            self.table.setItem(r, 0, it0)
-            self.table.setItem(r, 1, QtWidgets.QTableWidgetItem(it["name"]))
-            self.table.setItem(r, 2, QtWidgets.QTableWidgetItem(it["barcode"] or ""))
-            self.table.setItem(r, 3, QtWidgets.QTableWidgetItem(qty_text))
-            self.table.setItem(r, 4, QtWidgets.QTableWidgetItem(f"{subtotal_lei:.2f} lei"))
-
-        total_lei = data["total_cents"] / 100.0
-        self.lbl_total.setText(f"Total: {total_lei:.2f} lei")
-        self.btn_finalize.setEnabled(len(items) > 0)
+        # încărcare completă — doar la deschidere; după aceea modelul se actualizează incremental.
+        # Trece prin coada de scriere ca să vadă toate liniile trimise înainte.
+        self.tasks.write(self.svc.get_receipt, self.receipt_id, owner=self, on_done=self._loaded)
+
+    def _loaded(self, data: dict):
+        self.model.load(data["items"])
+        self._set_total(data["total_cents"])
+
+    def _set_total(self, total_cents: int):
+        self.lbl_total.setText(f"Total: {total_cents / 100.0:.2f} lei")
+        self.btn_finalize.setEnabled(self.model.rowCount() > 0 and not self._closing)
 
     def finalize(self):
-        try:
-            self.svc.finalize_receipt(self.receipt_id)
-            self.accept()
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Eroare la finalizare", str(e))
+        if self._closing or self.receipt_id is None:
+            return
+        self._closing = True
+        self._finalize_requested = True
+        self._scans_rejected = False
+        self.btn_finalize.setEnabled(False)
+        self.scans.flush()
+        self._finalize_when_written()
+
+    def _finalize_when_written(self):
+        # bonul se închide abia după ce s-au terminat toate loturile de scanări trimise; dacă unul a eșuat
+        # sau a avut coduri respinse, casierul vede eroarea și bonul rămâne deschis
+        if not self._finalize_requested or self.scans.busy():
+            return
+        self._finalize_requested = False
+        if self._scans_rejected:
+            self._closing = False
+            self.btn_finalize.setEnabled(self.model.rowCount() > 0)
+            self._scan_error(f"{self.lbl_scan_error.text()}\nBonul nu a fost finalizat: verifică scanările "
+                             f"de mai sus, apoi apasă din nou F12.".strip())
+            return
+        self.tasks.write(self.svc.finalize_receipt, self.receipt_id, owner=self,
+                         on_done=lambda _: self.accept(), on_error=self._finalize_failed)
+
+    def _finalize_failed(self, e: Exception):
+        self._closing = False
+        self.btn_finalize.setEnabled(self.model.rowCount() > 0)
+        QtWidgets.QMessageBox.critical(self, "Eroare la finalizare", str(e))
 
     # ---------------- utilities ----------------
     def _selected_line_id(self):
-        r = self.table.currentRow()
-        if r < 0:
+        idx = self.table.currentIndex()
+        if not idx.isValid():
             return None
-        item0 = self.table.item(r, 0)
-        return item0.data(QtCore.Qt.UserRole) if item0 else None
+        return self.model.line_id(idx.row())
+
+    def _remove_line(self, line_id: int):
+        self.tasks.write(self.svc.remove_line, int(line_id), owner=self,
+                         on_done=lambda res: self._line_removed(int(line_id), res))
+
+    def _line_removed(self, line_id: int, res):
+        self.model.remove_line(line_id)
+        if res is not None:
+            self._set_total(res["total_cents"])
 
     def remove_selected_line(self):
         line_id = self._selected_line_id()
         if not line_id:
             return
-        self.svc.remove_line(int(line_id))
-        self.refresh()
+        self._remove_line(line_id)
 
     def _table_menu(self, pos):
         line_id = self._selected_line_id()
@@ -161,13 +248,25 @@ class VanzareDialog(QtWidgets.QDialog):
         act = menu.addAction("Șterge linia")
         # PySide6: exec(), nu exec_()
         if menu.exec(self.table.viewport().mapToGlobal(pos)) == act:
-            self.svc.remove_line(int(line_id))
-            self.refresh()
+            self._remove_line(line_id)
 
     # Anulează bonul deschis dacă se iese cu Esc / butonul Anulează
     def reject(self):
-        try:
-            self.svc.void_receipt(self.receipt_id)
-        except Exception:
-            pass
+        if self._closing:
+            return
+        # se execută după scanările încă în coadă, chiar dacă dialogul s-a închis deja
+        self._closing = True
+        self.scans.clear()
+        self.tasks.write(self._void, owner=self, on_error=lambda e: None)
         super().reject()
+
+    def _void(self):
+        # thread-ul de scriere: după _open_receipt (FIFO), deci bonul nou are deja id, chiar dacă
+        # _receipt_opened nu a ajuns încă pe GUI; dacă deschiderea a eșuat, nu e nimic de anulat
+        receipt_id = self.receipt_id if self.receipt_id is not None else self._opened_id
+        if receipt_id is not None:
+            self.svc.void_receipt(receipt_id)
+
+    def done(self, r):
+        self.tasks.detach(self)
+        super().done(r)
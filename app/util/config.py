@@ -11,16 +11,56 @@ import json
 # expiry_alert_days = warning for Product expir date
 # low_stock_treshold = minimum treshold to be warned by the app that the store needs to be refilled
 # locale = region code, used for number format, currency, calendaristic date, etc.
-# TO DO  : db_mode and api_base_url to be updated
+# backup_* = the background backup (app.infra.backup.BackupScheduler):
+#   interval in minutes (0 = off), how many copies / days to keep (0 = no limit), gzip the copies,
+#   run PRAGMA integrity_check on each copy, and the page step / pause used while copying
+# sql_* = query instrumentation (app.infra.db.query_stats): time every statement, log the ones slower
+#   than sql_slow_ms (with EXPLAIN QUERY PLAN) to sql_slow_log; see the "Interogări SQL" tab in Setări
+# multi_client = several tills / the back-office PC share the same db_path (app.infra.db.lock_policy):
+#   a write waits busy_timeout_ms for another client's lock, then (only in multi_client mode) is retried
+#   write_retries more times with backoff + jitter. The .app.lock of main.py still only stops a second
+#   instance in the same folder; each till runs from its own folder. Keep the database on a local disk
+#   of the machine the clients run on (WAL does not work over network shares).
+# db_mode = "local"  → the app opens db_path itself (one till, or several with multi_client)
+#           "server" → like local, and it also serves the other tills over HTTP (app.services.api_server),
+#                      listening on api_base_url (e.g. "http://0.0.0.0:8080" to accept the other PCs)
+#           "remote" → no local database: every call goes to the server at api_base_url
+#                      (app.services.remote_service.RemoteInventoryService); backups run on the server
+# group_commit_ms = (server) writes arriving within this many ms share one durable COMMIT
+#   (app.services.group_commit); 0 = one transaction per call, as before
+# api_token = shared secret sent as "Authorization: Bearer ..." (empty = no check)
+# buffered_receipts = an open receipt lives in memory (app.services.receipt_buffer) and is written to the
+#   database only by finalize_receipt (header + lines + stock movements in one transaction); every change
+#   is appended to receipt_journal so an unfinished receipt survives a crash. Voided receipts are not kept.
+#   receipt_journal_fsync = fsync every journal record (survives a power loss too); false = flush only,
+#   which survives an app crash but not an OS crash / power loss, with no disk wait per scan
 
 DEFAULT_CONFIG = {
     "db_path": "magazin.sqlite",
     "backup_dir": "backups",
+    "backup_interval_min": 60,
+    "backup_keep_count": 48,
+    "backup_keep_days": 30,
+    "backup_compress": True,
+    "backup_verify": False,
+    "backup_pages_per_step": 1024,
+    "backup_step_sleep_ms": 5,
+    "sql_stats": False,
+    "sql_slow_ms": 100,
+    "sql_slow_log": "sql_slow.jsonl",
+    "multi_client": False,
+    "busy_timeout_ms": 5000,
+    "write_retries": 5,
     "expiry_alert_days": [7, 14, 30],
     "low_stock_threshold": 5,
     "locale": "ro_RO",
-    "db_mode": "local",                      # pregătit pentru server
-    "api_base_url": "http://localhost:8080"  # pentru viitor (mobil/API)
+    "db_mode": "local",                      # local / server / remote
+    "api_base_url": "http://localhost:8080",
+    "api_token": "",
+    "group_commit_ms": 0,
+    "buffered_receipts": False,
+    "receipt_journal": "receipts.journal",
+    "receipt_journal_fsync": True,
 }
 
 # ---------------------------     LOADING THE CONFIGURATION    ---------------------------------
@@ -32,7 +72,8 @@ def load_config(path: str = "config.json"):
     if not p.exists():
         save_config(DEFAULT_CONFIG, path)
         return DEFAULT_CONFIG.copy() # return a copy so we are not altering the default configuration by mistake
-    return json.loads(p.read_text(encoding="utf-8"))
+    # keys added in newer versions get their default value (older config.json files lack them)
+    return {**DEFAULT_CONFIG, **json.loads(p.read_text(encoding="utf-8"))}
 
 def save_config(cfg: dict, path: str = "config.json"):
     Path(path).write_text(json.dumps(cfg, indent=2, ensure_ascii=False), encoding="utf-8")
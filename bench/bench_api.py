@@ -0,0 +1,169 @@
+# Benchmark / generator de încărcare pentru serverul API (app.services.api_server) pe localhost
+#
+# Pornește serverul ca proces separat (python -m app.services.api_server) pe o bază sintetică, apoi
+# --tills procese „casă” cu RemoteInventoryService: bon de --lines scanări (add_line_to_receipt),
+# finalize_receipt, în buclă, timp de --seconds secunde; --readers procese fac în paralel doar citiri
+# (căutare în lista de stoc, produs după cod). Raportează:
+#   - bonuri / s și cereri / s
+#   - latența pe cerere (p50 / p95 / p99, ms) pentru scanare, finalizare și citiri
+#   - erorile (ValueError / RuntimeError întoarse de server)
+# Cu --compare-direct rulează și aceleași case direct pe fișier (bench_multi_till, multi_client),
+# pentru comparație.
+#
+#   python -m bench.bench_api [--tills 4] [--readers 1] [--seconds 10] [--lines 10] [--group-commit-ms 2]
+#                             [--compare-direct]
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.remote_service import RemoteInventoryService
+from .bench_import import ean13
+from .bench_multi_till import _pct, run_mode
+from .bench_prepare import seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def worker(role: str, idx: int, url: str, args: dict, start, out) -> None:
+    try:
+        out.put(_work(role, idx, url, args, start))
+    except Exception as e:   # părintele așteaptă un rezultat de la fiecare proces
+        out.put({"role": role, "error": repr(e)})
+
+
+def _timed(samples: dict, name: str, fn, *a):
+    t0 = time.perf_counter()
+    try:
+        return fn(*a)
+    finally:
+        samples.setdefault(name, []).append((time.perf_counter() - t0) * 1000)
+
+
+def _work(role: str, idx: int, url: str, args: dict, start) -> dict:
+    rnd = random.Random(idx)
+    svc = RemoteInventoryService(url)
+    samples, done, errors = {}, 0, 0
+    start.wait()
+    deadline = time.perf_counter() + args["seconds"]
+    while time.perf_counter() < deadline:
+        try:
+            if role == "till":
+                rid = _timed(samples, "open", svc.open_receipt)
+                for _ in range(args["lines"]):
+                    _timed(samples, "scan", svc.add_line_to_receipt, rid, ean13(rnd.randint(1, args["products"])), 1)
+                _timed(samples, "finalize", svc.finalize_receipt, rid)
+            else:
+                _timed(samples, "stock_page", lambda: svc.get_stock_products(search=f"Produs {rnd.randint(1, 99)}",
+                                                                            limit=50))
+                _timed(samples, "lookup", svc.find_product_by_barcode, ean13(rnd.randint(1, args["products"])))
+            done += 1
+        except (ValueError, RuntimeError):
+            errors += 1
+    svc.close()
+    return {"role": role, "done": done, "errors": errors, "samples": samples}
+
+
+def run_api(template: str, tmp: str, args: dict) -> dict:
+    path = os.path.join(tmp, "api.sqlite")
+    shutil.copyfile(template, path)
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    server = subprocess.Popen([sys.executable, "-m", "app.services.api_server", "--db", path,
+                               "--listen", f"127.0.0.1:{port}", "--read-threads", str(args["read_threads"]),
+                               "--group-commit-ms", str(args["group_commit_ms"])],
+                              cwd=tmp, env=env, stdout=subprocess.DEVNULL)
+    try:
+        probe = RemoteInventoryService(url)
+        for _ in range(100):
+            try:
+                probe.ping()
+                break
+            except RuntimeError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("serverul API nu a pornit")
+        probe.close()
+
+        ctx = mp.get_context("spawn")
+        start, out = ctx.Event(), ctx.Queue()
+        roles = [("till", i) for i in range(args["tills"])] + [("reader", 100 + i) for i in range(args["readers"])]
+        procs = [ctx.Process(target=worker, args=(role, idx, url, args, start, out)) for role, idx in roles]
+        for p in procs:
+            p.start()
+        time.sleep(1.0)   # procesele „spawn” își termină importurile
+        t0 = time.perf_counter()
+        start.set()
+        results = [out.get() for _ in procs]
+        wall = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    errors = [r["error"] for r in results if "error" in r]
+    if errors:
+        raise RuntimeError(f"procese eșuate: {errors}")
+    merged = {}
+    for r in results:
+        for name, ms in r["samples"].items():
+            merged.setdefault(name, []).extend(ms)
+    report = {
+        "receipts": sum(r["done"] for r in results if r["role"] == "till"),
+        "receipts_per_s": round(sum(r["done"] for r in results if r["role"] == "till") / wall, 1),
+        "requests_per_s": round(sum(len(ms) for ms in merged.values()) / wall, 1),
+        "errors": sum(r["errors"] for r in results),
+    }
+    for name, ms in sorted(merged.items()):
+        report[name] = {"calls": len(ms), "p50_ms": _pct(ms, 0.50), "p95_ms": _pct(ms, 0.95),
+                        "p99_ms": _pct(ms, 0.99)}
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="generator de încărcare pentru serverul API")
+    ap.add_argument("--tills", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=1)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--lines", type=int, default=10, help="scanări per bon")
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--read-threads", type=int, default=4)
+    ap.add_argument("--group-commit-ms", type=float, default=0, help="fereastra de group commit a serverului")
+    ap.add_argument("--compare-direct", action="store_true", help="și casele direct pe fișier (bench_multi_till)")
+    args = ap.parse_args()
+
+    opts = {k: getattr(args, k) for k in ("tills", "readers", "seconds", "lines", "products", "read_threads",
+                                           "group_commit_ms")}
+    report = {"tills": args.tills, "readers": args.readers, "seconds": args.seconds}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.sqlite")
+        seed(template, args.products)
+        report["api"] = run_api(template, tmp, opts)
+        if args.compare_direct:
+            direct = run_mode(template, tmp, {"mode": "multi", "tills": args.tills, "office": 0,
+                                              "seconds": args.seconds, "lines": args.lines, "office_lines": 0,
+                                              "products": args.products, "busy_timeout_ms": 5000, "retries": 5})
+            report["direct"] = {k: direct[k] for k in ("receipts", "receipts_per_s", "lock_wait_p95_ms",
+                                                       "lock_wait_p99_ms", "failed", "receipt_p50_ms",
+                                                       "receipt_p95_ms")}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
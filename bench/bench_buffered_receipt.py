@@ -0,0 +1,161 @@
+# Benchmark: bon deschis în baza de date vs. bon în memorie (services.receipt_buffer, "buffered_receipts")
+#
+# Aceeași secvență pe două copii ale bazei: --receipts bonuri de câte --lines scanări (add_line_to_receipt,
+# câte o scanare de fiecare dată, ca la casă), o linie ștearsă din când în când, iar --void-pct % din bonuri
+# anulate în loc de finalizate.
+#
+#   db       : open_receipt / fiecare scanare / void_receipt = câte o tranzacție de scriere (ca până acum)
+#   buffered : scanările doar în memorie + o linie în jurnal (cu fsync, fără la --no-journal-fsync);
+#              finalize_receipt = o singură tranzacție
+#
+# Raportează latența pe scanare și pe finalizare (p50 / p95, ms), bonuri / s, câte tranzacții de scriere,
+# și verifică că ambele moduri ajung la aceleași vânzări (mișcări) și aceleași solduri.
+#
+# Cu --crash-check verifică și recuperarea din jurnal: un proces copil deschide un bon în memorie, îl
+# finalizează prin GroupCommitWriter și moare (os._exit) în tranzacția grupului, înainte de COMMIT;
+# la repornire bonul trebuie refăcut din jurnal (nimic în bază), apoi finalizat o singură dată.
+#
+#   python -m bench.bench_buffered_receipt [--receipts 300] [--lines 15] [--void-pct 10] [--synchronous NORMAL|FULL]
+#                                          [--no-journal-fsync] [--crash-check]
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.infra.db import lock_policy
+from app.services.use_cases import InventoryService
+from .bench_import import ean13
+from .bench_multi_till import _pct
+from .bench_prepare import seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# procesul copil din crash_check: finalizarea intră în grup, comanda următoare din același grup îl omoară
+CRASH_CHILD = """
+import os, sys, time
+from app.services.group_commit import GroupCommitWriter
+from app.services.use_cases import InventoryService
+svc = InventoryService(sys.argv[1], receipt_journal=sys.argv[2])
+rid = svc.open_receipt()
+svc.add_line_to_receipt(rid, sys.argv[3], 2)
+svc.add_line_to_receipt(rid, sys.argv[4], 1)
+writer = GroupCommitWriter(svc, window_ms=500, max_batch=2, durable=True)
+writer.submit(svc.finalize_receipt, rid)
+writer.submit(os._exit, 1)
+time.sleep(10)
+"""
+
+
+def run(path: str, mode: str, args) -> dict:
+    journal = path + ".journal" if mode == "buffered" else None
+    svc = InventoryService(path, receipt_journal=journal, journal_fsync=args.journal_fsync)
+    conn = svc._conn()
+    conn.execute(f"PRAGMA synchronous={args.synchronous}")
+    lock_policy.reset()
+    rnd = random.Random(7)
+    scans, finals = [], []
+    t0 = time.perf_counter()
+    for _ in range(args.receipts):
+        rid = svc.open_receipt()
+        last = None
+        for i in range(args.lines):
+            code = ean13(rnd.randint(1, args.products))
+            s0 = time.perf_counter()
+            if last is not None and i % 7 == 6:
+                svc.remove_line(last)
+                last = None
+            else:
+                last = svc.add_line_to_receipt(rid, code, rnd.randint(1, 3))["line"]["id"]
+            scans.append((time.perf_counter() - s0) * 1000)
+        f0 = time.perf_counter()
+        if rnd.random() * 100 < args.void_pct:
+            svc.void_receipt(rid)
+        else:
+            svc.finalize_receipt(rid)
+        finals.append((time.perf_counter() - f0) * 1000)
+    wall = time.perf_counter() - t0
+    transactions = lock_policy.snapshot()["transactions"]
+
+    sales = conn.execute("SELECT product_id, SUM(quantity_base) FROM movements WHERE reason='sale' "
+                         "GROUP BY product_id ORDER BY product_id").fetchall()
+    stock = [(p["product_id"], p["stock_base"]) for p in svc.get_stock_products()]
+    closed = conn.execute("SELECT COUNT(*), COALESCE(SUM(total_cached_cents),0) FROM receipts "
+                          "WHERE status='closed'").fetchone()
+    svc.close()
+    return {
+        "receipts_per_s": round(args.receipts / wall, 1),
+        "scan_p50_ms": _pct(scans, 0.50),
+        "scan_p95_ms": _pct(scans, 0.95),
+        "end_p50_ms": _pct(finals, 0.50),
+        "end_p95_ms": _pct(finals, 0.95),
+        "write_transactions": transactions,
+        "check": [[tuple(r) for r in sales], stock, tuple(closed)],
+    }
+
+
+def crash_check(template: str, tmp: str) -> dict:
+    path, journal = os.path.join(tmp, "crash.sqlite"), os.path.join(tmp, "crash.journal")
+    shutil.copyfile(template, path)
+    child = subprocess.run([sys.executable, "-c", CRASH_CHILD, path, journal, ean13(1), ean13(2)],
+                           cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT), timeout=60)
+    svc = InventoryService(path, receipt_journal=journal)
+    recovered = svc.recover_receipts()
+    conn = svc._conn()
+    before = conn.execute("SELECT COUNT(*) FROM receipts").fetchone()[0]
+    items = svc.get_receipt(recovered[0]["id"])["items"] if recovered else []
+    db_id = svc.finalize_receipt(recovered[0]["id"]) if recovered else None
+    sold = conn.execute("SELECT COALESCE(-SUM(quantity_base),0) FROM movements WHERE reason='sale'").fetchone()[0]
+    svc.close()
+    # după finalizare: jurnalul e gol, o nouă pornire nu mai reface nimic
+    again = InventoryService(path, receipt_journal=journal)
+    left = again.recover_receipts()
+    again.close()
+    ok = (child.returncode == 1 and len(recovered) == 1 and before == 0 and len(items) == 2
+          and db_id is not None and sold == 3 and not left)
+    return {"child_exit": child.returncode, "recovered": len(recovered), "receipts_in_db_before": before,
+            "recovered_lines": len(items), "sold_after_finalize": sold, "recovered_again": len(left), "ok": ok}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="bon în baza de date vs. bon în memorie")
+    ap.add_argument("--receipts", type=int, default=300)
+    ap.add_argument("--lines", type=int, default=15, help="scanări per bon")
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--void-pct", type=float, default=10, help="procentul de bonuri anulate")
+    ap.add_argument("--synchronous", default="NORMAL", choices=["NORMAL", "FULL"])
+    ap.add_argument("--dir", default=None, help="unde se creează bazele (implicit un director temporar)")
+    ap.add_argument("--no-journal-fsync", dest="journal_fsync", action="store_false",
+                    help="jurnalul bonurilor doar cu flush, fără fsync pe fiecare înregistrare")
+    ap.add_argument("--crash-check", action="store_true", help="și recuperarea unui bon după o cădere")
+    args = ap.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        template = os.path.join(tmp, "template.sqlite")
+        seed(template, args.products)
+        for mode in ("db", "buffered"):
+            path = os.path.join(tmp, f"{mode}.sqlite")
+            shutil.copyfile(template, path)
+            report[mode] = run(path, mode, args)
+        if args.crash_check:
+            report["crash_check"] = crash_check(template, tmp)
+
+    same = report["db"]["check"] == report["buffered"]["check"]
+    for mode in ("db", "buffered"):
+        del report[mode]["check"]
+    print(json.dumps({"receipts": args.receipts, "lines": args.lines, "void_pct": args.void_pct,
+                      "synchronous": args.synchronous, "journal_fsync": args.journal_fsync, **report, "same_results": same}, indent=2))
+    if not same:
+        raise SystemExit("modurile au ajuns la vânzări / solduri diferite")
+    if args.crash_check and not report["crash_check"]["ok"]:
+        raise SystemExit("bonul nu a fost refăcut corect din jurnal după cădere")
+
+
+if __name__ == "__main__":
+    main()
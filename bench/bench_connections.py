@@ -0,0 +1,87 @@
+# Benchmark: costul per apel al conexiunilor SQLite în InventoryService
+#
+# Compară două strategii pe aceeași bază temporară:
+#   - "per_call" : comportamentul vechi, connect() nou la fiecare apel (PRAGMA-uri de fiecare dată)
+#   - "pooled"   : ConnectionManager, o conexiune persistentă per thread
+#
+# Rulare (din rădăcina repo-ului):
+#   python -m bench.bench_connections [--n 2000]
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.infra.db import connect, ConnectionManager
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+
+BARCODE = "5941047813978"
+
+
+class PerCallConnections:
+    """Strategia veche: o conexiune nouă la fiecare get(), niciodată închisă explicit."""
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def get(self):
+        return connect(self.db_path)
+
+    def close_all(self):
+        pass
+
+
+def _time_calls(fn, n: int) -> dict:
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": statistics.fmean(samples),
+        "p50_us": samples[len(samples) // 2],
+        "p95_us": samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def run(n: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.sqlite")
+        init_db(db_path).close()
+
+        seed = InventoryService(db_path)
+        seed.create_product(barcode=BARCODE, name="Produs test", unit="buc", price_per_unit_lei=3.0)
+        seed.close()
+
+        for label, conns in (("per_call", PerCallConnections(db_path)),
+                             ("pooled", ConnectionManager(db_path))):
+            svc = InventoryService(db_path, connections=conns)
+            receipt_id = svc.open_receipt()
+            results[label] = {
+                "find_product_by_barcode": _time_calls(lambda: svc.find_product_by_barcode(BARCODE), n),
+                "add_line_to_receipt": _time_calls(lambda: svc.add_line_to_receipt(receipt_id, BARCODE, 1), n),
+            }
+            svc.void_receipt(receipt_id)
+            svc.close()
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cost per apel: connect() nou vs. conexiune persistentă")
+    ap.add_argument("--n", type=int, default=2000, help="apeluri per metodă")
+    args = ap.parse_args()
+
+    results = run(args.n)
+    for op in ("find_product_by_barcode", "add_line_to_receipt"):
+        before, after = results["per_call"][op], results["pooled"][op]
+        print(f"{op}:")
+        for label, r in (("per_call", before), ("pooled", after)):
+            print(f"  {label:9s} mean {r['mean_us']:8.1f} µs   p50 {r['p50_us']:8.1f} µs   p95 {r['p95_us']:8.1f} µs")
+        print(f"  speedup   x{before['mean_us'] / after['mean_us']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Benchmark: get_expiring_batches – toate loturile datate + filtrare în Python vs. interval în SQL
+#
+#   legacy : toate loturile cu dată și stoc > 0, parsare expiry_date în Python, filtrare pe fereastră
+#   sql    : WHERE expiry_iso BETWEEN azi AND azi+zile pe ix_batches_expiry_iso
+#
+# Verifică și că rezultatele sunt identice.
+#
+#   python -m bench.bench_expiring [--products 50000] [--movements 1000000] [--db /tmp/exp.sqlite]
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, datetime
+
+from app.infra.db import connect
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+from .synth import build_ledger_db
+
+WINDOWS = [3, 30, 90, 365]
+
+
+def legacy_expiring_batches(conn, svc: InventoryService, days: int) -> list[dict]:
+    rows = conn.execute("""
+        SELECT p.name AS product_name, p.barcode, p.unit, b.expiry_date, sb.qty_base AS stock_base
+        FROM stock_balance_batch sb
+        JOIN batches b ON b.id = sb.batch_id
+        JOIN products p ON p.id = b.product_id
+        WHERE b.expiry_date IS NOT NULL AND sb.qty_base > 0
+        ORDER BY b.expiry_date ASC, b.id ASC
+    """).fetchall()
+    today = date.today()
+    items = []
+    for r in rows:
+        raw = r["expiry_date"]
+        if isinstance(raw, datetime):
+            d = raw.date()
+        elif isinstance(raw, date):
+            d = raw
+        elif isinstance(raw, str) and raw:
+            try:
+                d = date.fromisoformat(raw)
+            except ValueError:
+                continue
+        else:
+            continue
+        days_left = (d - today).days
+        if 0 <= days_left <= int(days):
+            items.append({
+                "product_name": r["product_name"], "barcode": r["barcode"], "expiry_date": d.isoformat(),
+                "stock_human": svc.from_base_qty(r["unit"], int(r["stock_base"] or 0)), "days_left": days_left,
+            })
+    items.sort(key=lambda x: (x["days_left"], x["expiry_date"]))
+    return items
+
+
+def _ms(fn, repeat: int):
+    samples, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="get_expiring_batches: Python vs. SQL")
+    ap.add_argument("--products", type=int, default=50_000)
+    ap.add_argument("--movements", type=int, default=1_000_000)
+    ap.add_argument("--batches-per-product", type=int, default=4)
+    ap.add_argument("--db", default=None, help="fișier bază (se generează doar dacă nu există)")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = None
+    db_path = args.db
+    if db_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "exp.sqlite")
+    if not os.path.exists(db_path):
+        print(f"generez {args.products} produse / {args.movements} mișcări în {db_path} ...")
+        build_ledger_db(db_path, args.products, args.movements, args.batches_per_product)
+    init_db(db_path).close()   # baze generate de versiuni mai vechi: adaugă expiry_iso + index
+
+    svc = InventoryService(db_path)
+    conn = connect(db_path)
+    n_batches = conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+    print(f"{n_batches} loturi")
+    print(f"{'zile':>5} {'legacy ms':>10} {'sql ms':>9} {'rânduri':>8}")
+    for days in WINDOWS:
+        t_old, old = _ms(lambda: legacy_expiring_batches(conn, svc, days), args.repeat)
+        t_new, new = _ms(lambda: svc.get_expiring_batches(days), args.repeat)
+        assert old == new, f"rezultate diferite pentru {days} zile"
+        print(f"{days:5d} {t_old:10.1f} {t_new:9.2f} {len(new):8d}")
+
+    conn.close()
+    svc.close()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
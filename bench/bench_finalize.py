@@ -0,0 +1,176 @@
+# Benchmark: finalize_receipt — alocare FIFO linie cu linie vs. alocare set-based
+#
+# Pentru fiecare mărime de coș (1…200 linii) pornește de la aceeași bază (copie de fișier),
+# finalizează bonul o dată cu algoritmul vechi (legacy_finalize, păstrat aici ca referință)
+# și o dată cu InventoryService.finalize_receipt, apoi verifică că mișcările scrise sunt identice.
+#
+# Rulare (din rădăcina repo-ului):
+#   python -m bench.bench_finalize [--sizes 1,10,60,200] [--repeat 5]
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.infra.db import connect
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+
+
+def legacy_finalize(conn, receipt_id: int):
+    """Algoritmul de dinainte: pentru fiecare linie, SELECT pe loturi + INSERT-uri + SELECT fără lot."""
+    with conn:
+        items = conn.execute(
+            "SELECT product_id, qty_base FROM receipt_lines WHERE receipt_id=? ORDER BY id", (receipt_id,)
+        ).fetchall()
+        for it in items:
+            product_id = int(it["product_id"])
+            remaining = int(it["qty_base"])
+            rows = conn.execute("""
+                SELECT b.id AS batch_id, sb.qty_base AS stock_base, b.expiry_date
+                FROM stock_balance_batch sb
+                JOIN batches b ON b.id = sb.batch_id
+                WHERE sb.product_id=? AND sb.qty_base > 0
+                ORDER BY (b.expiry_date IS NULL), b.expiry_date ASC, b.id ASC
+            """, (product_id,)).fetchall()
+            for r in rows:
+                if remaining <= 0:
+                    break
+                take = min(remaining, int(r["stock_base"]))
+                if take > 0:
+                    conn.execute(
+                        "INSERT INTO movements(product_id, batch_id, quantity_base, reason, note) VALUES (?, ?, ?, 'sale', ?)",
+                        (product_id, r["batch_id"], -take, f"receipt:{receipt_id}"))
+                    remaining -= take
+            if remaining > 0:
+                row = conn.execute(
+                    "SELECT unbatched_qty_base FROM stock_balance_product WHERE product_id=?", (product_id,)
+                ).fetchone()
+                s_null = int(row["unbatched_qty_base"]) if row else 0
+                if s_null >= remaining:
+                    conn.execute(
+                        "INSERT INTO movements(product_id, batch_id, quantity_base, reason, note) VALUES (?, NULL, ?, 'sale', ?)",
+                        (product_id, -remaining, f"receipt:{receipt_id}"))
+                    remaining = 0
+            if remaining > 0:
+                raise ValueError("Stoc insuficient pentru unul dintre produse.")
+        total = conn.execute(
+            "SELECT COALESCE(SUM(line_total_cents),0) AS t FROM receipt_lines WHERE receipt_id=?", (receipt_id,)
+        ).fetchone()["t"]
+        conn.execute(
+            "UPDATE receipts SET status='closed', closed_at=CURRENT_TIMESTAMP, total_cached_cents=? WHERE id=?",
+            (int(total), receipt_id))
+
+
+def build_db(path: str, n_products: int, seed: int = 7):
+    """Produse cu 1–4 loturi (expirări amestecate, unele fără expirare) + stoc fără lot."""
+    rnd = random.Random(seed)
+    conn = init_db(path)
+    today = date.today()
+    with conn:
+        for i in range(n_products):
+            pid = conn.execute(
+                "INSERT INTO products(barcode, name, unit, price_per_unit_cents) VALUES(?,?,?,?)",
+                (f"2{i:011d}", f"Produs {i}", "buc", rnd.randint(100, 5000))).lastrowid
+            for _ in range(rnd.randint(1, 4)):
+                exp = None if rnd.random() < 0.2 else (today + timedelta(days=rnd.randint(-5, 400))).isoformat()
+                bid = conn.execute("INSERT INTO batches(product_id, expiry_date) VALUES(?,?)", (pid, exp)).lastrowid
+                conn.execute(
+                    "INSERT INTO movements(product_id, batch_id, quantity_base, reason) VALUES(?,?,?,'stock_in')",
+                    (pid, bid, rnd.randint(5, 40)))
+            conn.execute(
+                "INSERT INTO movements(product_id, batch_id, quantity_base, reason) VALUES(?,NULL,?,'stock_in')",
+                (pid, rnd.randint(0, 40)))
+    conn.close()
+
+
+def make_receipt(path: str, n_lines: int, n_products: int, seed: int) -> int:
+    """Bon cu n_lines linii; unele produse apar de mai multe ori (preț diferit → linie separată)."""
+    rnd = random.Random(seed)
+    conn = connect(path)
+    with conn:
+        rid = conn.execute("INSERT INTO receipts(status) VALUES('open')").lastrowid
+        for i in range(n_lines):
+            pid = rnd.randint(1, n_products)
+            qty = rnd.randint(1, 12)
+            price = 100 + i
+            conn.execute("""
+                INSERT INTO receipt_lines(receipt_id, product_id, qty_base, unit_price_cents, vat_rate, line_total_cents)
+                VALUES(?,?,?,?,9,?)
+            """, (rid, pid, qty, price, qty * price))
+    conn.close()
+    return rid
+
+
+def _sale_moves(path: str, rid: int):
+    conn = connect(path)
+    rows = conn.execute(
+        "SELECT product_id, batch_id, quantity_base FROM movements WHERE note=? ORDER BY id", (f"receipt:{rid}",)
+    ).fetchall()
+    conn.close()
+    return [tuple(r) for r in rows]
+
+
+def _run_once(template: str, work: str, n_lines: int, n_products: int, seed: int, use_legacy: bool):
+    shutil.copyfile(template, work)
+    rid = make_receipt(work, n_lines, n_products, seed)
+    err = None
+    if use_legacy:
+        conn = connect(work)
+        t0 = time.perf_counter()
+        try:
+            legacy_finalize(conn, rid)
+        except ValueError as e:
+            err = str(e)
+        dt = time.perf_counter() - t0
+        conn.close()
+    else:
+        svc = InventoryService(work)
+        svc._conn()  # conexiunea deschisă înainte de cronometrare, ca la legacy
+        t0 = time.perf_counter()
+        try:
+            svc.finalize_receipt(rid)
+        except ValueError as e:
+            err = str(e)
+        dt = time.perf_counter() - t0
+        svc.close()
+    return dt, (err, _sale_moves(work, rid))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="finalize_receipt: FIFO linie cu linie vs. set-based")
+    ap.add_argument("--sizes", default="1,10,30,60,120,200")
+    ap.add_argument("--products", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    sizes = [int(x) for x in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = str(Path(tmp) / "template.sqlite")
+        work = str(Path(tmp) / "work.sqlite")
+        build_db(template, args.products)
+
+        print(f"{'linii':>6} {'legacy ms':>10} {'set-based ms':>13} {'speedup':>8}  rezultat")
+        failed = 0
+        for n in sizes:
+            t_old, t_new = [], []
+            for rep in range(args.repeat):
+                seed = n * 1000 + rep
+                dt_old, res_old = _run_once(template, work, n, args.products, seed, use_legacy=True)
+                dt_new, res_new = _run_once(template, work, n, args.products, seed, use_legacy=False)
+                if res_old != res_new:
+                    raise SystemExit(f"DIFERENȚĂ la {n} linii (seed {seed}): {res_old} != {res_new}")
+                failed += res_new[0] is not None
+                t_old.append(dt_old * 1000)
+                t_new.append(dt_new * 1000)
+            m_old, m_new = statistics.median(t_old), statistics.median(t_new)
+            print(f"{n:6d} {m_old:10.2f} {m_new:13.2f} {m_old / m_new:7.1f}x  identic")
+        print(f"(bonuri respinse pentru stoc insuficient: {failed})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# Benchmark: group commit vs. un COMMIT per apel, pe scrierile de la casă și de la intrare
+#
+# --clients thread-uri trimit, fiecare, --ops comenzi la un singur writer și așteaptă confirmarea fiecăreia
+# (ca serverul API cu mai multe case): casele fac add_line_to_receipt (+ remove_line din când în când) pe
+# bonul lor, back-office-ul (--office thread-uri) add_stock_in_line în sesiunea lui.
+#
+#   per_call        : ThreadPoolExecutor(1), o tranzacție per apel, synchronous=NORMAL (comportamentul actual)
+#   per_call_durable: la fel, dar synchronous=FULL → fsync pe WAL la fiecare COMMIT
+#   group           : GroupCommitWriter(durable=False), synchronous=NORMAL
+#   group_durable   : GroupCommitWriter(durable=True), fsync la fiecare grup
+#
+# Raportează comenzi / s, latența până la confirmare (p50 / p95, ms), mărimea medie a grupului, și verifică
+# că toate modurile ajung la aceleași totaluri pe bonuri și aceleași solduri.
+#
+#   python -m bench.bench_group_commit [--clients 8] [--office 2] [--ops 300] [--window-ms 2]
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.group_commit import GroupCommitWriter
+from app.services.use_cases import InventoryService
+from .bench_import import ean13
+from .bench_multi_till import _pct
+from .bench_prepare import seed
+
+
+def client(writer, svc: InventoryService, idx: int, role: str, target: int, args, latency: list) -> None:
+    rnd = random.Random(idx)
+    last_line = None
+    for i in range(args.ops):
+        code = ean13(rnd.randint(1, args.products))
+        t0 = time.perf_counter()
+        if role == "till":
+            if last_line is not None and i % 10 == 9:
+                writer.submit(svc.remove_line, last_line).result()
+                last_line = None
+            else:
+                last_line = writer.submit(svc.add_line_to_receipt, target, code, 1).result()["line"]["id"]
+        else:
+            writer.submit(svc.add_stock_in_line, session_id=target, barcode=code, quantity=2,
+                          product_name=None, unit="buc", price_per_unit_lei=1).result()
+        latency.append((time.perf_counter() - t0) * 1000)
+
+
+def run(path: str, mode: str, args) -> dict:
+    svc = InventoryService(path)
+    durable = mode.endswith("durable")
+    if mode.startswith("group"):
+        writer = GroupCommitWriter(svc, window_ms=args.window_ms, durable=durable)
+    else:
+        writer = ThreadPoolExecutor(1)
+        if durable:
+            writer.submit(lambda: svc._conn().execute("PRAGMA synchronous=FULL")).result()
+    receipts = [svc.open_receipt() for _ in range(args.clients)]
+    sessions = [svc.start_stock_in_session(f"bench {i}") for i in range(args.office)]
+    jobs = [("till", r) for r in receipts] + [("office", s) for s in sessions]
+
+    latency: list = []
+    threads = [threading.Thread(target=client, args=(writer, svc, i, role, target, args, latency))
+               for i, (role, target) in enumerate(jobs)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    writer.shutdown(wait=True)
+
+    totals = [svc.get_receipt(r)["total_cents"] for r in receipts]
+    for s in sessions:
+        svc.close_stock_in_session(s)
+    stock = [(p["product_id"], p["stock_base"]) for p in svc.get_stock_products()]
+    svc.close()
+    out = {
+        "ops_per_s": round(len(latency) / wall, 1),
+        "p50_ms": _pct(latency, 0.50),
+        "p95_ms": _pct(latency, 0.95),
+        "totals": totals,
+        "stock": stock,
+    }
+    if isinstance(writer, GroupCommitWriter):
+        out.update({k: v for k, v in writer.stats().items() if k in ("commits", "avg_batch", "largest_batch")})
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="group commit vs. COMMIT per apel")
+    ap.add_argument("--clients", type=int, default=8, help="case (thread-uri)")
+    ap.add_argument("--office", type=int, default=2, help="thread-uri de intrare în stoc")
+    ap.add_argument("--ops", type=int, default=300, help="comenzi per thread")
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--window-ms", type=float, default=2.0)
+    ap.add_argument("--modes", default="per_call,per_call_durable,group,group_durable")
+    ap.add_argument("--dir", default=None, help="unde se creează bazele (implicit un director temporar; "
+                                                "fsync-ul contează, deci pe discul real, nu tmpfs)")
+    args = ap.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        template = os.path.join(tmp, "template.sqlite")
+        seed(template, args.products)
+        for mode in args.modes.split(","):
+            path = os.path.join(tmp, f"{mode}.sqlite")
+            shutil.copyfile(template, path)
+            report[mode] = run(path, mode, args)
+
+    ref = next(iter(report.values()))
+    same = all(r["totals"] == ref["totals"] and r["stock"] == ref["stock"] for r in report.values())
+    for r in report.values():
+        del r["totals"], r["stock"]
+    print(json.dumps({"clients": args.clients, "office": args.office, "ops": args.ops,
+                      "window_ms": args.window_ms, **report, "same_results": same}, indent=2))
+    if not same:
+        raise SystemExit("modurile au ajuns la totaluri / solduri diferite")
+
+
+if __name__ == "__main__":
+    main()
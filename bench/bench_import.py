@@ -0,0 +1,130 @@
+# Benchmark: intrare în stoc dintr-un fișier de furnizor
+#
+#   per-line : add_stock_in_line pentru fiecare rând (ca scanarea din IntrareDialog)
+#   import   : import_stock_in_file – rezolvare produse/loturi în bloc + executemany, o tranzacție
+#
+# Fișierul generat are coloanele exportului de intrare; jumătate din coduri există deja în catalog.
+# Calea per-line rulează doar pe primele --per-line rânduri (durează mult), timpul total e extrapolat.
+#
+#   python -m bench.bench_import [--lines 10000] [--products 3000] [--per-line 1000]
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+from app.util.barcode import ean13_check_digit
+
+HEADERS = ["Nr", "Denumire", "Cod", "Unitate", "Cantitate", "Lot", "Expiră la",
+           "Cost/unit", "Preț la raft", "Valoare", "Furnizor", "Doc furnizor"]
+
+
+def ean13(n: int) -> str:
+    body = f"594{n:09d}"
+    return body + str(ean13_check_digit(body))
+
+
+def make_rows(lines: int, products: int, seed: int = 7) -> list[list]:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(1, lines + 1):
+        n = rnd.randint(1, products)
+        unit = "buc" if n % 5 else "kg"
+        qty = rnd.randint(1, 50) if unit == "buc" else round(rnd.uniform(0.2, 20), 3)
+        lot = f"F{n}-{rnd.randint(1, 3)}" if rnd.random() < 0.6 else ""
+        expiry = f"2027-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        rows.append([i, f"Produs furnizor {n}", ean13(n), unit, qty, lot, expiry,
+                     round(rnd.uniform(1, 40), 2), round(rnd.uniform(2, 60), 2), "", "Furnizor SRL", "FCT-1"])
+    return rows
+
+
+def write_xlsx(path: str, rows: list[list]) -> None:
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Intrare")
+    ws.append(HEADERS)
+    for r in rows:
+        ws.append(r)
+    wb.save(path)
+
+
+def write_csv(path: str, rows: list[list]) -> None:
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(HEADERS)
+        for r in rows:
+            out = list(r)
+            out[2] = f'="{r[2]}"'
+            out[4] = str(r[4]).replace(".", ",")
+            w.writerow(out)
+
+
+def fresh_service(tmp: str, name: str, products: int) -> InventoryService:
+    path = os.path.join(tmp, name)
+    conn = init_db(path)
+    with conn:
+        # jumătate din produsele din fișier există deja
+        conn.executemany("INSERT INTO products(barcode, name, unit, price_per_unit_cents) VALUES(?,?,?,?)",
+                         [(ean13(n), f"Produs {n}", "buc" if n % 5 else "kg", 500)
+                          for n in range(1, products + 1, 2)])
+    conn.close()
+    return InventoryService(path)
+
+
+def per_line(svc: InventoryService, rows: list[list]) -> None:
+    sid = svc.start_stock_in_session()
+    for r in rows:
+        svc.add_stock_in_line(
+            session_id=sid, barcode=r[2], quantity=float(r[4]), product_name=r[1], unit=r[3],
+            price_per_unit_lei=r[8], expiry_date=r[6], lot_code=r[5] or None, unit_cost_lei=r[7],
+            supplier_name=r[10], supplier_doc=r[11],
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import intrare: per linie vs. în bloc")
+    ap.add_argument("--lines", type=int, default=10_000)
+    ap.add_argument("--products", type=int, default=3_000)
+    ap.add_argument("--per-line", type=int, default=1_000, help="câte rânduri rulează pe calea per linie")
+    args = ap.parse_args()
+
+    rows = make_rows(args.lines, args.products)
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        files["csv"] = os.path.join(tmp, "intrare.csv")
+        write_csv(files["csv"], rows)
+        try:
+            files["xlsx"] = os.path.join(tmp, "intrare.xlsx")
+            write_xlsx(files["xlsx"], rows)
+        except ImportError:
+            print("openpyxl lipsește – sar peste .xlsx")
+            files.pop("xlsx")
+
+        for kind, path in files.items():
+            svc = fresh_service(tmp, f"import-{kind}.sqlite", args.products)
+            sid = svc.start_stock_in_session()
+            t0 = time.perf_counter()
+            res = svc.import_stock_in_file(sid, path)
+            dt = time.perf_counter() - t0
+            print(f"import {kind:4s}: {res['imported']} linii în {dt:.2f}s ({res['imported'] / dt:,.0f} linii/s), "
+                  f"{res['products_created']} produse noi, {res['batches_created']} loturi noi, "
+                  f"{len(res['errors'])} erori")
+            svc.close()
+
+        n = min(args.per_line, len(rows))
+        if n:
+            svc = fresh_service(tmp, "per-line.sqlite", args.products)
+            t0 = time.perf_counter()
+            per_line(svc, rows[:n])
+            dt = time.perf_counter() - t0
+            print(f"per linie  : {n} linii în {dt:.2f}s ({n / dt:,.0f} linii/s) "
+                  f"→ ~{dt / n * len(rows):.0f}s pentru {len(rows)} linii")
+            svc.close()
+
+
+if __name__ == "__main__":
+    main()
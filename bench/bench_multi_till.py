@@ -0,0 +1,164 @@
+# Benchmark / test de încărcare: mai multe case pe aceeași bază (config.json: "multi_client": true)
+#
+# Pornește --tills procese „casă” (bon de --lines scanări, apoi finalize_receipt, în buclă) și --office
+# procese „back-office” (sesiune de intrare cu --office-lines linii, apoi close_stock_in_session) pe
+# aceeași bază, timp de --seconds secunde. Fiecare proces are conexiunile lui, ca o casă reală.
+#
+# Raportează, pe mod:
+#   - debitul: bonuri finalizate / s, scrieri / s
+#   - așteptarea lock-ului de scriere (BEGIN IMMEDIATE, infra.db.lock_policy): p50 / p95 / p99 / max
+#   - reîncercări și operații eșuate („Baza de date este ocupată...”)
+#   - latența unui bon complet (p50 / p95)
+# și verifică la final soldurile față de registru și că niciun lot nu a ajuns pe minus.
+#
+#   multi  : lock_policy.configure(multi_client=True)  → busy timeout + reîncercări cu backoff și jitter
+#   single : lock_policy.configure(multi_client=False) → doar busy timeout, fără reîncercări
+# Cu un --busy-timeout-ms mic (ex. 20) diferența dintre moduri se vede în coloana „eșuate”.
+#
+#   python -m bench.bench_multi_till [--tills 2] [--office 1] [--seconds 10] [--modes multi,single]
+#                                    [--busy-timeout-ms 1000] [--retries 5]
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from app.infra import db
+from app.infra.balances import verify_stock_balances
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+from .bench_import import ean13
+from .bench_prepare import seed
+
+
+def _pct(samples: list, p: float) -> float:
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    return round(s[min(len(s) - 1, int(len(s) * p))], 2)
+
+
+def worker(role: str, idx: int, path: str, args: dict, start, out) -> None:
+    try:
+        out.put(_work(role, idx, path, args, start))
+    except Exception as e:   # părintele așteaptă un rezultat de la fiecare proces
+        out.put({"role": role, "error": repr(e)})
+
+
+def _work(role: str, idx: int, path: str, args: dict, start) -> dict:
+    db.lock_policy.configure(args["mode"] == "multi", args["busy_timeout_ms"], args["retries"])
+    rnd = random.Random(idx)
+    svc = InventoryService(path)
+    done, writes, failed, latency_ms = 0, 0, 0, []
+    start.wait()
+    deadline = time.perf_counter() + args["seconds"]
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            if role == "till":
+                rid = svc.open_receipt()
+                for _ in range(args["lines"]):
+                    svc.add_line_to_receipt(rid, ean13(rnd.randint(1, args["products"])), 1)
+                svc.finalize_receipt(rid)
+                writes += args["lines"] + 2
+            else:
+                sid = svc.start_stock_in_session(f"bench {idx}")
+                for _ in range(args["office_lines"]):
+                    i = rnd.randint(1, args["products"])
+                    svc.add_stock_in_line(session_id=sid, barcode=ean13(i), quantity=10, product_name=f"Produs {i - 1}",
+                                          unit="buc", price_per_unit_lei=1, expiry_date="2031-01-01")
+                svc.close_stock_in_session(sid)
+                writes += args["office_lines"] + 2
+                time.sleep(0.01)   # operatorul de la back-office nu scanează continuu
+            done += 1
+            latency_ms.append((time.perf_counter() - t0) * 1000)
+        except (RuntimeError, sqlite3.OperationalError):
+            failed += 1
+    svc.close()
+    lk = db.lock_policy.snapshot()
+    return {"role": role, "done": done, "writes": writes, "failed": failed, "latency_ms": latency_ms,
+            "waits": list(db.lock_policy.waits), "transactions": lk["transactions"], "retries": lk["retries"]}
+
+
+def run_mode(template: str, tmp: str, args: dict) -> dict:
+    path = os.path.join(tmp, f"{args['mode']}.sqlite")
+    shutil.copyfile(template, path)
+    ctx = mp.get_context("spawn")   # ca pe Windows: fiecare casă e un proces separat, fără stare moștenită
+    start, out = ctx.Event(), ctx.Queue()
+    roles = [("till", i) for i in range(args["tills"])] + [("office", 100 + i) for i in range(args["office"])]
+    procs = [ctx.Process(target=worker, args=(role, idx, path, args, start, out)) for role, idx in roles]
+    for p in procs:
+        p.start()
+    time.sleep(1.0)   # procesele „spawn” își termină importurile
+    t0 = time.perf_counter()
+    start.set()
+    results = [out.get() for _ in procs]
+    wall = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+    errors = [r["error"] for r in results if "error" in r]
+    if errors:
+        raise RuntimeError(f"procese eșuate: {errors}")
+
+    tills = [r for r in results if r["role"] == "till"]
+    waits = [w for r in results for w in r["waits"]]
+    conn = init_db(path)
+    try:
+        diffs = verify_stock_balances(conn)
+        negative = conn.execute("SELECT COUNT(*) FROM stock_balance_batch WHERE qty_base < 0").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "receipts": sum(r["done"] for r in tills),
+        "receipts_per_s": round(sum(r["done"] for r in tills) / wall, 1),
+        "writes_per_s": round(sum(r["writes"] for r in results) / wall, 1),
+        "lock_wait_p50_ms": _pct(waits, 0.50),
+        "lock_wait_p95_ms": _pct(waits, 0.95),
+        "lock_wait_p99_ms": _pct(waits, 0.99),
+        "lock_wait_max_ms": round(max(waits), 2) if waits else 0.0,
+        "transactions": sum(r["transactions"] for r in results),
+        "retries": sum(r["retries"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "receipt_p50_ms": _pct([ms for r in tills for ms in r["latency_ms"]], 0.50),
+        "receipt_p95_ms": _pct([ms for r in tills for ms in r["latency_ms"]], 0.95),
+        "balance_diffs": len(diffs),
+        "negative_batches": negative,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="mai multe case (procese) pe aceeași bază")
+    ap.add_argument("--tills", type=int, default=2)
+    ap.add_argument("--office", type=int, default=1)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--lines", type=int, default=10, help="scanări per bon")
+    ap.add_argument("--office-lines", type=int, default=20, help="linii per sesiune de intrare")
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--modes", default="multi,single")
+    ap.add_argument("--busy-timeout-ms", type=int, default=1000)
+    ap.add_argument("--retries", type=int, default=5)
+    args = ap.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.sqlite")
+        seed(template, args.products)
+        for mode in args.modes.split(","):
+            opts = {k: getattr(args, k) for k in ("tills", "office", "seconds", "lines", "office_lines",
+                                                  "products", "busy_timeout_ms", "retries")}
+            report[mode] = run_mode(template, tmp, {**opts, "mode": mode})
+
+    print(json.dumps({"tills": args.tills, "office": args.office, "seconds": args.seconds,
+                      "busy_timeout_ms": args.busy_timeout_ms, **report}, indent=2))
+    bad = [m for m, r in report.items() if r["balance_diffs"] or r["negative_batches"]]
+    if bad:
+        raise SystemExit(f"solduri inconsistente în modurile: {', '.join(bad)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Benchmark: închiderea de perioadă – mărimea bazei și costul recalculării din registru, înainte / după
+#
+#   înainte : baza sintetică cu toată istoria (--years ani de mișcări și bonuri)
+#   după    : close_period la --keep-months luni în urmă + VACUUM
+#
+# Măsoară mărimea fișierului, verify_stock_balances (recalcul complet din registru), lista completă de stoc
+# și verifică că soldurile și lista de stoc sunt identice după închidere.
+#
+#   python -m bench.bench_period_close [--products 20000] [--movements 1000000] [--years 3] [--keep-months 6]
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.infra.balances import verify_stock_balances
+from app.infra.db_init import init_db
+from app.infra.period_close import close_period
+from app.services.use_cases import InventoryService
+from .synth import build_ledger_db
+
+
+def _ms(fn, repeat: int):
+    samples, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), out
+
+
+def measure(db_path: str, repeat: int) -> dict:
+    conn = init_db(db_path)
+    svc = InventoryService(db_path)
+    t_verify, diffs = _ms(lambda: verify_stock_balances(conn), repeat)
+    t_stock, stock = _ms(lambda: svc.get_stock_products(), repeat)
+    res = {
+        "mb": round(os.path.getsize(db_path) / 1e6, 1),
+        "movements": conn.execute("SELECT COUNT(*) FROM movements").fetchone()[0],
+        "verify_ms": round(t_verify, 1),
+        "stock_full_ms": round(t_stock, 1),
+        "diffs": len(diffs),
+        "stock": stock,
+    }
+    svc.close()
+    conn.close()
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="închidere de perioadă: înainte / după")
+    ap.add_argument("--products", type=int, default=20_000)
+    ap.add_argument("--movements", type=int, default=1_000_000)
+    ap.add_argument("--years", type=float, default=3.0)
+    ap.add_argument("--receipts", type=int, default=20_000)
+    ap.add_argument("--keep-months", type=int, default=6)
+    ap.add_argument("--db", default=None, help="șablon (se generează doar dacă nu există; nu e modificat)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = args.db or os.path.join(tmp, "template.sqlite")
+        if not os.path.exists(template):
+            print(f"generez {args.products} produse / {args.movements} mișcări ...")
+            build_ledger_db(template, args.products, args.movements, years=args.years, receipts=args.receipts)
+        work = os.path.join(tmp, "work.sqlite")
+        shutil.copyfile(template, work)
+
+        before = measure(work, args.repeat)
+        cutoff = date.today() - timedelta(days=30 * args.keep_months)
+        conn = init_db(work)
+        res = close_period(conn, cutoff, os.path.join(tmp, "archive.sqlite"))
+        t0 = time.perf_counter()
+        conn.execute("VACUUM")
+        vacuum_s = time.perf_counter() - t0
+        conn.close()
+        after = measure(work, args.repeat)
+
+    assert after["diffs"] == 0, "solduri diferite de registru după închidere"
+    assert before["stock"] == after["stock"], "lista de stoc s-a schimbat după închidere"
+    print(f"închidere la {res['cutoff']}: {res['movements']} mișcări, {res['receipts']} bonuri mutate "
+          f"în {res['duration_s']:.1f}s (+ VACUUM {vacuum_s:.1f}s)")
+    print(f"{'':8s} {'MB':>7} {'mișcări':>9} {'verify ms':>10} {'stoc ms':>9}")
+    for name, r in (("înainte", before), ("după", after)):
+        print(f"{name:8s} {r['mb']:7.1f} {r['movements']:9d} {r['verify_ms']:10.1f} {r['stock_full_ms']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Benchmark: costul compilării instrucțiunilor (prepare) pe drumul scanare → linie de bon
+#
+#   per_call  : conexiune nouă la fiecare apel (comportamentul vechi) → cache-ul de instrucțiuni e mereu gol
+#   no_cache  : conexiuni persistente, dar cached_statements=0 → fiecare execute recompilează SQL-ul
+#   cached    : conexiuni persistente + cache (infra.db.STATEMENT_CACHE_SIZE), SQL-ul cald din constante
+#
+# Fiecare mod: bonuri de --lines scanări (add_line_to_receipt), apoi finalize_receipt; latența per scanare
+# (p50/p95, µs) și per bon finalizat. Diferența no_cache − cached = prepare-ul eliminat.
+#
+#   python -m bench.bench_prepare [--scans 3000] [--products 200] [--lines 15]
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from app.infra import db
+from app.infra.db import ConnectionManager
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+from .bench_connections import PerCallConnections
+from .bench_import import ean13
+
+
+def seed(path: str, n_products: int) -> None:
+    init_db(path).close()
+    svc = InventoryService(path)
+    sid = svc.start_stock_in_session("bench")
+    for i in range(n_products):
+        svc.add_stock_in_line(session_id=sid, barcode=ean13(i + 1), quantity=1_000_000, product_name=f"Produs {i}",
+                              unit="buc", price_per_unit_lei=1 + i % 7, expiry_date=f"2030-01-{1 + i % 28:02d}")
+    svc.close_stock_in_session(sid)
+    svc.close()
+
+
+def _pct(samples: list, p: float) -> float:
+    s = sorted(samples)
+    return round(s[min(len(s) - 1, int(len(s) * p))], 1)
+
+
+def run(svc: InventoryService, scans: list, lines: int) -> dict:
+    scan_us, finalize_us = [], []
+    for i in range(0, len(scans), lines):
+        rid = svc.open_receipt()
+        for code in scans[i:i + lines]:
+            t0 = time.perf_counter()
+            svc.add_line_to_receipt(rid, code, 1)
+            scan_us.append((time.perf_counter() - t0) * 1e6)
+        t0 = time.perf_counter()
+        svc.finalize_receipt(rid)
+        finalize_us.append((time.perf_counter() - t0) * 1e6)
+    return {
+        "scan_p50_us": _pct(scan_us, 0.50),
+        "scan_p95_us": _pct(scan_us, 0.95),
+        "scan_mean_us": round(statistics.fmean(scan_us), 1),
+        "finalize_p50_us": _pct(finalize_us, 0.50),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="prepare-ul instrucțiunilor pe drumul de scanare")
+    ap.add_argument("--scans", type=int, default=3000)
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--lines", type=int, default=15, help="scanări per bon")
+    args = ap.parse_args()
+
+    rnd = random.Random(1)
+    scans = [ean13(rnd.randint(1, args.products)) for _ in range(args.scans)]
+    cache_size = db.STATEMENT_CACHE_SIZE
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.sqlite")
+        seed(template, args.products)
+        for mode in ("per_call", "no_cache", "cached"):
+            path = os.path.join(tmp, f"{mode}.sqlite")
+            shutil.copyfile(template, path)
+            db.STATEMENT_CACHE_SIZE = 0 if mode == "no_cache" else cache_size
+            conns = PerCallConnections(path) if mode == "per_call" else ConnectionManager(path)
+            svc = InventoryService(path, conns)
+            svc.add_line_to_receipt(svc.open_receipt(), scans[0], 1)   # încălzire (cache de produse, pagini)
+            results[mode] = run(svc, scans, args.lines)
+            svc.close()
+        db.STATEMENT_CACHE_SIZE = cache_size
+
+    results["prepare_saved_us_per_scan"] = round(results["no_cache"]["scan_mean_us"] - results["cached"]["scan_mean_us"], 1)
+    print(json.dumps({"scans": args.scans, "lines_per_receipt": args.lines, "cached_statements": cache_size,
+                      **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Benchmark: rafală de scanări pe un bon – câte un add_line_to_receipt per scanare vs. loturi cumulate
+#
+#   per-scan : fluxul vechi – o tranzacție (și un commit) per scanare
+#   batched  : ce face ScanBuffer – scanările se adună în loturi de --batch, codurile repetate se cumulează,
+#              un singur add_lines_to_receipt (o tranzacție) per lot
+#
+# Verifică și că bonurile rezultate sunt identice.
+#
+#   python -m bench.bench_scan_burst [--scans 2000] [--products 50] [--batch 5] [--synchronous NORMAL|FULL]
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+from app.ui.scan_buffer import coalesce
+from .bench_import import ean13
+
+
+def fresh_service(path: str, n_products: int, synchronous: str) -> InventoryService:
+    init_db(path).close()
+    svc = InventoryService(path)
+    svc._conn().execute(f"PRAGMA synchronous={synchronous}")
+    sid = svc.start_stock_in_session("bench")
+    for i in range(n_products):
+        svc.add_stock_in_line(session_id=sid, barcode=ean13(i + 1), quantity=100_000, product_name=f"Produs {i}",
+                              unit="buc", price_per_unit_lei=1 + i % 7)
+    svc.close_stock_in_session(sid)
+    return svc
+
+
+def receipt_lines(svc: InventoryService, rid: int) -> dict:
+    return {it["barcode"]: (it["qty_base"], it["line_total_cents"]) for it in svc.get_receipt(rid)["items"]}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="rafală de scanări: per scanare vs. loturi")
+    ap.add_argument("--scans", type=int, default=2000)
+    ap.add_argument("--products", type=int, default=50)
+    ap.add_argument("--batch", type=int, default=5, help="scanări adunate cât timp lotul anterior se scrie")
+    ap.add_argument("--synchronous", choices=["NORMAL", "FULL"], default="NORMAL")
+    args = ap.parse_args()
+
+    rnd = random.Random(1)
+    # coș realist: multe repetări pe câteva produse
+    scans = [(ean13(rnd.randint(1, args.products)), 1.0) for _ in range(args.scans)]
+
+    results, receipts = {}, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        svc = fresh_service(os.path.join(tmp, "per_scan.sqlite"), args.products, args.synchronous)
+        rid = svc.open_receipt()
+        t0 = time.perf_counter()
+        for code, qty in scans:
+            svc.add_line_to_receipt(rid, code, qty)
+        results["per_scan"] = {"s": round(time.perf_counter() - t0, 3), "transactions": len(scans)}
+        receipts["per_scan"] = receipt_lines(svc, rid)
+        svc.close()
+
+        svc = fresh_service(os.path.join(tmp, "batched.sqlite"), args.products, args.synchronous)
+        rid = svc.open_receipt()
+        batches = [coalesce(scans[i:i + args.batch]) for i in range(0, len(scans), args.batch)]
+        t0 = time.perf_counter()
+        for batch in batches:
+            svc.add_lines_to_receipt(rid, batch)
+        results["batched"] = {"s": round(time.perf_counter() - t0, 3), "transactions": len(batches),
+                              "lines_written": sum(len(b) for b in batches)}
+        receipts["batched"] = receipt_lines(svc, rid)
+        svc.close()
+
+    assert receipts["per_scan"] == receipts["batched"], "bonuri diferite"
+    for r in results.values():
+        r["scans_per_s"] = round(len(scans) / r["s"], 1) if r["s"] else None
+    print(json.dumps({"scans": len(scans), "batch": args.batch, "synchronous": args.synchronous, **results},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# Benchmark: timpul de pornire al aplicației
+#
+#   import   : python -X importtime -c "import app.ui.main_window" → timpul PySide6 / al modulelor app,
+#              comparat cu importul tuturor ferestrelor (ce se încărca înainte la pornire)
+#   pornire  : proces nou (QT_QPA_PLATFORM=offscreen implicit) cronometrat de la lansare până la
+#              primul eveniment Paint al ferestrei principale și până la baza gata de lucru
+#   init_db  : pe o bază existentă, cu user_version la zi (sare peste schemă) vs. forțat la 0
+#
+# Cu --max-first-paint-ms iese cu cod 1 dacă prima afișare depășește pragul (verificare în CI).
+#
+#   python -m bench.bench_startup [--db magazin.sqlite] [--runs 5] [--max-first-paint-ms 1500]
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.infra.db_init import init_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIALOG_MODULES = ["app.ui.intrare_dialog", "app.ui.vanzare_dialog", "app.ui.stoc_window",
+                  "app.ui.expirare_window", "app.ui.setari_dialog"]
+
+# rulat în procesul copil; tipărește o linie JSON cu momentele (ms de la începutul scriptului)
+CHILD = r"""
+import time; t0 = time.perf_counter()
+import json, os, sys
+from PySide6 import QtWidgets, QtCore
+app = QtWidgets.QApplication(sys.argv)
+from app.ui.main_window import MainWindow
+t_import = time.perf_counter()
+marks = {}
+
+class FirstPaint(QtCore.QObject):
+    def eventFilter(self, obj, ev):
+        if ev.type() == QtCore.QEvent.Paint and "paint" not in marks:
+            marks["paint"] = time.perf_counter()
+        return False
+
+def poll():
+    if win._ready:
+        marks["ready"] = time.perf_counter()
+        out = {k: round((v - t0) * 1000, 1) for k, v in marks.items()}
+        out["import"] = round((t_import - t0) * 1000, 1)
+        print(json.dumps(out), flush=True)
+        win.close()
+        app.quit()
+
+win = MainWindow()
+f = FirstPaint(); win.installEventFilter(f)
+marks["constructed"] = time.perf_counter()
+win.show()
+timer = QtCore.QTimer(); timer.timeout.connect(poll); timer.start(1)
+app.exec()
+"""
+
+
+def import_times(modules: list[str]) -> dict:
+    """Cumulativul (ms) raportat de -X importtime pentru fiecare modul de nivel superior importat."""
+    code = "; ".join(f"import {m}" for m in modules)
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stderr
+    roots, own, loaded = {}, {}, set()
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cum, name = line[len("import time:"):].split("|", 2)
+        if not cum.strip().isdigit():
+            continue           # antetul
+        loaded.add(name.strip())
+        own[name.strip()] = own.get(name.strip(), 0.0) + int(self_us) / 1000.0
+        if not name[1:].startswith(" "):   # nivel 0 (fără indentare) = import de la nivelul superior
+            roots[name.strip()] = roots.get(name.strip(), 0.0) + int(cum) / 1000.0
+    # PySide6 e importat din interiorul modulelor noastre → adunăm timpii proprii (self), nu cumulativul
+    qt = sum(ms for n, ms in own.items() if n.startswith(("PySide6", "shiboken")))
+    return {
+        "total_ms": round(sum(roots.values()), 1),
+        "PySide6_ms": round(qt, 1),
+        "app_ms": round(sum(ms for n, ms in own.items() if n.startswith("app")), 1),
+        "modules": len(loaded),
+        "openpyxl_loaded": "openpyxl" in loaded,
+    }
+
+
+def startup_run(workdir: str, env: dict) -> dict:
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=workdir, env=env,
+                         capture_output=True, text=True, timeout=120)
+    wall = (time.perf_counter() - t0) * 1000
+    lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+    if not lines:
+        raise RuntimeError(f"procesul de pornire a eșuat:\n{out.stderr}")
+    res = json.loads(lines[-1])
+    res["process_ms"] = round(wall, 1)
+    return res
+
+
+def median_of(runs: list[dict]) -> dict:
+    return {k: round(statistics.median(r[k] for r in runs), 1) for k in runs[0]}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="timpul de pornire (import, prima afișare, bază gata)")
+    ap.add_argument("--db", default=None, help="bază existentă (copiată; implicit una goală, nouă)")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--max-first-paint-ms", type=float, default=None)
+    args = ap.parse_args()
+
+    report = {
+        "import_main_window": import_times(["app.ui.main_window"]),
+        "import_all_windows": import_times(["app.ui.main_window"] + DIALOG_MODULES),
+    }
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "magazin.sqlite")
+        if args.db:
+            shutil.copyfile(args.db, db)
+        with open(os.path.join(tmp, "config.json"), "w", encoding="utf-8") as f:
+            json.dump({"db_path": db, "backup_dir": os.path.join(tmp, "backups"), "backup_interval_min": 0}, f)
+
+        first = startup_run(tmp, env)   # prima pornire: creează / aduce schema la zi
+        runs = [startup_run(tmp, env) for _ in range(args.runs)]
+        report["startup_first_ms"] = first
+        report["startup_ms"] = median_of(runs)
+
+        # init_db pe aceeași bază: schema la zi vs. forțată (user_version = 0)
+        def timed_init(force: bool) -> float:
+            if force:
+                c = sqlite3.connect(db); c.execute("PRAGMA user_version=0"); c.close()
+            t0 = time.perf_counter()
+            init_db(db).close()
+            return (time.perf_counter() - t0) * 1000
+        report["init_db_ms"] = {
+            "current": round(statistics.median(timed_init(False) for _ in range(args.runs)), 2),
+            "full_schema": round(statistics.median(timed_init(True) for _ in range(args.runs)), 2),
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.max_first_paint_ms is not None and report["startup_ms"]["paint"] > args.max_first_paint_ms:
+        print(f"prima afișare {report['startup_ms']['paint']} ms > prag {args.max_first_paint_ms} ms",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
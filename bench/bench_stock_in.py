@@ -0,0 +1,133 @@
+# Benchmark: latența scanare → commit pentru o linie de intrare (add_stock_in_line)
+#
+#   legacy : fluxul vechi – fiecare helper (căutare produs, creare produs, secvență lot cu
+#            CREATE TABLE IF NOT EXISTS, lot) își deschide conexiunea și face commit separat
+#   single : add_stock_in_line actual – o conexiune, o tranzacție, un commit per linie
+#
+# Scanările alternează produse existente / noi, cu și fără lot introdus.
+# Cu --synchronous FULL fiecare commit face fsync (diferența de commit-uri devine vizibilă).
+#
+#   python -m bench.bench_stock_in [--n 2000] [--synchronous NORMAL|FULL]
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+from app.infra.db import connect
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService, to_base_qty, _date_text
+from .bench_import import ean13
+
+
+# ---------- fluxul vechi (copiat din implementarea de dinainte, conexiune nouă per helper) ----------
+class LegacyStockIn:
+    def __init__(self, db_path: str, synchronous: str):
+        self.db_path = db_path
+        self.synchronous = synchronous
+
+    def _connect(self):
+        conn = connect(self.db_path)
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def find_product_by_barcode(self, barcode):
+        row = self._connect().execute("SELECT * FROM products WHERE barcode=?", (barcode,)).fetchone()
+        return dict(row) if row else None
+
+    def create_product(self, barcode, name, unit):
+        conn = self._connect()
+        with conn:
+            return conn.execute("INSERT INTO products(barcode, name, unit, price_per_unit_cents) VALUES(?,?,?,0)",
+                                (barcode, name, unit)).lastrowid
+
+    def next_seq(self, name):
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO sequences(name, value) VALUES(?, 0)", (name,))
+            conn.execute("UPDATE sequences SET value = value + 1 WHERE name=?", (name,))
+            return int(conn.execute("SELECT value FROM sequences WHERE name=?", (name,)).fetchone()["value"])
+
+    def get_or_create_batch(self, product_id, expiry_date, lot_code):
+        conn = self._connect()
+        with conn:
+            row = conn.execute("SELECT id, expiry_date FROM batches WHERE product_id=? AND lot_code=?",
+                               (product_id, lot_code)).fetchone()
+            if row:
+                if expiry_date and _date_text(row["expiry_date"]) != expiry_date:
+                    conn.execute("UPDATE batches SET expiry_date=? WHERE id=?", (expiry_date, row["id"]))
+                return row["id"]
+            return conn.execute("INSERT INTO batches(product_id, expiry_date, lot_code) VALUES(?,?,?)",
+                                (product_id, expiry_date, lot_code)).lastrowid
+
+    def add_stock_in_line(self, *, session_id, barcode, quantity, product_name, unit, expiry_date, lot_code):
+        conn = self._connect()
+        with conn:
+            p = self.find_product_by_barcode(barcode)
+            if p is None:
+                p = self.find_product_by_barcode(barcode)   # get_or_create_product caută din nou
+                if p is None:
+                    pid = self.create_product(barcode, product_name, unit)
+                    p = {"id": pid, "unit": unit}
+            if not lot_code:
+                ymd = date.today().strftime("%Y%m%d")
+                lot_code = f"S{session_id}-{ymd}-{self.next_seq(f'lot:session:{session_id}:{ymd}'):04d}"
+            batch_id = self.get_or_create_batch(p["id"], expiry_date, lot_code)
+            return conn.execute("""
+                INSERT INTO stock_in_lines(session_id, product_id, batch_id, quantity_base) VALUES(?,?,?,?)
+            """, (session_id, p["id"], batch_id, to_base_qty(p["unit"], quantity))).lastrowid
+
+
+def scans(n: int):
+    for i in range(n):
+        code = ean13(i // 2 + 1)   # fiecare cod de două ori: prima oară produs nou, apoi existent
+        yield dict(barcode=code, quantity=3, product_name=f"Produs {i}", unit="buc",
+                   expiry_date="2027-06-30", lot_code=(f"L{i % 7}" if i % 3 == 0 else None))
+
+
+def measure(fn, n: int) -> dict:
+    samples = []
+    for kw in scans(n):
+        t0 = time.perf_counter()
+        fn(**kw)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+        "total_s": round(sum(samples) / 1000, 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="add_stock_in_line: conexiuni multiple vs. o tranzacție")
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--synchronous", choices=["NORMAL", "FULL"], default="NORMAL")
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "legacy.sqlite")
+        init_db(path).close()
+        legacy = LegacyStockIn(path, args.synchronous)
+        conn = legacy._connect()
+        with conn:
+            sid = conn.execute("INSERT INTO stock_in_sessions(note) VALUES('bench')").lastrowid
+        results["legacy"] = measure(lambda **kw: legacy.add_stock_in_line(session_id=sid, **kw), args.n)
+
+        path = os.path.join(tmp, "single.sqlite")
+        init_db(path).close()
+        svc = InventoryService(path)
+        svc._conn().execute(f"PRAGMA synchronous={args.synchronous}")
+        sid = svc.start_stock_in_session("bench")
+        results["single"] = measure(lambda **kw: svc.add_stock_in_line(session_id=sid, **kw), args.n)
+        svc.close()
+
+    print(json.dumps({"n": args.n, "synchronous": args.synchronous, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Benchmark: lista de stoc (get_stock_products) pe o bază sintetică mare
+#
+#   legacy : agregat SUM peste tot registrul + filtrare/sortare în Python (implementarea veche)
+#   sql    : filtrare, prag per unitate și ordonare în SQL peste soldurile materializate
+#   page   : la fel, dar doar prima pagină (LIMIT 200), cum o cere StocWindow
+#   search : search_products (primele 20, ordonate după relevanță), doar scenariile cu căutare
+#
+# Căutarea trece prin indexul FTS (prefix pe cuvinte, fără diacritice), deci pe scenariile cu
+# căutare rezultatul diferă intenționat de subșirul din legacy; acolo comparăm doar timpii.
+#
+# Rulare (din rădăcina repo-ului); baza generată se poate păstra cu --db pentru rulări repetate:
+#   python -m bench.bench_stock_list [--products 50000] [--movements 5000000] [--db /tmp/stoc.sqlite]
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app.infra.db import connect
+from app.services.use_cases import InventoryService
+from .synth import build_ledger_db
+
+SCENARIOS = [
+    ("fără filtru", dict()),
+    ("căutare 1 literă", dict(search="a")),
+    ("căutare cuvânt", dict(search="lapte")),
+    ("fără diacritice", dict(search="paine alb")),
+    ("căutare cod", dict(search="5900000123")),
+    ("stoc scăzut ≤ 5", dict(low_only=True, low_threshold_human=5.0)),
+]
+
+
+def legacy_stock_products(conn, search: str = "", low_only: bool = False, low_threshold_human: float = 0.0):
+    rows = conn.execute("""
+        SELECT p.id AS product_id, p.name, p.barcode, p.unit,
+               COALESCE(SUM(m.quantity_base),0) AS stock_base
+        FROM products p
+        LEFT JOIN movements m ON m.product_id = p.id
+        GROUP BY p.id
+    """).fetchall()
+    items = []
+    for r in rows:
+        unit = r["unit"]
+        stock_base = int(r["stock_base"] or 0)
+        items.append({"product_id": r["product_id"], "name": r["name"], "barcode": r["barcode"], "unit": unit,
+                      "stock_base": stock_base,
+                      "stock_human": float(stock_base) if unit == "buc" else stock_base / 1000.0})
+    if search:
+        s = search.lower()
+        items = [it for it in items if s in (it["name"] or "").lower() or s in (it["barcode"] or "").lower()]
+    if low_only:
+        def thr(unit):
+            return int(round(low_threshold_human)) if unit == "buc" else int(round(low_threshold_human * 1000))
+        items = [it for it in items if it["stock_base"] <= thr(it["unit"])]
+    items.sort(key=lambda x: x["name"] or "")
+    return items
+
+
+def _ms(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="get_stock_products: Python vs. SQL")
+    ap.add_argument("--products", type=int, default=50_000)
+    ap.add_argument("--movements", type=int, default=5_000_000)
+    ap.add_argument("--db", default=None, help="fișier bază (se generează doar dacă nu există)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--skip-legacy", action="store_true")
+    args = ap.parse_args()
+
+    tmp = None
+    db_path = args.db
+    if db_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "stoc.sqlite")
+    if not os.path.exists(db_path):
+        print(f"generez {args.products} produse / {args.movements} mișcări în {db_path} ...")
+        t0 = time.perf_counter()
+        build_ledger_db(db_path, args.products, args.movements)
+        print(f"  gata în {time.perf_counter() - t0:.1f}s")
+
+    svc = InventoryService(db_path)
+    legacy_conn = connect(db_path)
+    print(f"{'scenariu':20s} {'legacy ms':>10} {'sql ms':>9} {'page ms':>9} {'search ms':>10} {'rânduri':>8}")
+    for label, kw in SCENARIOS:
+        t_sql, items = _ms(lambda: svc.get_stock_products(**kw), args.repeat)
+        t_page, _ = _ms(lambda: svc.get_stock_products(**kw, limit=200), args.repeat)
+        t_search = _ms(lambda: svc.search_products(kw["search"]), args.repeat)[0] if kw.get("search") else float("nan")
+        if args.skip_legacy:
+            t_old = float("nan")
+        else:
+            t_old, old = _ms(lambda: legacy_stock_products(legacy_conn, **kw), 1)
+            # aceleași produse (ordinea poate diferi doar la denumiri identice)
+            assert kw.get("search") or sorted(x["product_id"] for x in old) == sorted(x["product_id"] for x in items), label
+        print(f"{label:20s} {t_old:10.1f} {t_sql:9.1f} {t_page:9.2f} {t_search:10.2f} {len(items):8d}")
+
+    legacy_conn.close()
+    svc.close()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
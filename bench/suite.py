@@ -0,0 +1,262 @@
+# Suită de benchmark-uri pentru InventoryService (fără UI), cu rezultat JSON comparabil între versiuni.
+#
+# Generează (sau refolosește cu --db) o bază sintetică – bench.synth.build_ledger_db peste schema
+# din init_db – o copiază într-un director temporar (cazurile care scriu nu modifică șablonul)
+# și cronometrează cazurile de utilizare principale. Pentru fiecare caz: p50/p95/p99/medie în ms,
+# operații/s și rânduri/s (rânduri = ce procesează/întoarce apelul: linii de bon, produse, loturi).
+#
+#   python -m bench.suite [--products 20000] [--movements 1000000] [--years 3] [--receipts 20000]
+#                         [--db /tmp/suite.sqlite] [--iterations 200] [--out rezultate.json]
+#                         [--compare rezultate-vechi.json] [--only scan_lookup,finalize_receipt]
+#                         [--sql-stats]   → măsoară și fiecare interogare (app.infra.db.query_stats);
+#                                           tabelul celor mai costisitoare iese pe stderr
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from app.infra.db import query_stats
+from app.infra.db_init import init_db
+from app.services.use_cases import InventoryService
+from .synth import build_ledger_db
+
+RECEIPT_LINES = 10        # linii per bon la finalize_receipt
+STOCK_IN_LINES = 20       # linii per sesiune la close_stock_in_session
+EXPIRY_DAYS = 30
+
+
+def percentile(sorted_ms: list[float], p: float) -> float:
+    """Percentila prin metoda rangului cel mai apropiat (fără interpolare)."""
+    if not sorted_ms:
+        return float("nan")
+    k = max(0, min(len(sorted_ms) - 1, math.ceil(p / 100.0 * len(sorted_ms)) - 1))
+    return sorted_ms[k]
+
+
+def summarize(samples_ms: list[float], rows: int) -> dict:
+    s = sorted(samples_ms)
+    total_s = sum(s) / 1000.0
+    return {
+        "n": len(s),
+        "p50_ms": round(percentile(s, 50), 4),
+        "p95_ms": round(percentile(s, 95), 4),
+        "p99_ms": round(percentile(s, 99), 4),
+        "mean_ms": round(sum(s) / len(s), 4),
+        "ops_per_s": round(len(s) / total_s, 1) if total_s else None,
+        "rows_per_s": round(rows / total_s, 1) if total_s else None,
+    }
+
+
+class Suite:
+    def __init__(self, svc: InventoryService, iterations: int, seed: int = 1):
+        self.svc = svc
+        self.iterations = iterations
+        self.rnd = random.Random(seed)
+        conn = svc._conn()
+        self.n_products = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        self.barcodes = [r[0] for r in conn.execute("SELECT barcode FROM products WHERE barcode IS NOT NULL")]
+        # stocul în unități „umane” (buc / kg / l) al produselor care au cel puțin o unitate: finalize_receipt
+        # vinde câte 1 din fiecare produs ales (= 1000 g / ml la kg / l), deci îl ținem la zi aici și alegem
+        # doar produse care mai au stoc (altfel cazul ar fi respins cu „Stoc insuficient” după câteva bonuri)
+        rows = conn.execute("""
+            SELECT p.barcode, p.unit, sb.qty_base FROM products p
+            JOIN stock_balance_product sb ON sb.product_id = p.id
+            WHERE p.barcode IS NOT NULL AND sb.qty_base >= CASE p.unit WHEN 'buc' THEN 1 ELSE 1000 END
+        """)
+        self.stock_left = {code: qty_base // (1 if unit == "buc" else 1000) for code, unit, qty_base in rows}
+        self.in_stock = list(self.stock_left)
+
+    def _timed(self, fn, n: int, setup=None) -> dict:
+        samples, rows = [], 0
+        for _ in range(n):
+            arg = setup() if setup else None
+            t0 = time.perf_counter()
+            out = fn(arg)
+            samples.append((time.perf_counter() - t0) * 1000)
+            rows += out
+        return summarize(samples, rows)
+
+    # ---------- cazuri ----------
+    def scan_lookup(self):
+        # amestec realist: ~80% din scanări pe 200 de produse "de raft", restul oriunde în catalog
+        hot = self.rnd.sample(self.barcodes, min(200, len(self.barcodes)))
+        def pick(_):
+            code = self.rnd.choice(hot) if self.rnd.random() < 0.8 else self.rnd.choice(self.barcodes)
+            return int(self.svc.find_product_by_barcode(code) is not None)
+        return self._timed(pick, self.iterations * 10)
+
+    def add_line_to_receipt(self):
+        rid = self.svc.open_receipt()
+        def add(_):
+            self.svc.add_line_to_receipt(rid, self.rnd.choice(self.barcodes), 1)
+            return 1
+        res = self._timed(add, self.iterations * 5)
+        self.svc.void_receipt(rid)
+        return res
+
+    def finalize_receipt(self):
+        def setup():
+            if len(self.in_stock) < RECEIPT_LINES:
+                raise RuntimeError(f"prea puține produse cu stoc pentru încă un bon ({len(self.in_stock)})")
+            rid = self.svc.open_receipt()
+            for code in self.rnd.sample(self.in_stock, RECEIPT_LINES):
+                self.svc.add_line_to_receipt(rid, code, 1)
+                self.stock_left[code] -= 1
+                if not self.stock_left[code]:
+                    self.in_stock.remove(code)
+            return rid
+        def fin(rid):
+            self.svc.finalize_receipt(rid)
+            return RECEIPT_LINES
+        return self._timed(fin, self.iterations, setup)
+
+    def close_stock_in_session(self):
+        def setup():
+            sid = self.svc.start_stock_in_session("suite")
+            for _ in range(STOCK_IN_LINES):
+                code = self.rnd.choice(self.barcodes)
+                self.svc.add_stock_in_line(session_id=sid, barcode=code, quantity=10, product_name=None,
+                                           lot_code=f"SUITE-{self.rnd.randint(1, 5)}", expiry_date="2030-01-01")
+            return sid
+        def close(sid):
+            self.svc.close_stock_in_session(sid)
+            return STOCK_IN_LINES
+        return self._timed(close, self.iterations, setup)
+
+    def get_stock_products_page(self):
+        return self._timed(lambda _: len(self.svc.get_stock_products(limit=200)), self.iterations)
+
+    def get_stock_products_full(self):
+        return self._timed(lambda _: len(self.svc.get_stock_products()), max(5, self.iterations // 20))
+
+    def get_stock_products_search(self):
+        words = ["lapte", "paine", "cafea alb", "sunca", "59000001"]
+        return self._timed(lambda _: len(self.svc.get_stock_products(search=self.rnd.choice(words), limit=200)),
+                           self.iterations)
+
+    def get_expiring_batches(self):
+        return self._timed(lambda _: len(self.svc.get_expiring_batches(EXPIRY_DAYS)), max(5, self.iterations // 10))
+
+    def get_product_batches(self):
+        return self._timed(lambda _: len(self.svc.get_product_batches(self.rnd.randint(1, self.n_products))),
+                           self.iterations * 5)
+
+    CASES = [
+        "scan_lookup", "add_line_to_receipt", "finalize_receipt", "close_stock_in_session",
+        "get_stock_products_page", "get_stock_products_full", "get_stock_products_search",
+        "get_expiring_batches", "get_product_batches",
+    ]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> None:
+    print(f"\n{'caz':28s} {'p50 vechi':>10} {'p50 nou':>10} {'Δ p50':>8} {'p95 vechi':>10} {'p95 nou':>10} {'Δ p95':>8}")
+    for case, cur in current["results"].items():
+        old = baseline.get("results", {}).get(case)
+        if not old or "error" in cur or "error" in old:
+            continue
+        d50 = (cur["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else float("nan")
+        d95 = (cur["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else float("nan")
+        print(f"{case:28s} {old['p50_ms']:10.3f} {cur['p50_ms']:10.3f} {d50:+7.1f}% "
+              f"{old['p95_ms']:10.3f} {cur['p95_ms']:10.3f} {d95:+7.1f}%")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark InventoryService pe o bază sintetică")
+    ap.add_argument("--products", type=int, default=20_000)
+    ap.add_argument("--movements", type=int, default=1_000_000)
+    ap.add_argument("--years", type=float, default=3.0)
+    ap.add_argument("--receipts", type=int, default=20_000)
+    ap.add_argument("--batches-per-product", type=int, default=3)
+    ap.add_argument("--db", default=None, help="șablon (se generează doar dacă nu există; nu e modificat)")
+    ap.add_argument("--iterations", type=int, default=200)
+    ap.add_argument("--only", default=None, help="listă de cazuri separate prin virgulă")
+    ap.add_argument("--out", default=None, help="fișier JSON (implicit: stdout)")
+    ap.add_argument("--compare", default=None, help="JSON dintr-o rulare anterioară")
+    ap.add_argument("--sql-stats", action="store_true", help="statistici per interogare (top 25 pe stderr)")
+    args = ap.parse_args()
+
+    cases = args.only.split(",") if args.only else Suite.CASES
+    unknown = [c for c in cases if c not in Suite.CASES]
+    if unknown:
+        ap.error(f"cazuri necunoscute: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = args.db or os.path.join(tmp, "template.sqlite")
+        if not os.path.exists(template):
+            print(f"generez {args.products} produse / {args.movements} mișcări / {args.receipts} bonuri ...",
+                  file=sys.stderr)
+            t0 = time.perf_counter()
+            build_ledger_db(template, args.products, args.movements, args.batches_per_product,
+                            years=args.years, receipts=args.receipts)
+            print(f"  gata în {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        work = os.path.join(tmp, "work.sqlite")
+        shutil.copyfile(template, work)
+        init_db(work).close()   # șabloane generate de versiuni mai vechi: migrările la zi
+
+        query_stats.configure(args.sql_stats)   # înainte de prima conexiune a serviciului
+        svc = InventoryService(work)
+        suite = Suite(svc, args.iterations)
+        conn = svc._conn()
+        scale = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                 for t in ("products", "batches", "movements", "receipts", "receipt_lines")}
+
+        results = {}
+        for case in cases:
+            print(f"  {case} ...", file=sys.stderr)
+            try:
+                results[case] = getattr(suite, case)()
+            except Exception as e:   # un caz căzut apare în raport, celelalte rulează mai departe
+                print(f"  {case} a eșuat: {type(e).__name__}: {e}", file=sys.stderr)
+                results[case] = {"error": f"{type(e).__name__}: {e}"}
+        svc.close()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "scale": scale,
+            "sql_stats": args.sql_stats,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    if args.sql_stats:
+        print("\n" + query_stats.format_table(25), file=sys.stderr)
+    failed = [case for case, r in results.items() if "error" in r]
+    if failed:
+        raise SystemExit(f"cazuri eșuate: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
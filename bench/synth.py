@@ -0,0 +1,130 @@
+# Generator de baze sintetice pentru benchmark-uri (folosește schema reală din db_init).
+#
+#   build_ledger_db(path, products=50_000, movements=5_000_000, years=1, receipts=0)
+#
+# Produse cu denumiri românești (cu diacritice), unități buc/kg/l, câteva loturi per produs
+# (expirări între -60 și +720 de zile, ~10% fără expirare), un registru de mișcări (intrări +
+# vânzări) eșalonat cronologic pe `years` ani și, opțional, bonuri închise cu liniile lor
+# (fiecare linie are mișcarea 'sale' corespunzătoare, în plus față de `movements`).
+
+import random
+from datetime import date, datetime, timedelta
+
+from app.infra.balances import rebuild_stock_balances
+from app.infra.db_init import init_db
+
+WORDS = [
+    "Pâine", "Lapte", "Brânză", "Iaurt", "Măr", "Pară", "Cafea", "Ceai", "Zahăr", "Făină",
+    "Ulei", "Orez", "Paste", "Suc", "Apă", "Biscuiți", "Ciocolată", "Napolitane", "Salam", "Șuncă",
+    "Cașcaval", "Smântână", "Unt", "Ouă", "Roșii", "Castraveți", "Ardei", "Cartofi", "Ceapă", "Usturoi",
+]
+ADJ = ["albă", "integrală", "proaspăt", "degresat", "bio", "clasic", "extra", "dulce", "afumat", "natural"]
+UNITS = ["buc"] * 7 + ["kg"] * 2 + ["l"]
+
+CHUNK = 50_000
+NO_EXPIRY_SHARE = 0.1
+
+
+def product_name(rnd: random.Random, i: int) -> str:
+    return f"{rnd.choice(WORDS)} {rnd.choice(ADJ)} {i}"
+
+
+def _ts(start: datetime, span_s: float, frac: float) -> str:
+    return (start + timedelta(seconds=span_s * frac)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_ledger_db(
+    path: str,
+    products: int,
+    movements: int,
+    batches_per_product: int = 2,
+    seed: int = 42,
+    years: float = 1.0,
+    receipts: int = 0,
+    max_lines_per_receipt: int = 12,
+) -> None:
+    rnd = random.Random(seed)
+    conn = init_db(path)
+    today = date.today()
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=365 * years)
+    span_s = (now - start).total_seconds()
+    # doar pentru generare: fără jurnal, cache mare și fără triggerele de sold
+    # (soldurile se reconstruiesc o singură dată la final, apoi triggerele se recreează din SQL-ul salvat)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name='movements'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    units = {}
+    prices = {}
+    with conn:
+        def product_rows():
+            for i in range(1, products + 1):
+                units[i] = rnd.choice(UNITS)
+                prices[i] = rnd.randint(50, 9000)
+                yield i, f"59{i:010d}", product_name(rnd, i), units[i], prices[i]
+        conn.executemany(
+            "INSERT INTO products(id, barcode, name, unit, price_per_unit_cents) VALUES(?,?,?,?,?)", product_rows())
+        conn.executemany(
+            "INSERT INTO batches(product_id, lot_code, expiry_date) VALUES(?,?,?)",
+            ((pid, f"L{pid}-{k}",
+              None if rnd.random() < NO_EXPIRY_SHARE else (today + timedelta(days=rnd.randint(-60, 720))).isoformat())
+             for pid in range(1, products + 1) for k in range(batches_per_product)))
+
+    n_batches = products * batches_per_product
+    done = 0
+    while done < movements:
+        n = min(CHUNK, movements - done)
+        rows = []
+        for k in range(n):
+            bid = rnd.randint(1, n_batches)
+            pid = (bid - 1) // batches_per_product + 1
+            ts = _ts(start, span_s, (done + k) / max(movements, 1))
+            if rnd.random() < 0.3:
+                rows.append((ts, pid, bid, rnd.randint(10, 200), "stock_in"))
+            else:
+                rows.append((ts, pid, bid, -rnd.randint(1, 5), "sale"))
+        with conn:
+            conn.executemany(
+                "INSERT INTO movements(ts, product_id, batch_id, quantity_base, reason) VALUES(?,?,?,?,?)", rows)
+        done += n
+
+    # bonuri închise, eșalonate pe aceeași perioadă; o linie = o mișcare 'sale' pe un lot al produsului
+    done = 0
+    while done < receipts:
+        n = min(CHUNK // max_lines_per_receipt, receipts - done)
+        with conn:
+            for k in range(n):
+                ts = _ts(start, span_s, (done + k) / receipts)
+                rid = conn.execute(
+                    "INSERT INTO receipts(opened_at, closed_at, status) VALUES(?,?,'closed')", (ts, ts)).lastrowid
+                lines, moves, total = [], [], 0
+                for _ in range(rnd.randint(1, max_lines_per_receipt)):
+                    pid = rnd.randint(1, products)
+                    qty = rnd.randint(1, 5) if units[pid] == "buc" else rnd.randint(100, 2000)
+                    line_total = prices[pid] * qty if units[pid] == "buc" else round(prices[pid] * qty / 1000)
+                    total += line_total
+                    lines.append((rid, pid, qty, prices[pid], line_total, ts))
+                    bid = (pid - 1) * batches_per_product + rnd.randint(1, batches_per_product)
+                    moves.append((ts, pid, bid, -qty, rid, f"receipt:{rid}"))
+                conn.executemany("""
+                    INSERT INTO receipt_lines(receipt_id, product_id, qty_base, unit_price_cents, line_total_cents, created_at)
+                    VALUES(?,?,?,?,?,?)
+                """, lines)
+                conn.executemany("""
+                    INSERT INTO movements(ts, product_id, batch_id, quantity_base, reason, receipt_id, note)
+                    VALUES(?,?,?,?,'sale',?,?)
+                """, moves)
+                conn.execute("UPDATE receipts SET total_cached_cents=? WHERE id=?", (total, rid))
+        done += n
+
+    with conn:
+        rebuild_stock_balances(conn)
+        for _, sql in triggers:
+            conn.execute(sql)
+    conn.close()
+    init_db(path).close()   # revine la WAL
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from app.infra.db_init import MIGRATIONS, init_db
+from app.infra.migrations import current_version, migrate
+from app.services.query_plans import PLAN_CHECKS, check_query_plans, main
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "magazin.sqlite")
+    init_db(path).close()
+    return path
+
+
+@pytest.mark.parametrize("name", [c[0] for c in PLAN_CHECKS])
+def test_hot_query_uses_expected_index(name):
+    conn = init_db(":memory:")
+    try:
+        check = next(c for c in PLAN_CHECKS if c[0] == name)
+        [result] = check_query_plans(conn, [check])
+    finally:
+        conn.close()
+    assert result["ok"], f"{name}: {result['problems']}\n" + "\n".join(result["plan"])
+
+
+def test_full_scan_is_reported():
+    conn = init_db(":memory:")
+    try:
+        [result] = check_query_plans(conn, [("fără index", "SELECT id FROM receipts WHERE total_cached_cents = ?", [], [])])
+    finally:
+        conn.close()
+    assert not result["ok"]
+    assert any(p.startswith("scanare completă") for p in result["problems"])
+
+
+def test_cli_checks_existing_db(db_path, capsys):
+    assert main(["--db", db_path]) == 0
+    assert f"{len(PLAN_CHECKS)}/{len(PLAN_CHECKS)}" in capsys.readouterr().out
+
+
+def test_cli_does_not_create_missing_db(tmp_path):
+    path = tmp_path / "lipsa.sqlite"
+    assert main(["--db", str(path)]) == 2
+    assert not path.exists()
+
+
+def test_cli_refuses_to_migrate_old_schema(tmp_path, capsys):
+    path = str(tmp_path / "veche.sqlite")
+    conn = sqlite3.connect(path)
+    migrate(conn, MIGRATIONS, target=1)
+    conn.close()
+    with open(path, "rb") as f:
+        before = f.read()
+
+    assert main(["--db", path]) == 2
+    assert "python -m app.infra.migrations" in capsys.readouterr().out
+
+    conn = sqlite3.connect(path)
+    try:
+        assert current_version(conn) == 1
+    finally:
+        conn.close()
+    with open(path, "rb") as f:
+        assert f.read() == before